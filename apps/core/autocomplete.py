@@ -0,0 +1,196 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+from django import forms
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views import View
+
+# Runs of letters and digits, as split by the unicode61 FTS5 tokenizer
+TERM_RE = re.compile(r'[^\W_]+')
+
+# One autocomplete option: its id, the label shown and the folded terms it is found by
+AutocompleteResult = namedtuple('AutocompleteResult', ['id', 'text', 'terms'])
+
+
+def fold(text):
+    """Lowercase text and strip its accents: 'Ñuñoa' -> 'nunoa'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def query_terms(text):
+    """Return the folded words of a search, as a tuple."""
+    return tuple(TERM_RE.findall(fold(text)))
+
+
+def matches(result_terms, terms):
+    """Return whether every search term is the prefix of one of the result's terms."""
+    return all(any(result_term.startswith(term) for result_term in result_terms) for term in terms)
+
+
+class PrefixCache:
+    """
+    Bounded in-memory cache of autocomplete results, keyed by source and search terms.
+
+    Every keystroke extends the previous search. Once a search has returned all its
+    matches (fewer than the fetch limit), any longer search starting with it is
+    answered by filtering those matches in memory, without a query.
+
+    Entries expire after ttl seconds, which bounds how stale another process's
+    results can be; saves in this process clear the cache through signals.
+    """
+
+    def __init__(self, terms_function=query_terms, max_entries=512, ttl=60):
+        self.terms_function = terms_function
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _set(self, key, results, complete):
+        self.entries[key] = (time.monotonic(), results, complete)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @staticmethod
+    def shorter_searches(terms):
+        """Yield the searches terms extends, longest first: ('ana', 'ro') -> ('ana', 'r'), ('ana',), ..."""
+        terms = list(terms)
+        while terms:
+            if len(terms[-1]) > 1:
+                terms[-1] = terms[-1][:-1]
+            else:
+                terms.pop()
+            if terms:
+                yield tuple(terms)
+
+    def lookup(self, source, text, fetch, fetch_limit=200):
+        """
+        Return the results of a search, from the cache when possible.
+
+        Args:
+            source (hashable): What is searched, e.g. ('clients', 'OWNER')
+            text (str): The search text typed by the user
+            fetch (callable): fetch(text, limit) returning up to limit AutocompleteResult
+                from the database, in display order
+            fetch_limit (int): Matches fetched and cached per search
+
+        Returns:
+            list: AutocompleteResult, in display order
+        """
+        terms = self.terms_function(text)
+        if not terms:
+            return []
+
+        with self.lock:
+            entry = self._get((source, terms))
+            if entry is not None:
+                return entry[1]
+
+            for shorter in self.shorter_searches(terms):
+                entry = self._get((source, shorter))
+                if entry is not None and entry[2]:
+                    results = [result for result in entry[1] if matches(result.terms, terms)]
+                    self._set((source, terms), results, True)
+                    return results
+
+        results = list(fetch(text, fetch_limit + 1))
+        complete = len(results) <= fetch_limit
+        results = results[:fetch_limit]
+        with self.lock:
+            self._set((source, terms), results, complete)
+        return results
+
+    def clear(self):
+        """Drop every cached search."""
+        with self.lock:
+            self.entries.clear()
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select rendering only its selected option, completed in the browser from a JSON endpoint.
+
+    The choices of a ModelChoiceField are never iterated, so the page does not grow
+    with the table; the field still validates the submitted id with a single lookup.
+    """
+    class Media:
+        css = {'all': ('core/css/autocomplete.css',)}
+        js = ('core/js/autocomplete.js',)
+
+    def __init__(self, url, params=None, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.params = params or {}
+
+    def get_url(self):
+        url = str(self.url)
+        return f'{url}?{urlencode(self.params)}' if self.params else url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = self.get_url()
+        attrs['class'] = f"{attrs.get('class', '')} autocomplete-select".strip()
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = {str(item) for item in value if str(item) not in field.empty_values}
+
+        options = []
+        if field.empty_label is not None:
+            options.append(('', field.empty_label))
+        if selected:
+            try:
+                objects = self.choices.queryset.filter(**{f'{field.to_field_name or "pk"}__in': selected})
+                options.extend(self.choices.choice(obj) for obj in objects)
+            except (ValueError, ValidationError):
+                pass
+
+        return [
+            (None, [self.create_option(
+                name, option_value, label, str(option_value) in selected or (not selected and not option_value),
+                index,
+            )], index)
+            for index, (option_value, label) in enumerate(options)
+        ]
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    JSON results for an AutocompleteSelect: {'results': [{'id': ..., 'text': ...}]}.
+
+    Subclasses provide the prefix cache, the cache source of a request and the
+    database fetch.
+    """
+    cache = None
+    limit = 10
+
+    def get_source(self):
+        raise NotImplementedError
+
+    def fetch(self, text, limit):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        results = self.cache.lookup(self.get_source(), request.GET.get('q', ''), self.fetch)
+        return JsonResponse({
+            'results': [{'id': result.id, 'text': result.text} for result in results[:self.limit]]
+        })
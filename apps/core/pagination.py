@@ -0,0 +1,256 @@
+from django.contrib.admin.views.main import ChangeList
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Query string parameter carrying the opaque cursor token
+CURSOR_VAR = 'cursor'
+CURSOR_SALT = 'core.pagination.cursor'
+
+
+class KeysetPage:
+    """
+    One page of a keyset (cursor) paginated queryset.
+
+    Unlike django.core.paginator.Page it knows nothing about the total number of rows:
+    it only tells whether there are rows before and after it, and the tokens to reach them.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_token=None, previous_token=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+def resolve_ordering(model, ordering):
+    """
+    Turn an ordering into a list of (field, descending) pairs usable as a keyset.
+
+    Args:
+        model: The model being paginated
+        ordering: Iterable of field names, optionally prefixed with '-'
+
+    Returns:
+        list: (model field, descending) pairs, or None if a key is not a non-nullable
+        concrete field of the model (expressions, relations, nullable columns)
+    """
+    keys = []
+    for name in ordering:
+        if not isinstance(name, str):
+            return None
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        try:
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.is_relation or field.null:
+            return None
+        keys.append((field, descending))
+
+    # Rows must be totally ordered, so make sure the primary key closes the keyset
+    if not any(field.primary_key for field, _ in keys):
+        keys.append((model._meta.pk, keys[-1][1] if keys else False))
+    return keys
+
+
+def encode_cursor(keys, obj, direction):
+    """Return the opaque token pointing before ('p') or after ('n') obj."""
+    values = [str(getattr(obj, field.attname)) for field, _ in keys]
+    return signing.dumps({'d': direction, 'v': values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(keys, token):
+    """
+    Read a cursor token back.
+
+    Returns:
+        tuple: (direction, values), or (None, None) if the token is missing, tampered
+        with or does not match the ordering
+    """
+    if not token:
+        return None, None
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        values = [field.to_python(value) for (field, _), value in zip(keys, data['v'], strict=True)]
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+        return None, None
+    if data.get('d') not in ('n', 'p'):
+        return None, None
+    return data['d'], values
+
+
+def keyset_filter(keys, values, backwards=False):
+    """
+    Build the filter selecting the rows after (or before) the given key values.
+
+    (a, b) > (x, y) is expanded to a > x OR (a = x AND b > y), honouring the direction
+    of every key, so it works on any database and uses composite indexes.
+    """
+    condition = Q(pk__in=[])
+    for index, (field, descending) in enumerate(keys):
+        lookup = 'lt' if descending != backwards else 'gt'
+        term = Q(**{f'{field.attname}__{lookup}': values[index]})
+        for (previous, _), value in zip(keys[:index], values[:index]):
+            term &= Q(**{previous.attname: value})
+        condition |= term
+    return condition
+
+
+def keyset_paginate(queryset, keys, per_page, token=None):
+    """
+    Return one page of a queryset without OFFSET or COUNT(*).
+
+    Args:
+        queryset: The queryset to paginate
+        keys: Keyset as returned by resolve_ordering()
+        per_page: Number of rows per page
+        token: Cursor token from a previous page, None for the first page
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    ordering = [('-' if descending else '') + field.attname for field, descending in keys]
+    direction, values = decode_cursor(keys, token)
+
+    if direction == 'p':
+        # Walk backwards from the cursor, then restore the display order
+        reverse_ordering = [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+        rows = list(queryset.filter(keyset_filter(keys, values, backwards=True))
+                    .order_by(*reverse_ordering)[:per_page + 1])
+        has_previous, has_next = len(rows) > per_page, True
+        rows = rows[:per_page][::-1]
+    else:
+        if direction == 'n':
+            queryset = queryset.filter(keyset_filter(keys, values))
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        has_next, has_previous = len(rows) > per_page, direction == 'n'
+        rows = rows[:per_page]
+
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_token=encode_cursor(keys, rows[-1], 'n') if rows else None,
+        previous_token=encode_cursor(keys, rows[0], 'p') if rows else None,
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing OFFSET pagination with keyset (cursor) pagination.
+
+    Set keyset_ordering to the ordering of the list, e.g. ('-created_at', '-id'). When
+    get_keyset_ordering() returns None (e.g. for a relevance-ranked search) the view
+    falls back to the regular paginator. Either way the context gets previous_page_url
+    and next_page_url, which keep the other query string parameters.
+    """
+    keyset_ordering = None
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset_ordering()
+        keys = resolve_ordering(queryset.model, ordering) if ordering else None
+        if keys is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        page = keyset_paginate(queryset, keys, page_size, self.request.GET.get(CURSOR_VAR))
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_page_url(self, **params):
+        """Return the current query string with the pagination parameters replaced."""
+        query = self.request.GET.copy()
+        for name in (CURSOR_VAR, self.page_kwarg):
+            query.pop(name, None)
+        query.update(params)
+        return f'?{query.urlencode()}'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        previous_url = next_url = None
+
+        if isinstance(page, KeysetPage):
+            if page.has_previous():
+                previous_url = self.get_page_url(**{CURSOR_VAR: page.previous_token})
+            if page.has_next():
+                next_url = self.get_page_url(**{CURSOR_VAR: page.next_token})
+        elif page is not None:
+            if page.has_previous():
+                previous_url = self.get_page_url(**{self.page_kwarg: page.previous_page_number()})
+            if page.has_next():
+                next_url = self.get_page_url(**{self.page_kwarg: page.next_page_number()})
+
+        context['previous_page_url'] = previous_url
+        context['next_page_url'] = next_url
+        return context
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Admin changelist paginated by keyset on its current ordering.
+
+    Orderings that cannot be used as a keyset (expressions, relations, nullable
+    columns) fall back to the regular admin pagination.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Sorting or filtering starts again from the first page
+        new_params = {CURSOR_VAR: None, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        keys = resolve_ordering(self.model, self.queryset.query.order_by)
+        self.keyset_page = None
+        if keys is None or self.show_all:
+            return super().get_results(request)
+
+        page = keyset_paginate(self.queryset, keys, self.list_per_page, request.GET.get(CURSOR_VAR))
+
+        # Nothing is counted: report the page itself
+        self.keyset_page = page
+        self.result_list = page.object_list
+        self.result_count = self.full_result_count = len(page)
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = page.has_other_pages()
+        self.paginator = None
+
+        self.previous_page_url = self.next_page_url = None
+        if page.has_previous():
+            self.previous_page_url = super().get_query_string({CURSOR_VAR: page.previous_token})
+        if page.has_next():
+            self.next_page_url = super().get_query_string({CURSOR_VAR: page.next_token})
+
+
+class KeysetPaginationAdminMixin:
+    """ModelAdmin mixin using KeysetChangeList and its previous/next pagination links."""
+    change_list_template = 'admin/core/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
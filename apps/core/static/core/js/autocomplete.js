@@ -0,0 +1,136 @@
+// Turn every select.autocomplete-select into a text input completed from its
+// data-autocomplete-url endpoint. The select stays in the form, hidden, and
+// holds the chosen option, so the submitted value is unchanged.
+(function() {
+    const DEBOUNCE_MS = 200;
+
+    function enhance(select) {
+        const wrapper = document.createElement('div');
+        wrapper.className = 'autocomplete';
+        const input = document.createElement('input');
+        input.type = 'text';
+        input.className = select.className.replace('autocomplete-select', '').trim();
+        input.autocomplete = 'off';
+        input.placeholder = 'Buscar...';
+        const list = document.createElement('ul');
+        list.className = 'autocomplete-results';
+        list.hidden = true;
+
+        const selected = select.options[select.selectedIndex];
+        input.value = selected && selected.value ? selected.text.trim() : '';
+        input.readOnly = select.hasAttribute('readonly');
+        input.required = select.required;
+
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.append(input, list, select);
+        select.hidden = true;
+        select.required = false;
+        if (input.readOnly) {
+            return;
+        }
+
+        const url = select.dataset.autocompleteUrl;
+        let timer = null;
+        let controller = null;
+        let active = -1;
+
+        function choose(item) {
+            let option = Array.from(select.options).find(opt => opt.value === String(item.id));
+            if (!option) {
+                option = new Option(item.text, item.id);
+                select.add(option);
+            }
+            select.value = option.value;
+            input.value = item.text;
+            close();
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+
+        function close() {
+            list.hidden = true;
+            list.innerHTML = '';
+            active = -1;
+        }
+
+        function highlight(index) {
+            const items = list.children;
+            if (!items.length) {
+                return;
+            }
+            active = (index + items.length) % items.length;
+            Array.from(items).forEach((item, position) => item.classList.toggle('active', position === active));
+        }
+
+        function render(results) {
+            list.innerHTML = '';
+            results.forEach(result => {
+                const item = document.createElement('li');
+                item.textContent = result.text;
+                item.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    choose(result);
+                });
+                list.appendChild(item);
+            });
+            if (!results.length) {
+                const item = document.createElement('li');
+                item.className = 'empty';
+                item.textContent = 'Sin resultados';
+                list.appendChild(item);
+            }
+            list.hidden = false;
+            active = -1;
+        }
+
+        function search() {
+            const text = input.value.trim();
+            if (controller) {
+                controller.abort();
+            }
+            if (!text) {
+                close();
+                return;
+            }
+            controller = new AbortController();
+            const separator = url.includes('?') ? '&' : '?';
+            fetch(url + separator + 'q=' + encodeURIComponent(text), {
+                headers: {'Accept': 'application/json'},
+                signal: controller.signal,
+            })
+                .then(response => response.ok ? response.json() : {results: []})
+                .then(data => render(data.results))
+                .catch(() => {});
+        }
+
+        input.addEventListener('input', () => {
+            // The typed text no longer names the chosen option
+            select.value = '';
+            clearTimeout(timer);
+            timer = setTimeout(search, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (list.hidden) {
+                return;
+            }
+            if (event.key === 'ArrowDown') {
+                event.preventDefault();
+                highlight(active + 1);
+            } else if (event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active - 1);
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                list.children[active].dispatchEvent(new MouseEvent('mousedown'));
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+
+        input.addEventListener('blur', close);
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select.autocomplete-select').forEach(enhance);
+    });
+})();
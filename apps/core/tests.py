@@ -1,3 +1,80 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from apps.management_clients.models import Client
+from apps.management_properties.models import Property
+from .pagination import decode_cursor, keyset_paginate, resolve_ordering
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for the keyset (cursor) pagination helpers."""
+    
+    def setUp(self):
+        """Set up test data: names repeat, so the id has to break the ties."""
+        Client.objects.bulk_create([
+            Client(name=f"Client {index % 4}", email=f"client{index}@test.com", phone="1",
+                   is_active=index % 3 != 0)
+            for index in range(23)
+        ])
+        self.queryset = Client.objects.all()
+        self.keys = resolve_ordering(Client, ('-is_active', 'name'))
+    
+    def walk(self, per_page):
+        """Follow the next tokens from the first page, returning every page."""
+        pages = [keyset_paginate(self.queryset, self.keys, per_page)]
+        while pages[-1].has_next():
+            pages.append(keyset_paginate(self.queryset, self.keys, per_page, pages[-1].next_token))
+        return pages
+    
+    def test_resolve_ordering(self):
+        """Test the primary key closes the keyset and unusable orderings are refused."""
+        self.assertEqual(
+            [(field.name, descending) for field, descending in self.keys],
+            [('is_active', True), ('name', False), ('id', False)]
+        )
+        self.assertEqual(len(resolve_ordering(Client, ('name', '-id'))), 2)
+        self.assertIsNone(resolve_ordering(Property, ('current_owner',)))
+        self.assertIsNone(resolve_ordering(Property, ('floor_number',)))
+        self.assertIsNone(resolve_ordering(Client, ('nickname',)))
+    
+    def test_pages_forward_and_back(self):
+        """Test the pages return every row once in order, and a previous token goes back."""
+        pages = self.walk(10)
+    
+        expected = list(self.queryset.order_by('-is_active', 'name', 'id').values_list('pk', flat=True))
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertEqual([client.pk for page in pages for client in page], expected)
+        self.assertEqual([(page.has_previous(), page.has_next()) for page in pages],
+                         [(False, True), (True, True), (True, False)])
+    
+        back = keyset_paginate(self.queryset, self.keys, 10, pages[2].previous_token)
+        self.assertEqual([client.pk for client in back], [client.pk for client in pages[1]])
+        self.assertTrue(back.has_previous() and back.has_next())
+    
+    def test_page_is_one_query_without_count_or_offset(self):
+        """Test a page is read with a single LIMIT query."""
+        first = keyset_paginate(self.queryset, self.keys, 10)
+    
+        with CaptureQueriesContext(connection) as queries:
+            keyset_paginate(self.queryset, self.keys, 10, first.next_token)
+    
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+    
+    def test_invalid_cursors(self):
+        """Test tampered tokens, or tokens of another ordering, read as the first page."""
+        token = keyset_paginate(self.queryset, self.keys, 10).next_token
+    
+        self.assertEqual(decode_cursor(self.keys, token)[0], 'n')
+        self.assertEqual(decode_cursor(self.keys, token[:-2]), (None, None))
+        self.assertEqual(decode_cursor(self.keys[:2], token), (None, None))
+        self.assertEqual(decode_cursor(self.keys, None), (None, None))
+    
+        page = keyset_paginate(self.queryset, self.keys, 10, 'garbage')
+        self.assertFalse(page.has_previous())
+        self.assertEqual(
+            [client.pk for client in page],
+            [client.pk for client in keyset_paginate(self.queryset, self.keys, 10)]
+        )
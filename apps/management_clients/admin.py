@@ -1,17 +1,91 @@
 # REAL_ESTATE_MANAGER/apps/management_clients/admin.py
 
-from django.contrib import admin
-from .models import Client, PropertyOwnership
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
+from . import search
+from .duplicates import group_pairs
+from .models import Client, DuplicateCandidate, PropertyOwnership
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'phone', 'is_active']
+    list_display = ['name', 'email', 'phone', 'is_active', 'current_properties_count', 'unpaid_months_count']
     list_filter = ['is_active']
-    search_fields = ['name', 'email']
+    search_fields = ['name', 'email', 'phone']
+    readonly_fields = Client.COUNTER_FIELDS
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text client index instead of icontains scans."""
+        return search.search(queryset, search_term), False
 
 
 @admin.register(PropertyOwnership)
 class PropertyOwnershipAdmin(admin.ModelAdmin):
     list_display = ['property', 'owner', 'start_date', 'end_date']
     list_filter = ['start_date', 'end_date']
-    search_fields = ['property__property_code', 'owner__name']
\ No newline at end of file
+    search_fields = ['property__property_code', 'owner__name']
+    autocomplete_fields = ['property', 'owner']
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """Review page of the pairs found by the find_duplicate_clients command."""
+    list_display = ['first_client', 'second_client', 'score', 'name_similarity', 'same_email', 'same_phone', 'status']
+    list_filter = ['status', 'same_email', 'same_phone']
+    list_select_related = ['client_a', 'client_b']
+    readonly_fields = ['client_a', 'client_b', 'score', 'name_similarity', 'same_email', 'same_phone', 'created_at']
+    actions = ['merge_clients', 'dismiss']
+
+    def has_add_permission(self, request):
+        return False
+
+    @staticmethod
+    def describe(client):
+        return f"{client.name} <{client.email}> {client.phone} ({client.get_client_type_display()})"
+
+    @admin.display(description="Client", ordering='client_a__name')
+    def first_client(self, candidate):
+        return self.describe(candidate.client_a)
+
+    @admin.display(description="Possible duplicate", ordering='client_b__name')
+    def second_client(self, candidate):
+        return self.describe(candidate.client_b)
+
+    @admin.action(description="Mark selected pairs as not duplicates")
+    def dismiss(self, request, queryset):
+        count = queryset.update(status=DuplicateCandidate.Status.DISMISSED)
+        self.message_user(request, f"{count} pairs dismissed.", messages.SUCCESS)
+
+    @admin.action(description="Merge the clients of selected pairs")
+    def merge_clients(self, request, queryset):
+        """Show the merges the selection amounts to, then run each one in its own transaction."""
+        groups = group_pairs(queryset.values_list('client_a', 'client_b'))
+        clients = Client.objects.in_bulk({pk for group in groups for pk in group})
+        merges = []
+        for group in groups:
+            members = [clients[pk] for pk in group]
+            survivor = Client.merge_survivor(members)
+            merges.append((survivor, [client for client in members if client.pk != survivor.pk]))
+
+        if 'apply' not in request.POST:
+            return TemplateResponse(request, 'admin/management_clients/duplicatecandidate/merge_clients.html', {
+                **self.admin_site.each_context(request),
+                'title': "Merge duplicate clients",
+                'opts': self.model._meta,
+                'merges': merges,
+                'candidates': queryset,
+                'action_checkbox_name': ACTION_CHECKBOX_NAME,
+            })
+
+        merged = 0
+        for survivor, duplicates in merges:
+            try:
+                result = Client.merge_duplicates([survivor, *duplicates])
+            except ValidationError as error:
+                self.message_user(request, f"{survivor.name}: {' '.join(error.messages)}", messages.ERROR)
+            else:
+                merged += result['merged']
+        if merged:
+            self.message_user(request, f"{merged} duplicate clients merged.", messages.SUCCESS)
+        return None
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagementClientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.management_clients'
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.management_clients.signals  # noqa
@@ -0,0 +1,236 @@
+# REAL_ESTATE_MANAGER/apps/management_clients/duplicates.py
+
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from apps.core.autocomplete import query_terms
+from .normalization import national_number, normalize_email
+
+# Blocks sharing a key with more clients than this are skipped: a shared agency
+# email or a very common name would otherwise add a quadratic number of pairs
+MAX_BLOCK_SIZE = 50
+
+# Name tokens combined into pair keys; longer names keep their first ones
+MAX_NAME_TOKENS = 4
+
+# Weights of the evidence in the score, which runs from 0 to 1
+NAME_WEIGHT = 0.5
+EMAIL_WEIGHT = 0.3
+PHONE_WEIGHT = 0.2
+
+# Pairs scoring less are not reported
+MIN_SCORE = 0.55
+
+# Buckets the character trigrams of a name are hashed into
+TRIGRAM_DIMENSIONS = 256
+
+# Pairs scored at a time, which bounds the memory of the gathered name profiles
+PAIR_CHUNK = 10000
+
+# A possible duplicate: client_a_id is the lower id
+CandidatePair = namedtuple(
+    'CandidatePair', ['client_a_id', 'client_b_id', 'score', 'name_similarity', 'same_email', 'same_phone']
+)
+
+
+def name_key(name):
+    """Return the folded words of a name, sorted: 'Pérez, José' -> 'jose perez'."""
+    return ' '.join(sorted(set(query_terms(name))))
+
+
+def blocking_keys(name, email, phone):
+    """
+    Return the keys a client is blocked under: only clients sharing a key are compared.
+
+    Args:
+        name (str): Name of the client
+        email (str): Email as stored
+        phone (str): Phone as stored
+
+    Returns:
+        set: The normalized email, the national phone digits and every pair of name
+        words (the only word of a one-word name)
+    """
+    keys = set()
+    email = normalize_email(email)
+    if email:
+        keys.add(f'e:{email}')
+    digits = national_number(phone)
+    if digits:
+        keys.add(f'p:{digits}')
+
+    words = [word for word in name_key(name).split() if len(word) > 1][:MAX_NAME_TOKENS]
+    if len(words) == 1:
+        keys.add(f'n:{words[0]}')
+    keys.update(
+        f'n:{first} {second}' for position, first in enumerate(words) for second in words[position + 1:]
+    )
+    return keys
+
+
+def value_codes(values):
+    """Return an integer code for every value, equal for equal values and 0 for empty ones."""
+    codes = {}
+    return np.array([codes.setdefault(value, len(codes) + 1) if value else 0 for value in values], dtype=np.int64)
+
+
+def trigram_profiles(names, chunk_size=5000):
+    """
+    Return the character trigram counts of names, hashed into TRIGRAM_DIMENSIONS, and their norms.
+
+    Names are compared on their sorted folded words, so word order, case and
+    accents do not count. The counts are kept as bytes, a quarter of the memory of
+    floats, and built a chunk of names at a time.
+
+    Returns:
+        tuple: (uint8 matrix with one row per name, float32 array of the row norms)
+    """
+    counts = np.zeros((len(names), TRIGRAM_DIMENSIONS), dtype=np.uint8)
+    for offset in range(0, len(names), chunk_size):
+        rows, buckets = [], []
+        for row, name in enumerate(names[offset:offset + chunk_size], offset):
+            text = f'  {name_key(name)} '
+            for start in range(len(text) - 2):
+                rows.append(row)
+                buckets.append(zlib.crc32(text[start:start + 3].encode()) % TRIGRAM_DIMENSIONS)
+        np.add.at(counts, (np.array(rows, dtype=np.int64), np.array(buckets, dtype=np.int64)), 1)
+    norms = np.sqrt(np.einsum('ij,ij->i', counts, counts, dtype=np.float32))
+    return counts, norms
+
+
+def candidate_pairs(keys, rows, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Return the distinct pairs of rows sharing a blocking key.
+
+    Args:
+        keys (ndarray): Integer blocking key of every (key, row) entry
+        rows (ndarray): Row of every entry
+        max_block_size (int): Larger blocks are skipped
+
+    Returns:
+        tuple: (a, b) arrays of row pairs with a < b, and the number of skipped blocks
+    """
+    order = np.lexsort((rows, keys))
+    keys, rows = keys[order], rows[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+
+    # Blocks of the same size are expanded together: the pairs of a block of size s
+    # are the upper triangle of an s x s grid laid over its entries
+    first, second = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for size in np.unique(sizes[(sizes > 1) & (sizes <= max_block_size)]).tolist():
+        block_starts = starts[sizes == size][:, None]
+        upper, lower = np.triu_indices(size, 1)
+        first.append(rows[block_starts + upper].ravel())
+        second.append(rows[block_starts + lower].ravel())
+
+    a, b = np.concatenate(first), np.concatenate(second)
+    # Clients sharing several keys are paired once
+    width = int(rows.max(initial=0)) + 1
+    a, b = np.divmod(np.unique(np.minimum(a, b) * width + np.maximum(a, b)), width)
+    return a, b, int((sizes > max_block_size).sum())
+
+
+def find_duplicates(clients, min_score=MIN_SCORE, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Find the pairs of clients that are probably the same person.
+
+    Only the clients sharing a blocking key (see blocking_keys()) are compared, so the
+    work grows with the number of clients rather than with its square. The candidate
+    pairs are then scored at once with NumPy: the cosine similarity of their name
+    trigram profiles, plus the weights of a same email and a same phone number.
+
+    Args:
+        clients (iterable): (id, name, email, phone) rows
+        min_score (float): Lowest score reported
+        max_block_size (int): Blocks with more clients are skipped
+
+    Returns:
+        dict: 'pairs' (CandidatePair list, best score first), 'clients', 'compared'
+        (candidate pairs scored) and 'skipped_blocks'
+    """
+    ids, names, emails, phones = [], [], [], []
+    entry_keys, entry_rows = [], []
+    for row, (pk, name, email, phone) in enumerate(clients):
+        ids.append(pk)
+        names.append(name or '')
+        emails.append(normalize_email(email))
+        phones.append(national_number(phone))
+        for key in blocking_keys(name, email, phone):
+            entry_keys.append(hash(key))
+            entry_rows.append(row)
+
+    a, b, skipped = candidate_pairs(
+        np.array(entry_keys, dtype=np.int64), np.array(entry_rows, dtype=np.int64), max_block_size
+    )
+
+    # Only the clients of some candidate pair get a name profile
+    involved, positions = np.unique(np.r_[a, b], return_inverse=True)
+    profiles, norms = trigram_profiles([names[row] for row in involved.tolist()])
+    a_positions, b_positions = positions[:len(a)], positions[len(a):]
+    email_codes, phone_codes = value_codes(emails), value_codes(phones)
+
+    pairs = []
+    ids = np.array(ids, dtype=np.int64)
+    for start in range(0, len(a), PAIR_CHUNK):
+        chunk = slice(start, start + PAIR_CHUNK)
+        first, second = a[chunk], b[chunk]
+        first_profiles, second_profiles = a_positions[chunk], b_positions[chunk]
+        # Cosine similarity of the trigram profiles
+        dots = np.einsum(
+            'ij,ij->i', profiles[first_profiles], profiles[second_profiles], dtype=np.float32
+        )
+        lengths = norms[first_profiles] * norms[second_profiles]
+        name_similarity = np.divide(
+            dots, lengths, out=np.zeros_like(dots), where=lengths > 0
+        ).astype(np.float64).clip(0, 1)
+        same_email = (email_codes[first] == email_codes[second]) & (email_codes[first] != 0)
+        same_phone = (phone_codes[first] == phone_codes[second]) & (phone_codes[first] != 0)
+        scores = NAME_WEIGHT * name_similarity + EMAIL_WEIGHT * same_email + PHONE_WEIGHT * same_phone
+
+        kept = np.flatnonzero(scores >= min_score)
+        first_ids, second_ids = ids[first[kept]], ids[second[kept]]
+        pairs.extend(
+            CandidatePair(*values) for values in zip(
+                np.minimum(first_ids, second_ids).tolist(), np.maximum(first_ids, second_ids).tolist(),
+                scores[kept].round(3).tolist(), name_similarity[kept].round(3).tolist(),
+                same_email[kept].tolist(), same_phone[kept].tolist(),
+            )
+        )
+
+    pairs.sort(key=lambda pair: (-pair.score, pair.client_a_id, pair.client_b_id))
+    return {'pairs': pairs, 'clients': len(ids), 'compared': len(a), 'skipped_blocks': skipped}
+
+
+def group_pairs(pairs):
+    """
+    Group pairs of client ids into the sets of clients they connect.
+
+    Merging A-B and B-C is one merge of A, B and C.
+
+    Args:
+        pairs (iterable): (client id, client id) pairs
+
+    Returns:
+        list: Sorted lists of client ids, ordered by their first id
+    """
+    parents = {}
+
+    def root(pk):
+        parents.setdefault(pk, pk)
+        while parents[pk] != pk:
+            parents[pk] = parents[parents[pk]]
+            pk = parents[pk]
+        return pk
+
+    for first, second in pairs:
+        first, second = root(first), root(second)
+        if first != second:
+            parents[max(first, second)] = min(first, second)
+
+    groups = {}
+    for pk in parents:
+        groups.setdefault(root(pk), []).append(pk)
+    return sorted(sorted(group) for group in groups.values())
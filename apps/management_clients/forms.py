@@ -2,6 +2,7 @@
 
 from django import forms
 from .models import Client
+from .normalization import normalize_phone
 
 class ClientForm(forms.ModelForm):
     class Meta:
@@ -51,4 +52,32 @@ class OwnerForm(ClientForm):
 class TenantForm(ClientForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, client_type=Client.ClientType.TENANT, **kwargs)
-        self.fields['name'].widget.attrs['placeholder'] = 'Nombre completo del arrendatario'
\ No newline at end of file
+        self.fields['name'].widget.attrs['placeholder'] = 'Nombre completo del arrendatario'
+class ChileanPhoneField(forms.CharField):
+    """Phone field accepting any spelling of a Chilean number and cleaning to '+56 9 1234 5678'."""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return value
+        phone = normalize_phone(value)
+        if phone is None:
+            raise forms.ValidationError('Not a valid Chilean phone number', code='invalid')
+        return phone
+
+
+class ClientImportForm(forms.Form):
+    """
+    Validates and normalizes one row of a client import.
+
+    A plain form rather than a ClientForm: the import upserts on the normalized email,
+    so the model's check for an email already in use does not apply. All the cleaning
+    is done by the fields, so they can also be applied one by one.
+    """
+    name = forms.CharField(max_length=200)
+    email = forms.EmailField(max_length=254)
+    phone = ChileanPhoneField(max_length=40)
+    client_type = forms.TypedChoiceField(
+        choices=Client.ClientType.choices, required=False, empty_value=Client.ClientType.OWNER
+    )
+    is_active = forms.BooleanField(required=False)
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.management_clients import duplicates
+from apps.management_clients.models import Client, DuplicateCandidate
+
+
+class Command(BaseCommand):
+    help = 'Find the clients that are probably the same person and store them for review in the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-score', type=float, default=duplicates.MIN_SCORE,
+                            help=f'Lowest score stored, from 0 to 1 (default: {duplicates.MIN_SCORE})')
+        parser.add_argument('--max-block-size', type=int, default=duplicates.MAX_BLOCK_SIZE,
+                            help='Skip the blocking keys shared by more clients than this '
+                                 f'(default: {duplicates.MAX_BLOCK_SIZE})')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the best pairs without storing them')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['min_score'] <= 1:
+            raise CommandError('--min-score must be between 0 and 1')
+        if options['max_block_size'] < 2:
+            raise CommandError('--max-block-size must be at least 2')
+
+        clients = Client.objects.order_by('pk').values_list('pk', 'name', 'email', 'phone')
+        result = duplicates.find_duplicates(
+            clients.iterator(chunk_size=5000), options['min_score'], options['max_block_size']
+        )
+
+        # Pairs already dismissed by a reviewer are not proposed again
+        dismissed = set(DuplicateCandidate.objects.filter(
+            status=DuplicateCandidate.Status.DISMISSED
+        ).values_list('client_a', 'client_b'))
+        pairs = [pair for pair in result['pairs'] if (pair.client_a_id, pair.client_b_id) not in dismissed]
+
+        self.stdout.write(
+            f"Compared {result['compared']} candidate pairs among {result['clients']} clients "
+            f"({result['skipped_blocks']} oversized blocks skipped)."
+        )
+
+        if options['dry_run']:
+            names = Client.objects.in_bulk(
+                {pk for pair in pairs[:20] for pk in (pair.client_a_id, pair.client_b_id)}
+            )
+            for pair in pairs[:20]:
+                self.stdout.write(
+                    f'{pair.score:.2f}  {names[pair.client_a_id].name} <{names[pair.client_a_id].email}>'
+                    f'  /  {names[pair.client_b_id].name} <{names[pair.client_b_id].email}>'
+                )
+            self.stdout.write(f'Dry run: {len(pairs)} possible duplicates found.')
+            return
+
+        with transaction.atomic():
+            DuplicateCandidate.objects.filter(status=DuplicateCandidate.Status.PENDING).delete()
+            DuplicateCandidate.objects.bulk_create(
+                [DuplicateCandidate(**pair._asdict()) for pair in pairs],
+                batch_size=1000
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'{len(pairs)} possible duplicates stored for review.'))
@@ -0,0 +1,173 @@
+import csv
+import os
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.management_clients import search
+from apps.management_clients.forms import ClientImportForm
+from apps.management_clients.models import Client
+from apps.management_clients.normalization import normalize_email
+
+# Values accepted as "yes" in the is_active column
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'si', 'sí', 'x'}
+
+REQUIRED_COLUMNS = ('name', 'email', 'phone')
+OPTIONAL_COLUMNS = ('client_type', 'is_active')
+
+# Rows are cleaned with the fields of ClientImportForm directly: binding a form per
+# row deep-copies its fields, which took most of the import time
+IMPORT_FIELDS = ClientImportForm.base_fields
+
+
+class Command(BaseCommand):
+    help = 'Import clients from a CSV file, updating the clients whose email already exists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the CSV file (columns: name, email, phone, '
+                                         'and optionally client_type and is_active)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Clients upserted per statement and transaction (default: 1000)')
+        parser.add_argument('--errors', help='Path of the error report (default: <path>.errors.csv)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='File encoding (default: utf-8-sig)')
+        parser.add_argument('--delimiter', help='Field delimiter (default: detected from the header)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only validate the file and count the changes, without saving anything')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        error_path = options['errors'] or f'{path}.errors.csv'
+        created = updated = rejected = 0
+        # A dry run saves nothing, so the emails created by its earlier batches are
+        # carried along for the later ones to count as updates, like a real run would
+        created_keys = set()
+
+        try:
+            with open(path, encoding=options['encoding'], newline='') as source:
+                header = source.readline()
+                delimiter = options['delimiter'] or max((',', ';', '\t'), key=header.count)
+                columns = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter), [])]
+                missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+                if missing:
+                    raise CommandError(f"Missing columns in the CSV header: {', '.join(missing)}")
+
+                # Columns absent from the file keep their stored values on update
+                update_fields = ['name', 'email', 'phone', 'updated_at']
+                update_fields += [name for name in OPTIONAL_COLUMNS if name in columns]
+
+                with open(error_path, 'w', encoding='utf-8', newline='') as report:
+                    error_writer = csv.writer(report)
+                    error_writer.writerow(['line', 'field', 'message'])
+
+                    rows = self.read_rows(csv.DictReader(source, fieldnames=columns, delimiter=delimiter))
+                    while True:
+                        chunk = list(islice(rows, batch_size))
+                        if not chunk:
+                            break
+
+                        # A later row of the same batch replaces an earlier one with the same email
+                        batch = {}
+                        for line_number, row in chunk:
+                            client, row_errors = self.build_client(row, columns)
+                            if row_errors:
+                                rejected += 1
+                                for field, message in row_errors:
+                                    error_writer.writerow([line_number, field, message])
+                            else:
+                                updated += client.normalized_email in batch
+                                batch[client.normalized_email] = client
+
+                        if batch:
+                            batch_created = self.upsert_batch(list(batch.values()), update_fields,
+                                                              options['dry_run'], created_keys)
+                            created += batch_created
+                            updated += len(batch) - batch_created
+                        self.stdout.write(f'{created} created, {updated} updated, {rejected} rejected...')
+        except OSError as error:
+            raise CommandError(error)
+
+        if not options['dry_run']:
+            search.autocomplete_cache.clear()
+        if not rejected:
+            os.remove(error_path)
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        message = f'{prefix}{created} clients created, {updated} updated, {rejected} rows rejected.'
+        if rejected:
+            message += f' See {error_path}.'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def read_rows(self, reader):
+        """Yield (line_number, row dict) pairs without loading the file in memory."""
+        for row in reader:
+            if not any((value or '').strip() for value in row.values() if isinstance(value, str)):
+                continue
+            # The header was read before the reader was created
+            yield reader.line_num + 1, row
+
+    def build_client(self, row, columns):
+        """
+        Validate and normalize a row.
+
+        Returns:
+            tuple: (unsaved Client or None, list of (field, message) errors)
+        """
+        data = {name: (row.get(name) or '').strip() for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+        data['client_type'] = data['client_type'].upper()
+        data['is_active'] = data['is_active'].lower() in TRUE_VALUES if 'is_active' in columns else True
+
+        values, errors = {}, []
+        for name, field in IMPORT_FIELDS.items():
+            try:
+                values[name] = field.clean(data[name])
+            except ValidationError as error:
+                errors.extend((name, message) for message in error.messages)
+        if errors:
+            return None, errors
+
+        return Client(
+            name=values['name'],
+            # The email is kept as given; only the key is lowercased
+            email=values['email'],
+            normalized_email=normalize_email(values['email']),
+            phone=values['phone'],
+            client_type=values['client_type'],
+            is_active=values['is_active'],
+        ), []
+
+    def upsert_batch(self, clients, update_fields, dry_run=False, created_keys=None):
+        """
+        Insert or update a batch of clients in one transaction, keyed on the normalized email.
+
+        Args:
+            created_keys (set, optional): Emails created by the earlier batches of a dry
+                run, counted as existing; the emails this batch would create are added
+
+        Returns:
+            int: Number of clients created; the others updated an existing client
+        """
+        keys = [client.normalized_email for client in clients]
+        with transaction.atomic():
+            existing = set(Client.objects.filter(normalized_email__in=keys).values_list(
+                'normalized_email', flat=True
+            ))
+            if not dry_run:
+                Client.objects.bulk_create(
+                    clients,
+                    update_conflicts=True,
+                    unique_fields=['normalized_email'],
+                    update_fields=update_fields,
+                )
+                # bulk_create skips the post_save signal that keeps the search index in sync;
+                # it sets the primary keys of inserted and updated rows on SQLite and PostgreSQL
+                search.index_clients(clients)
+        if dry_run and created_keys is not None:
+            existing.update(created_keys.intersection(keys))
+            created_keys.update(key for key in keys if key not in existing)
+        return len(clients) - len(existing)
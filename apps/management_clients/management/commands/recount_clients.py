@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.management_clients.models import Client
+
+
+class Command(BaseCommand):
+    help = 'Repair the portfolio counters of the clients that drifted from the counted rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many clients have wrong counters without fixing them')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ids = list(Client.counter_drift().values_list('pk', flat=True))
+            if options['dry_run']:
+                self.stdout.write(f'Dry run: {len(ids)} clients have wrong counters.')
+                return
+            Client.recount_counters(ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted {len(ids)} clients.'))
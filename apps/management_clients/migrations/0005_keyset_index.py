@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0004_rename_client_type_idx_management__client__95b1f0_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_type', '-is_active', 'name', 'id'], name='management__client__128d00_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+TABLE = 'management_clients_propertyownership'
+
+# A new or changed period must not share a day with another period of its property
+OVERLAP_CONDITION = (
+    f"EXISTS (SELECT 1 FROM {TABLE} AS other "
+    "WHERE other.property_id = NEW.property_id AND other.id IS NOT NEW.id "
+    "AND (NEW.end_date IS NULL OR other.start_date < NEW.end_date) "
+    "AND (other.end_date IS NULL OR other.end_date > NEW.start_date))"
+)
+
+
+def repair_periods(apps, schema_editor):
+    """
+    Make the existing periods valid before the constraints are added: a period ending
+    before it starts becomes empty, and a period running into the next one of its
+    property is cut at the start of the next one.
+    """
+    PropertyOwnership = apps.get_model('management_clients', 'PropertyOwnership')
+
+    repaired = []
+    previous = None
+    periods = PropertyOwnership.objects.order_by('property_id', 'start_date', 'id').iterator()
+    for period in periods:
+        if period.end_date is not None and period.end_date < period.start_date:
+            period.end_date = period.start_date
+            repaired.append(period)
+        if previous is not None and previous.property_id == period.property_id and (
+            previous.end_date is None or previous.end_date > period.start_date
+        ):
+            previous.end_date = period.start_date
+            repaired.append(previous)
+        previous = period
+
+    PropertyOwnership.objects.bulk_update(repaired, ['end_date'], batch_size=500)
+
+
+def create_overlap_triggers(apps, schema_editor):
+    """
+    Reject overlapping periods in the database (SQLite only; other databases rely on clean()).
+
+    SQLite drops the triggers of a table it rebuilds, so a later migration altering
+    this table has to run this function again.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for event in ('INSERT', 'UPDATE'):
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLE}_no_overlap_{event.lower()} "
+            f"BEFORE {event} ON {TABLE} WHEN {OVERLAP_CONDITION} "
+            "BEGIN SELECT RAISE(ABORT, 'Overlapping property ownership periods'); END"
+        )
+
+
+def drop_overlap_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for event in ('insert', 'update'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLE}_no_overlap_{event}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0005_keyset_index'),
+        ('management_properties', '0008_property_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_periods, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertyownership',
+            index=models.Index(fields=['property', 'start_date', 'end_date'], name='management__propert_c7c5df_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='propertyownership',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__isnull', True), ('end_date__gte', models.F('start_date')), _connector='OR'), name='ownership_end_after_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='propertyownership',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_date__isnull', True)), fields=('property',), name='ownership_single_open_period'),
+        ),
+        migrations.RunPython(create_overlap_triggers, drop_overlap_triggers),
+    ]
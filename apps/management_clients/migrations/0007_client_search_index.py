@@ -0,0 +1,49 @@
+import re
+
+from django.db import migrations
+
+INDEX_TABLE = 'management_clients_client_fts'
+
+
+def phone_tokens(phone):
+    """Digits of a phone number, with and without the country code (see search.phone_tokens)."""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits if len(digits) <= 9 else f'{digits} {digits[-9:]}'
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the FTS5 client index (SQLite only; other databases use icontains)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+        "name, email, phone, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')"
+    )
+
+    Client = apps.get_model('management_clients', 'Client')
+    rows = [
+        (pk, name or '', email or '', phone_tokens(phone))
+        for pk, name, email, phone in Client.objects.values_list('pk', 'name', 'email', 'phone').iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {INDEX_TABLE} (rowid, name, email, phone) VALUES (%s, %s, %s, %s)", rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0006_ownership_intervals'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_portfolios(apps, schema_editor):
+    """Fill the new counters of every client from the counted rows."""
+    Client = apps.get_model('management_clients', 'Client')
+    Property = apps.get_model('management_properties', 'Property')
+    RentalAgreement = apps.get_model('management_rentals', 'RentalAgreement')
+    MonthlyRental = apps.get_model('management_rentals', 'MonthlyRental')
+
+    def count(queryset, field):
+        counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+        return Coalesce(Subquery(counts), 0)
+
+    active_agreements = RentalAgreement.objects.filter(is_active=True)
+    unpaid_months = MonthlyRental.objects.filter(rent_status='unpaid')
+    Client.objects.update(
+        current_properties_count=count(Property.objects.all(), 'current_owner'),
+        active_owner_agreements_count=count(active_agreements, 'owner'),
+        active_tenant_agreements_count=count(active_agreements, 'tenant'),
+        unpaid_months_count=(
+            count(unpaid_months, 'rental_agreement__owner') + count(unpaid_months, 'rental_agreement__tenant')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0007_client_search_index'),
+        ('management_properties', '0008_property_updated_at_index'),
+        ('management_rentals', '0010_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='active_owner_agreements_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Active rental agreements where the client is the owner'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='active_tenant_agreements_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Active rental agreements where the client is the tenant'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='current_properties_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Properties the client currently owns'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='unpaid_months_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Unpaid monthly rentals of the client's agreements, as owner or tenant"),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_type', '-current_properties_count', 'name', 'id'], name='management__client__9592ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['client_type', '-unpaid_months_count', 'name', 'id'], name='management__client__786e13_idx'),
+        ),
+        migrations.RunPython(count_portfolios, migrations.RunPython.noop),
+    ]
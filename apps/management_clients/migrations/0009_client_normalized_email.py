@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Fill the normalized email of every client. When several clients share an address
+    the oldest one keeps the key; the others are left without one until merged.
+    """
+    Client = apps.get_model('management_clients', 'Client')
+
+    seen = set()
+    batch = []
+    for client in Client.objects.only('email').order_by('pk').iterator(chunk_size=2000):
+        key = (client.email or '').strip().lower() or None
+        if key in seen:
+            continue
+        seen.add(key)
+        client.normalized_email = key
+        batch.append(client)
+        if len(batch) == 2000:
+            Client.objects.bulk_update(batch, ['normalized_email'])
+            batch = []
+    Client.objects.bulk_update(batch, ['normalized_email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0008_client_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='normalized_email',
+            field=models.CharField(editable=False, help_text='Trimmed, lowercased email: the key imports upsert on', max_length=254, null=True),
+        ),
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='client',
+            name='normalized_email',
+            field=models.CharField(editable=False, help_text='Trimmed, lowercased email: the key imports upsert on', max_length=254, null=True, unique=True),
+        ),
+    ]
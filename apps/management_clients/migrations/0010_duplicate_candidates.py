@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0009_client_normalized_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Likelihood that both clients are the same person, from 0 to 1')),
+                ('name_similarity', models.FloatField(help_text='Similarity of the names, from 0 to 1')),
+                ('same_email', models.BooleanField(default=False)),
+                ('same_phone', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending review'), ('DISMISSED', 'Not duplicates')], default='PENDING', max_length=9)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client_a', models.ForeignKey(help_text='The client of the pair with the lower id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='management_clients.client')),
+                ('client_b', models.ForeignKey(help_text='The client of the pair with the higher id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='management_clients.client')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['status', '-score', 'id'], name='management__status_fba2ab_idx')],
+                'constraints': [models.UniqueConstraint(fields=('client_a', 'client_b'), name='duplicate_candidate_unique_pair'), models.CheckConstraint(condition=models.Q(('client_a__lt', models.F('client_b'))), name='duplicate_candidate_ordered_pair')],
+            },
+        ),
+    ]
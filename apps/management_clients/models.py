@@ -1,6 +1,9 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import EmailValidator
+from django.utils import timezone
 from apps.management_properties.models import Property
+from .normalization import normalize_email
 
 class Client(models.Model):
     """
@@ -23,6 +26,13 @@ class Client(models.Model):
         max_length=20,
         help_text="Contact phone number"
     )
+    normalized_email = models.CharField(
+        max_length=254,
+        unique=True,
+        null=True,
+        editable=False,
+        help_text="Trimmed, lowercased email: the key imports upsert on"
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Indicates if the client is currently active in the system"
@@ -36,6 +46,35 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Portfolio counters, maintained in the same transaction as the rows they count:
+    # single saves and deletes apply their difference through signals, and bulk
+    # operations call recount_counters() for the clients they touched
+    current_properties_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Properties the client currently owns"
+    )
+    active_owner_agreements_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Active rental agreements where the client is the owner"
+    )
+    active_tenant_agreements_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Active rental agreements where the client is the tenant"
+    )
+    unpaid_months_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Unpaid monthly rentals of the client's agreements, as owner or tenant"
+    )
+
+    COUNTER_FIELDS = (
+        'current_properties_count', 'active_owner_agreements_count',
+        'active_tenant_agreements_count', 'unpaid_months_count',
+    )
+
     def __str__(self):
         display_type = 'dueño' if self.client_type == self.ClientType.OWNER else 'arrendatario'
         return f"{self.name} ({display_type})"
@@ -47,8 +86,49 @@ class Client(models.Model):
         # Add index for client_type for better query performance
         indexes = [
             models.Index(fields=['client_type']),
+            # Matches the owner filter and keyset ordering of the client list
+            models.Index(fields=['client_type', '-is_active', 'name', 'id']),
+            # Match the counter orderings of the client list
+            models.Index(fields=['client_type', '-current_properties_count', 'name', 'id']),
+            models.Index(fields=['client_type', '-unpaid_months_count', 'name', 'id']),
         ]
 
+    def _email_key(self):
+        """
+        Return the normalized email to store on save.
+
+        Migration 0009 left the later clients sharing an address without a key. While
+        its email is unchanged and another client holds the key, such a legacy
+        duplicate keeps none, so it can still be edited until it is merged.
+        """
+        key = normalize_email(self.email)
+        if key is None or self._state.adding or key == self.normalized_email:
+            return key
+        if not Client.objects.filter(normalized_email=key).exclude(pk=self.pk).exists():
+            return key
+        stored_email = Client.objects.filter(pk=self.pk).values_list('email', flat=True).first()
+        return None if normalize_email(stored_email) == key else key
+
+    def clean(self):
+        """Reject an email already used by another client, whatever its case or spacing."""
+        key = self._email_key()
+        if key and Client.objects.filter(normalized_email=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'email': 'A client with this email already exists.'})
+
+    def save(self, *args, **kwargs):
+        self.normalized_email = self._email_key()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_email'}
+        # The counters are written by their own UPDATEs: saving an instance loaded
+        # before one of them ran must not put the stale values back
+        elif not self._state.adding and update_fields is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def is_owner(self):
         """Convenience method to check if client is an owner"""
@@ -59,11 +139,190 @@ class Client(models.Model):
         """Convenience method to check if client is a tenant"""
         return self.client_type == self.ClientType.TENANT
 
+    @classmethod
+    def update_counters(cls, changes):
+        """
+        Apply counter differences, one UPDATE per client.
+
+        Args:
+            changes (iterable): (client_id, counter field, delta) triples; entries without
+                a client are ignored
+        """
+        from collections import defaultdict
+
+        deltas = defaultdict(lambda: defaultdict(int))
+        for client_id, field, delta in changes:
+            if client_id:
+                deltas[client_id][field] += delta
+
+        for client_id, delta in deltas.items():
+            delta = {field: value for field, value in delta.items() if value}
+            if delta:
+                cls.objects.filter(pk=client_id).update(
+                    **{field: models.F(field) + value for field, value in delta.items()}
+                )
+
+    @classmethod
+    def expected_counters(cls):
+        """
+        Return the expressions computing every counter from the counted rows.
+
+        Each one is a correlated subquery served by a foreign key index, so only the
+        clients being recounted are looked at.
+        """
+        from django.db.models.functions import Coalesce
+        from apps.management_rentals.models import MonthlyRental, RentalAgreement
+
+        def count(queryset, field):
+            counts = queryset.filter(**{field: models.OuterRef('pk')}).order_by().values(field).annotate(
+                count=models.Count('pk')
+            ).values('count')
+            return Coalesce(models.Subquery(counts), 0)
+
+        active_agreements = RentalAgreement.objects.filter(is_active=True)
+        unpaid_months = MonthlyRental.objects.filter(rent_status=MonthlyRental.UNPAID)
+        return {
+            'current_properties_count': count(Property.objects.all(), 'current_owner'),
+            'active_owner_agreements_count': count(active_agreements, 'owner'),
+            'active_tenant_agreements_count': count(active_agreements, 'tenant'),
+            'unpaid_months_count': (
+                count(unpaid_months, 'rental_agreement__owner') + count(unpaid_months, 'rental_agreement__tenant')
+            ),
+        }
+
+    @classmethod
+    def recount_counters(cls, client_ids, batch_size=500):
+        """
+        Recompute the counters of the given clients, used by bulk operations that
+        bypass the per-record signals.
+
+        Args:
+            client_ids (iterable): Ids of the clients to recount; None entries are ignored
+            batch_size (int): Clients updated per UPDATE statement
+
+        Returns:
+            int: Number of clients recounted
+        """
+        client_ids = sorted({pk for pk in client_ids if pk})
+        expressions = cls.expected_counters()
+        count = 0
+        for start in range(0, len(client_ids), batch_size):
+            count += cls.objects.filter(pk__in=client_ids[start:start + batch_size]).update(**expressions)
+        return count
+
+    @classmethod
+    def counter_drift(cls):
+        """Return the clients whose stored counters differ from the counted rows."""
+        expected = {f'expected_{field}': expression for field, expression in cls.expected_counters().items()}
+        return cls.objects.annotate(**expected).exclude(
+            **{field: models.F(f'expected_{field}') for field in cls.COUNTER_FIELDS}
+        )
+
+    @staticmethod
+    def merge_survivor(clients):
+        """Return the client a group of duplicates is merged into: the oldest one."""
+        return min(clients, key=lambda client: client.pk)
+
+    @classmethod
+    def merge_duplicates(cls, clients):
+        """
+        Merge clients that are the same person into one of them, in one transaction.
+
+        The properties, ownership periods and rental agreements of the duplicates are
+        moved to the surviving client (see merge_survivor()) with one UPDATE per
+        foreign key, then the duplicates are deleted.
+
+        Args:
+            clients (iterable): Clients (or client IDs) to merge, at least two
+
+        Returns:
+            dict: The surviving 'client' and the numbers of 'merged' clients,
+            'properties', 'ownerships' and 'rental_agreements' moved
+
+        Raises:
+            ValidationError: If fewer than two of the clients exist, they are not all of
+                the same type, or some are the owner and the tenant of the same rental agreement
+        """
+        from django.db import transaction
+        from apps.management_rentals.models import RentalAgreement
+
+        ids = {getattr(item, 'pk', item) for item in clients}
+        with transaction.atomic():
+            clients = list(cls.objects.select_for_update().filter(pk__in=ids).order_by('pk'))
+            if len(clients) < 2:
+                raise ValidationError('Select at least two existing clients to merge.')
+            ids = [client.pk for client in clients]
+
+            # Rental agreements only take owners as owners and tenants as tenants
+            if len({client.client_type for client in clients}) > 1:
+                raise ValidationError('Owners and tenants cannot be merged: change the type of one of them first.')
+
+            shared = list(RentalAgreement.objects.filter(owner_id__in=ids, tenant_id__in=ids).values_list(
+                'property__property_code', flat=True
+            ))
+            if shared:
+                raise ValidationError(
+                    f"These clients are the owner and the tenant of the rental agreements of "
+                    f"{', '.join(shared)}: they cannot be merged."
+                )
+
+            survivor = cls.merge_survivor(clients)
+            duplicate_ids = [pk for pk in ids if pk != survivor.pk]
+
+            # QuerySet.update() skips auto_now, so set updated_at explicitly: the
+            # in-memory property snapshots sync on it
+            now = timezone.now()
+            properties = Property.objects.filter(current_owner_id__in=duplicate_ids).update(
+                current_owner=survivor, updated_at=now
+            )
+            ownerships = PropertyOwnership.objects.filter(owner_id__in=duplicate_ids).update(owner=survivor)
+            agreements = RentalAgreement.objects.filter(owner_id__in=duplicate_ids).update(
+                owner=survivor, updated_at=now
+            )
+            agreements += RentalAgreement.objects.filter(tenant_id__in=duplicate_ids).update(
+                tenant=survivor, updated_at=now
+            )
+
+            # Nothing protects the duplicates any more; deleting them one by one sends
+            # the signals that drop them from the search index
+            cls.objects.filter(pk__in=duplicate_ids).delete()
+
+            updates = {'is_active': any(client.is_active for client in clients), 'updated_at': now}
+            # A legacy duplicate left without the email key takes it over from its twin
+            key = normalize_email(survivor.email)
+            if survivor.normalized_email != key and not cls.objects.filter(normalized_email=key).exists():
+                updates['normalized_email'] = key
+            cls.objects.filter(pk=survivor.pk).update(**updates)
+
+            # update() bypasses the signals
+            cls.recount_counters([survivor.pk])
+
+        survivor.refresh_from_db()
+        return {
+            'client': survivor,
+            'merged': len(duplicate_ids),
+            'properties': properties,
+            'ownerships': ownerships,
+            'rental_agreements': agreements,
+        }
+
+
+class PropertyOwnershipQuerySet(models.QuerySet):
+    def as_of(self, date):
+        """Ownership periods covering a date: started on or before it and not ended yet."""
+        return self.filter(start_date__lte=date).filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gt=date)
+        )
+
 
 class PropertyOwnership(models.Model):
     """
     Historical record of property ownership.
     Tracks when properties change hands between owners.
+
+    A period runs from start_date up to, but not including, end_date: on a transfer
+    date the property belongs to the new owner. Periods of a property never overlap,
+    so at most one of them covers any date.
     """
     property = models.ForeignKey(
         Property,
@@ -87,6 +346,8 @@ class PropertyOwnership(models.Model):
         help_text="Date when ownership ended (if applicable)"
     )
 
+    objects = PropertyOwnershipQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.property} owned by {self.owner} ({self.start_date})"
 
@@ -94,10 +355,242 @@ class PropertyOwnership(models.Model):
         verbose_name = "Property Ownership"
         verbose_name_plural = "Property Ownerships"
         ordering = ['-start_date']
+        indexes = [
+            # Matches the point-in-time lookups of owners_at()
+            models.Index(fields=['property', 'start_date', 'end_date']),
+        ]
+        # Overlapping periods are rejected by clean() and, on SQLite, by the triggers
+        # created in migration 0006
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__isnull=True) | models.Q(end_date__gte=models.F('start_date')),
+                name='ownership_end_after_start',
+            ),
+            models.UniqueConstraint(
+                fields=['property'],
+                condition=models.Q(end_date__isnull=True),
+                name='ownership_single_open_period',
+            ),
+        ]
 
     def clean(self):
-        """Ensure only owners can be assigned to PropertyOwnership"""
-        if self.owner and not self.owner.is_owner:
-            raise models.ValidationError({
+        """Ensure only owners can be assigned to PropertyOwnership, for non-overlapping periods"""
+        if self.owner_id and not self.owner.is_owner:
+            raise ValidationError({
                 'owner': 'Only property owners can be assigned to property ownerships.'
-            })
\ No newline at end of file
+            })
+
+        if self.property_id and self.start_date:
+            overlapping = self.overlapping_periods().first()
+            if overlapping:
+                raise ValidationError(
+                    f"This period overlaps the ownership of {overlapping.owner} "
+                    f"starting {overlapping.start_date:%Y-%m-%d}."
+                )
+
+    def overlapping_periods(self):
+        """Return the other ownership periods of the property sharing at least one day with this one."""
+        periods = PropertyOwnership.objects.filter(property_id=self.property_id).exclude(pk=self.pk)
+        if self.end_date is not None:
+            periods = periods.filter(start_date__lt=self.end_date)
+        return periods.filter(models.Q(end_date__isnull=True) | models.Q(end_date__gt=self.start_date))
+
+    @classmethod
+    def owners_at(cls, date, properties=None):
+        """
+        Resolve who owned properties on a date, with a single query.
+
+        Args:
+            date (date): The date to resolve
+            properties (iterable, optional): Properties (or property IDs). Defaults to
+                every property with an ownership record.
+
+        Returns:
+            dict: Property ID -> owning Client, for the properties owned on that date
+        """
+        periods = cls.objects.as_of(date)
+        if properties is not None:
+            periods = periods.filter(property_id__in={getattr(item, 'pk', item) for item in properties})
+        return {period.property_id: period.owner for period in periods.select_related('owner').order_by()}
+
+    @classmethod
+    def resolve_owners(cls, lookups):
+        """
+        Resolve the owner of each (property, date) pair, with a single query.
+
+        The pairs are grouped by date, so the query has one condition per distinct
+        date rather than per property.
+
+        Args:
+            lookups (iterable): (property or property ID, date) pairs
+
+        Returns:
+            dict: (property ID, date) -> owning Client, or None if nobody owned the
+            property on that date
+        """
+        properties_by_date = {}
+        dates_by_property = {}
+        for item, date in lookups:
+            pk = getattr(item, 'pk', item)
+            properties_by_date.setdefault(date, set()).add(pk)
+            dates_by_property.setdefault(pk, set()).add(date)
+
+        owners = dict.fromkeys((pk, date) for pk, dates in dates_by_property.items() for date in dates)
+        if not owners:
+            return owners
+
+        condition = models.Q()
+        for date, property_ids in properties_by_date.items():
+            condition |= models.Q(property_id__in=property_ids, start_date__lte=date) & (
+                models.Q(end_date__isnull=True) | models.Q(end_date__gt=date)
+            )
+
+        for period in cls.objects.filter(condition).select_related('owner').order_by():
+            # A period may cover several of the requested dates of its property
+            for date in dates_by_property[period.property_id]:
+                if period.start_date <= date and (period.end_date is None or period.end_date > date):
+                    owners[period.property_id, date] = period.owner
+        return owners
+
+    @classmethod
+    def transfer_portfolio(cls, from_owner, to_owner, properties=None, date=None):
+        """
+        Transfer several properties of an owner to another owner in one transaction.
+
+        The open ownership periods are closed and the new ones created with a single
+        query each, and the active rental agreements of the properties are moved to
+        the new owner together with the properties themselves.
+
+        Args:
+            from_owner (Client): The current owner of the properties
+            to_owner (Client): The new owner
+            properties (iterable, optional): Properties (or property IDs) to transfer.
+                Defaults to every property of from_owner.
+            date (date, optional): Date of the transfer. Defaults to today.
+
+        Returns:
+            dict: Numbers of 'properties' and 'rental_agreements' transferred
+
+        Raises:
+            ValidationError: If to_owner cannot receive the properties, a property does
+                not belong to from_owner, or an open ownership period starts after date
+        """
+        from django.db import transaction
+        from apps.management_rentals.models import RentalAgreement
+
+        date = date or timezone.now().date()
+
+        if not to_owner.is_owner:
+            raise ValidationError({'to_owner': 'Only property owners can receive properties.'})
+        if to_owner.pk == from_owner.pk:
+            raise ValidationError({'to_owner': 'The new owner must be a different client.'})
+
+        with transaction.atomic():
+            selected = Property.objects.select_for_update()
+            if properties is None:
+                selected = selected.filter(current_owner=from_owner)
+            else:
+                selected = selected.filter(pk__in={getattr(item, 'pk', item) for item in properties})
+            rows = list(selected.order_by('pk').values_list('pk', 'property_code', 'current_owner_id'))
+
+            foreign = [code for _, code, owner_id in rows if owner_id != from_owner.pk]
+            if foreign:
+                raise ValidationError(
+                    f"These properties do not belong to {from_owner.name}: {', '.join(foreign)}"
+                )
+            ids = [pk for pk, _, _ in rows]
+            if not ids:
+                return {'properties': 0, 'rental_agreements': 0}
+
+            open_periods = cls.objects.filter(property_id__in=ids, end_date=None)
+            late = list(open_periods.filter(start_date__gt=date).values_list(
+                'property__property_code', flat=True
+            ))
+            if late:
+                raise ValidationError(
+                    f"The ownership of {', '.join(late)} started after {date:%Y-%m-%d}."
+                )
+
+            agreements = RentalAgreement.objects.filter(property_id__in=ids, is_active=True)
+            if agreements.filter(tenant=to_owner).exists():
+                raise ValidationError({
+                    'to_owner': 'The new owner is the tenant of an active rental agreement of these properties.'
+                })
+
+            # Every open period closes on the same date: one UPDATE instead of a
+            # bulk_update of per-row values
+            open_periods.update(end_date=date)
+            cls.objects.bulk_create(
+                [cls(property_id=pk, owner=to_owner, start_date=date) for pk in ids],
+                batch_size=500
+            )
+
+            # QuerySet.update() skips auto_now, so set updated_at explicitly: the
+            # in-memory property snapshots sync on it
+            now = timezone.now()
+            Property.objects.filter(pk__in=ids).update(current_owner=to_owner, updated_at=now)
+            agreement_count = agreements.update(owner=to_owner, updated_at=now)
+
+            # update() bypasses the signals, so recount both owners
+            Client.recount_counters([from_owner.pk, to_owner.pk])
+
+        return {'properties': len(ids), 'rental_agreements': agreement_count}
+
+
+class DuplicateCandidate(models.Model):
+    """
+    A pair of clients that may be the same person, found by find_duplicate_clients
+    and reviewed in the admin.
+
+    Pending pairs are replaced on every run; dismissed ones are kept so the same pair
+    is not proposed again. Merging deletes the duplicate, and its pairs with it.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending review'
+        DISMISSED = 'DISMISSED', 'Not duplicates'
+
+    client_a = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="The client of the pair with the lower id"
+    )
+    client_b = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="The client of the pair with the higher id"
+    )
+    score = models.FloatField(
+        help_text="Likelihood that both clients are the same person, from 0 to 1"
+    )
+    name_similarity = models.FloatField(
+        help_text="Similarity of the names, from 0 to 1"
+    )
+    same_email = models.BooleanField(default=False)
+    same_phone = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=9,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.client_a.name} / {self.client_b.name} ({self.score:.2f})"
+
+    class Meta:
+        ordering = ['-score', 'id']
+        verbose_name = "Duplicate Candidate"
+        verbose_name_plural = "Duplicate Candidates"
+        indexes = [
+            # Matches the review list: pending pairs, best score first
+            models.Index(fields=['status', '-score', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['client_a', 'client_b'], name='duplicate_candidate_unique_pair'),
+            models.CheckConstraint(
+                condition=models.Q(client_a__lt=models.F('client_b')),
+                name='duplicate_candidate_ordered_pair',
+            ),
+        ]
@@ -0,0 +1,66 @@
+# REAL_ESTATE_MANAGER/apps/management_clients/normalization.py
+
+import re
+
+NON_DIGIT_RE = re.compile(r'\D')
+
+# Chilean numbers: country code, then nine national digits (a leading 9 for mobiles,
+# the area code for landlines)
+COUNTRY_CODE = '56'
+NATIONAL_NUMBER_LENGTH = 9
+
+
+def normalize_email(email):
+    """
+    Return the comparison key of an email address: trimmed and lowercased.
+
+    Args:
+        email (str): The email as typed or exported
+
+    Returns:
+        str: The normalized address, or None if it is empty
+    """
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def national_number(phone):
+    """
+    Return the nine national digits of a Chilean phone number.
+
+    Accepts the usual spellings of the same number: '+56 9 1234 5678',
+    '0056912345678', '56-9-1234-5678', '(09) 1234 5678' and '912345678'.
+
+    Args:
+        phone (str): The phone number as typed or exported
+
+    Returns:
+        str: The national digits, or None if the text is not a Chilean number
+    """
+    digits = NON_DIGIT_RE.sub('', phone or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == NATIONAL_NUMBER_LENGTH + len(COUNTRY_CODE) and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    elif len(digits) == NATIONAL_NUMBER_LENGTH + 1 and digits.startswith('0'):
+        # Old trunk prefix
+        digits = digits[1:]
+    if len(digits) != NATIONAL_NUMBER_LENGTH or digits[0] in '01':
+        return None
+    return digits
+
+
+def normalize_phone(phone):
+    """
+    Format a Chilean phone number as '+56 9 1234 5678'.
+
+    Args:
+        phone (str): The phone number as typed or exported
+
+    Returns:
+        str: The formatted number, or None if the text is not a Chilean number
+    """
+    digits = national_number(phone)
+    if digits is None:
+        return None
+    return f'+{COUNTRY_CODE} {digits[0]} {digits[1:5]} {digits[5:]}'
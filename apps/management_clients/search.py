@@ -0,0 +1,239 @@
+# REAL_ESTATE_MANAGER/apps/management_clients/search.py
+
+import re
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from apps.core.autocomplete import AutocompleteResult, PrefixCache
+from apps.core.autocomplete import query_terms as word_terms
+from apps.management_properties.search import WORD_RE, build_match_query
+from .normalization import NON_DIGIT_RE, national_number
+
+# FTS5 table mirroring the searchable client columns; its rowid is the client id.
+# The unicode61 tokenizer folds case and accents, and the prefix indexes serve the
+# one to three character prefixes typed first
+INDEX_TABLE = 'management_clients_client_fts'
+INDEX_COLUMNS = ('name', 'email', 'phone')
+
+INSERT_SQL = f'INSERT INTO {INDEX_TABLE} (rowid, {", ".join(INDEX_COLUMNS)}) VALUES (%s, %s, %s, %s)'
+
+# Matches fetched up front: a rare search is resolved by primary key lookups, while
+# filtering on a subquery would scan the clients in list order probing every one
+ID_LIST_LIMIT = 1000
+
+# Text made only of these characters is searched as a phone number
+PHONE_RE = re.compile(r'^[\d\s+().-]+$')
+
+
+def is_available():
+    """
+    Return whether the full-text index exists (SQLite with FTS5 only).
+
+    The table list is read once per database connection, not on every save and search.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+
+    connection.ensure_connection()
+    checked = getattr(connection, 'client_index_checked', None)
+    if checked is None or checked[0] is not connection.connection:
+        checked = (connection.connection, INDEX_TABLE in connection.introspection.table_names())
+        connection.client_index_checked = checked
+    return checked[1]
+
+
+def phone_tokens(phone):
+    """
+    Return the indexed form of a phone number: its digits, and its national number
+    (see normalization.national_number()) when that differs.
+
+    Args:
+        phone (str): The phone number as stored
+
+    Returns:
+        str: Space separated tokens, e.g. '56912345678 912345678'
+    """
+    digits = NON_DIGIT_RE.sub('', phone or '')
+    national = national_number(digits)
+    return digits if national in (None, digits) else f'{digits} {national}'
+
+
+def build_client_match_query(text):
+    """
+    Turn free text into a safe FTS5 query over the client index.
+
+    A phone number typed with spaces or symbols ('+56 9 1234') is searched as the
+    prefix of its digits; anything else is searched word by word, as prefixes.
+
+    Args:
+        text (str): The search text typed by the user
+
+    Returns:
+        str: The MATCH expression, or '' if the text has no words
+    """
+    if is_phone_search(text):
+        digits = NON_DIGIT_RE.sub('', text)
+        return f'phone : "{digits}"*' if digits else ''
+    return build_match_query(text)
+
+
+def is_phone_search(text):
+    """Return whether a search is a phone number typed with spaces or symbols."""
+    return bool(PHONE_RE.match(text) and NON_DIGIT_RE.search(text.strip()))
+
+
+def query_terms(text):
+    """Return the folded terms of a client search: the digits of a phone number, or the words."""
+    if is_phone_search(text):
+        digits = NON_DIGIT_RE.sub('', text)
+        return (digits,) if digits else ()
+    return word_terms(text)
+
+
+def get_index_rows(clients):
+    """Return the (rowid, name, email, phone) rows indexed for clients."""
+    return [(client.pk, client.name or '', client.email or '', phone_tokens(client.phone)) for client in clients]
+
+
+def index_clients(clients):
+    """
+    Add or refresh clients in the full-text index.
+
+    Args:
+        clients (iterable): Saved Client instances
+    """
+    if not is_available():
+        return
+
+    rows = get_index_rows(clients)
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(INSERT_SQL, rows)
+
+
+def remove_client(pk):
+    """
+    Remove a client from the full-text index.
+
+    Args:
+        pk (int): Id of the deleted client
+    """
+    if not is_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index(batch_size=5000):
+    """
+    Rebuild the full-text index from the client table, in one transaction.
+
+    Phone numbers are normalized in Python, so the rows are copied in batches.
+
+    Args:
+        batch_size (int): Clients read and indexed at a time
+
+    Returns:
+        int: Number of clients indexed
+    """
+    from .models import Client
+
+    clients = Client.objects.only('name', 'email', 'phone').order_by().iterator(chunk_size=batch_size)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        while batch := list(islice(clients, batch_size)):
+            cursor.executemany(INSERT_SQL, get_index_rows(batch))
+        cursor.execute(f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {INDEX_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def matching_ids(text):
+    """
+    Return the ids of the clients matching a search.
+
+    Up to ID_LIST_LIMIT matches are returned as a list, which SQLite turns into
+    primary key lookups. Past that the ids are returned as a subquery: the match is
+    common enough for an ordered scan of the clients to fill a page quickly. Falls
+    back to icontains on other databases.
+
+    Meant for filters such as Q(tenant__in=matching_ids(text)).
+
+    Args:
+        text (str): The search text typed by the user
+
+    Returns:
+        list, RawSQL or QuerySet: The matching client ids, or None if the text has no words
+    """
+    from .models import Client
+
+    match = build_client_match_query(text)
+    if not match:
+        return None
+
+    if not is_available():
+        condition = Q()
+        for word in WORD_RE.findall(text):
+            condition &= Q(name__icontains=word) | Q(email__icontains=word) | Q(phone__icontains=word)
+        return Client.objects.filter(condition).values('pk')
+
+    sql = f'SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s'
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} LIMIT %s', [match, ID_LIST_LIMIT + 1])
+        ids = [row[0] for row in cursor.fetchall()]
+    if len(ids) <= ID_LIST_LIMIT:
+        return ids
+    return RawSQL(sql, [match])
+
+
+def search(queryset, text):
+    """
+    Filter a Client queryset by full-text search over name, email and phone.
+
+    The queryset keeps its ordering, so the keyset pagination of the lists still applies.
+
+    Args:
+        queryset (QuerySet): Clients to search in
+        text (str): The search text typed by the user
+
+    Returns:
+        QuerySet: The matching clients
+    """
+    ids = matching_ids(text)
+    if ids is None:
+        return queryset
+    return queryset.filter(pk__in=ids)
+
+
+# Autocomplete searches of the forms, cleared by the signal handlers on every save
+autocomplete_cache = PrefixCache(query_terms)
+
+
+def autocomplete_results(queryset, text, limit):
+    """
+    Return the clients of a queryset matching an autocomplete search.
+
+    Args:
+        queryset (QuerySet): Clients to search in
+        text (str): The search text typed by the user
+        limit (int): Maximum number of results
+
+    Returns:
+        list: AutocompleteResult, active clients first, then by name
+    """
+    clients = search(queryset, text).only('name', 'email', 'phone').order_by('-is_active', 'name', 'pk')
+    return [
+        AutocompleteResult(
+            client.pk,
+            f'{client.name} ({client.email})',
+            word_terms(client.name) + word_terms(client.email) + tuple(phone_tokens(client.phone).split()),
+        )
+        for client in clients[:limit]
+    ]
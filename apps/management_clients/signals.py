@@ -0,0 +1,49 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.management_properties.models import Property
+from . import search
+from .models import Client
+
+
+@receiver(post_save, sender=Client)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Refresh the full-text index entry of a saved client."""
+    search.autocomplete_cache.clear()
+    if update_fields is not None and not set(update_fields) & set(search.INDEX_COLUMNS):
+        return
+    search.index_clients([instance])
+
+
+@receiver(post_delete, sender=Client)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop a deleted client from the full-text index."""
+    search.remove_client(instance.pk)
+    search.autocomplete_cache.clear()
+
+
+@receiver(pre_save, sender=Property)
+def capture_previous_owner(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored owner of a property so the owner counters can be moved after saving."""
+    instance._previous_owner_id = instance.current_owner_id
+    if instance.pk and (update_fields is None or 'current_owner' in update_fields):
+        instance._previous_owner_id = Property.objects.filter(pk=instance.pk).values_list(
+            'current_owner', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Property)
+def update_owner_counters_on_save(sender, instance, created, **kwargs):
+    """Move a saved property between the property counters of its previous and new owner."""
+    previous_owner_id = None if created else getattr(instance, '_previous_owner_id', instance.current_owner_id)
+    if previous_owner_id != instance.current_owner_id:
+        Client.update_counters([
+            (previous_owner_id, 'current_properties_count', -1),
+            (instance.current_owner_id, 'current_properties_count', 1),
+        ])
+
+
+@receiver(post_delete, sender=Property)
+def update_owner_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted property from its owner's property counter."""
+    Client.update_counters([(instance.current_owner_id, 'current_properties_count', -1)])
@@ -1,3 +1,750 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.management_properties.models import Property
+from apps.management_rentals.models import MonthlyRental, RentalAgreement
+from . import search
+from .duplicates import find_duplicates, group_pairs
+from .forms import ClientForm
+from .models import Client, DuplicateCandidate, PropertyOwnership
+from .normalization import normalize_email, normalize_phone
+
+
+def create_client(name, email, client_type=Client.ClientType.OWNER, phone="123456789"):
+    """Create a client of the given type, an owner by default."""
+    return Client.objects.create(name=name, email=email, phone=phone, client_type=client_type)
+
+
+def create_property(owner, **kwargs):
+    """Create an available 60 m², two bedroom rental of an owner at $500.000, with any field overridden."""
+    values = {
+        'address': "Test Address",
+        'current_owner': owner,
+        'offer_type': Property.OfferType.RENT,
+        'price': 500000,
+        'square_meters': 60,
+        'bedrooms': 2,
+        'bathrooms': 1,
+        'property_description': "Test property",
+        'date_published': timezone.datetime(2023, 1, 1).date(),
+    }
+    values.update(kwargs)
+    return Property.objects.create(**values)
+
+
+def create_agreement(prop, owner, tenant, **kwargs):
+    """Create a rental agreement from January 2024 at $500.000 with a $50.000 commission."""
+    values = {
+        'rent_amount': 500000,
+        'commission_amount': 50000,
+        'start_date': timezone.datetime(2024, 1, 1).date(),
+    }
+    values.update(kwargs)
+    return RentalAgreement.objects.create(property=prop, owner=owner, tenant=tenant, **values)
+
+
+class PortfolioTransferTests(TestCase):
+    """Tests for the batch transfer of properties to another owner."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = create_client("Owner Test", "owner@test.com")
+        self.tenant = create_client("Tenant Test", "tenant@test.com", Client.ClientType.TENANT)
+        self.new_owner = create_client("New Owner", "new.owner@test.com")
+        self.start = timezone.datetime(2023, 1, 1).date()
+        self.transfer_date = timezone.datetime(2024, 7, 1).date()
+        
+        self.properties = [
+            create_property(self.owner, address=f"Portfolio Address {number}") for number in range(5)
+        ]
+        for prop in self.properties:
+            PropertyOwnership.objects.create(property=prop, owner=self.owner, start_date=self.start)
+        
+        self.active_agreement = self.create_agreement(self.properties[0])
+        self.ended_agreement = self.create_agreement(self.properties[1], is_active=False)
+    
+    def create_agreement(self, prop, **kwargs):
+        """Create a rental agreement of a property with the owner and tenant."""
+        return create_agreement(prop, self.owner, self.tenant, start_date=self.start, **kwargs)
+    
+    def test_transfer_portfolio(self):
+        """Test the ownership periods, owners and active agreements are all moved."""
+        result = PropertyOwnership.transfer_portfolio(
+            self.owner, self.new_owner, self.properties[:3], self.transfer_date
+        )
+        
+        self.assertEqual(result, {'properties': 3, 'rental_agreements': 1})
+        for prop in self.properties[:3]:
+            prop.refresh_from_db()
+            self.assertEqual(prop.current_owner, self.new_owner)
+            history = list(prop.ownership_history.order_by('start_date').values_list(
+                'owner', 'start_date', 'end_date'
+            ))
+            self.assertEqual(history, [
+                (self.owner.pk, self.start, self.transfer_date),
+                (self.new_owner.pk, self.transfer_date, None),
+            ])
+        
+        self.properties[3].refresh_from_db()
+        self.assertEqual(self.properties[3].current_owner, self.owner)
+        self.active_agreement.refresh_from_db()
+        self.assertEqual(self.active_agreement.owner, self.new_owner)
+        self.ended_agreement.refresh_from_db()
+        self.assertEqual(self.ended_agreement.owner, self.owner)
+    
+    def test_query_count_does_not_grow_with_the_portfolio(self):
+        """Test the whole portfolio is moved with a fixed number of queries."""
+        with CaptureQueriesContext(connection) as queries:
+            result = PropertyOwnership.transfer_portfolio(self.owner, self.new_owner, date=self.transfer_date)
+        
+        self.assertEqual(result['properties'], 5)
+        self.assertLessEqual(len(queries), 10)
+    
+    def test_invalid_transfers_change_nothing(self):
+        """Test a transfer is rejected as a whole when it cannot be applied."""
+        foreign = create_property(create_client("Other Owner", "other@test.com"), address="Foreign Address")
+        
+        with self.assertRaises(ValidationError):
+            PropertyOwnership.transfer_portfolio(self.owner, self.new_owner, [self.properties[0], foreign])
+        with self.assertRaises(ValidationError):
+            PropertyOwnership.transfer_portfolio(self.owner, self.tenant)
+        with self.assertRaises(ValidationError):
+            PropertyOwnership.transfer_portfolio(self.owner, self.new_owner, date=timezone.datetime(2022, 1, 1).date())
+        
+        self.assertFalse(Property.objects.filter(current_owner=self.new_owner).exists())
+        self.assertFalse(PropertyOwnership.objects.filter(end_date__isnull=False).exists())
+    
+    def test_admin_action(self):
+        """Test the admin action asks for the new owner, then transfers the selection."""
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:management_properties_property_changelist')
+        data = {
+            'action': 'transfer_portfolio',
+            '_selected_action': [prop.pk for prop in self.properties[:2]],
+        }
+        
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.properties[1].property_code)
+        # The new owner is searched as the user types instead of listed
+        self.assertContains(response, 'data-autocomplete-url')
+        self.assertContains(response, 'core/js/autocomplete.js')
+        self.assertNotContains(response, 'New Owner')
+        
+        response = self.client.post(url, {
+            **data, 'apply': 'Transfer', 'to_owner': self.new_owner.pk, 'date': '2024-07-01',
+        })
+        self.assertRedirects(response, url)
+        self.assertEqual(Property.objects.filter(current_owner=self.new_owner).count(), 2)
+
+
+class OwnershipResolverTests(TestCase):
+    """Tests for the point-in-time ownership lookups and the non-overlapping periods."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = create_client("Owner Test", "owner@test.com")
+        self.buyer = create_client("Buyer Test", "buyer@test.com")
+        self.transfer_date = timezone.datetime(2024, 6, 30).date()
+        
+        self.properties = [
+            create_property(self.owner, address=f"Resolver Address {number}") for number in range(3)
+        ]
+        for prop in self.properties:
+            PropertyOwnership.objects.create(
+                property=prop, owner=self.owner, start_date=timezone.datetime(2023, 1, 1).date()
+            )
+        PropertyOwnership.transfer_portfolio(self.owner, self.buyer, self.properties[:2], self.transfer_date)
+    
+    def test_owners_at(self):
+        """Test the owners on a date are resolved with one query, the transfer date going to the buyer."""
+        day_before = timezone.datetime(2024, 6, 29).date()
+        pks = [prop.pk for prop in self.properties]
+        
+        with self.assertNumQueries(1):
+            before = PropertyOwnership.owners_at(day_before, self.properties)
+        with self.assertNumQueries(1):
+            on_transfer = PropertyOwnership.owners_at(self.transfer_date)
+        
+        self.assertEqual(before, dict.fromkeys(pks, self.owner))
+        self.assertEqual(on_transfer, {pks[0]: self.buyer, pks[1]: self.buyer, pks[2]: self.owner})
+        self.assertEqual(PropertyOwnership.owners_at(timezone.datetime(2022, 1, 1).date()), {})
+    
+    def test_resolve_owners(self):
+        """Test (property, date) pairs with different dates are resolved with one query."""
+        early = timezone.datetime(2022, 1, 1).date()
+        day_before = timezone.datetime(2024, 6, 29).date()
+        lookups = [
+            (self.properties[0], day_before),
+            (self.properties[0], self.transfer_date),
+            (self.properties[1].pk, early),
+            (self.properties[2], self.transfer_date),
+        ]
+        
+        with self.assertNumQueries(1):
+            owners = PropertyOwnership.resolve_owners(lookups)
+        
+        self.assertEqual(owners, {
+            (self.properties[0].pk, day_before): self.owner,
+            (self.properties[0].pk, self.transfer_date): self.buyer,
+            (self.properties[1].pk, early): None,
+            (self.properties[2].pk, self.transfer_date): self.owner,
+        })
+    
+    def test_overlapping_periods_are_rejected(self):
+        """Test an overlapping period fails validation and is refused by the database."""
+        from django.db import IntegrityError, transaction
+        
+        overlapping = PropertyOwnership(
+            property=self.properties[0],
+            owner=self.owner,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+            end_date=timezone.datetime(2024, 2, 1).date(),
+        )
+        with self.assertRaises(ValidationError):
+            overlapping.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            overlapping.save()
+        
+        # Periods meeting on a boundary day do not overlap
+        earlier = PropertyOwnership(
+            property=self.properties[0],
+            owner=self.owner,
+            start_date=timezone.datetime(2022, 1, 1).date(),
+            end_date=timezone.datetime(2023, 1, 1).date(),
+        )
+        earlier.full_clean()
+        earlier.save()
+    
+    def test_change_owner_closes_the_open_period(self):
+        """Test change_owner closes the open period when current_owner already holds the new owner."""
+        prop = self.properties[2]
+        prop.current_owner = self.buyer
+        prop.save()
+        prop.change_owner(self.buyer, self.transfer_date)
+        
+        self.assertEqual(PropertyOwnership.owners_at(self.transfer_date, [prop]), {prop.pk: self.buyer})
+        self.assertEqual(prop.ownership_history.filter(end_date__isnull=True).count(), 1)
+
+
+class ClientSearchTests(TestCase):
+    """Tests for the full-text client search of the client list and admin."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = create_client("Owner Test", "owner@test.com")
+        create_property(self.owner)
+        self.jose = create_client("José Pérez Muñoz", "jperez@correo.cl", phone="+56 9 1234 5678")
+        self.maria = create_client(
+            "María González", "maria.gonzalez@correo.cl", Client.ClientType.TENANT, phone="987654321"
+        )
+        
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def search_clients(self, text):
+        """Return the names of the clients found by the client list."""
+        response = self.client.get(reverse('clients:client_list'), {'search': text})
+        return [client.name for client in response.context['clients']]
+    
+    def test_accent_folded_prefix_search(self):
+        """Test names match without accents, by word prefixes, in any order."""
+        self.assertEqual(self.search_clients('jose'), ["José Pérez Muñoz"])
+        self.assertEqual(self.search_clients('MUNO per'), ["José Pérez Muñoz"])
+        self.assertEqual(self.search_clients('jperez@correo'), ["José Pérez Muñoz"])
+        self.assertEqual(self.search_clients('perez gonzalez'), [])
+    
+    def test_phone_search(self):
+        """Test phone numbers match whatever their formatting and country code."""
+        self.assertEqual(self.search_clients('+56 9 1234'), ["José Pérez Muñoz"])
+        self.assertEqual(self.search_clients('91234'), ["José Pérez Muñoz"])
+        
+        # The national number is the one the imports compare on
+        self.assertEqual(search.phone_tokens('0056 9 8765 4321'), '0056987654321 987654321')
+        self.assertEqual(search.phone_tokens('(09) 8765 4321'), '0987654321 987654321')
+        self.assertEqual(search.phone_tokens('+1 202 555 0143'), '12025550143')
+        self.jose.phone = '0056 9 8765 4321'
+        self.jose.save()
+        self.assertEqual(self.search_clients('98765'), ["José Pérez Muñoz"])
+    
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is refreshed when a client is renamed or deleted."""
+        self.jose.name = "Josefina Rojas"
+        self.jose.save()
+        self.assertEqual(self.search_clients('perez'), [])
+        self.assertEqual(self.search_clients('rojas'), ["Josefina Rojas"])
+        
+        self.jose.delete()
+        self.assertEqual(self.search_clients('rojas'), [])
+    
+    def test_owner_property_counts(self):
+        """Test the client list still counts the properties of every owner."""
+        response = self.client.get(reverse('clients:client_list'))
+        counts = {client.name: client.current_properties_count for client in response.context['clients']}
+        
+        self.assertEqual(counts, {"José Pérez Muñoz": 0, "Owner Test": 1})
+    
+    def test_admin_search(self):
+        """Test the admin searches clients through the index."""
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        
+        response = self.client.get(reverse('admin:management_clients_client_changelist'), {'q': 'maria'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.maria])
+
+
+class AutocompleteTests(TestCase):
+    """Tests for the client autocomplete endpoint and its cache."""
+    
+    def setUp(self):
+        """Set up test data."""
+        # Rolled back rows do not send signals, so start every test with an empty cache
+        search.autocomplete_cache.clear()
+        self.jose = create_client("José Pérez Muñoz", "jperez@correo.cl", phone="+56 9 1234 5678")
+        self.josefa = create_client("Josefa Rojas", "jrojas@correo.cl", Client.ClientType.TENANT, phone="987654321")
+        
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def complete_clients(self, text, **params):
+        """Return the labels of the clients suggested for a search."""
+        response = self.client.get(reverse('clients:client_autocomplete'), {'q': text, **params})
+        return [result['text'] for result in response.json()['results']]
+    
+    def test_client_results(self):
+        """Test clients are suggested by accent-folded prefix, filtered by type."""
+        self.assertEqual(self.complete_clients('jos'), [
+            "Josefa Rojas (jrojas@correo.cl)", "José Pérez Muñoz (jperez@correo.cl)"
+        ])
+        self.assertEqual(self.complete_clients('jose perez'), ["José Pérez Muñoz (jperez@correo.cl)"])
+        self.assertEqual(self.complete_clients('jos', type='TENANT'), ["Josefa Rojas (jrojas@correo.cl)"])
+        self.assertEqual(self.complete_clients('9 1234'), ["José Pérez Muñoz (jperez@correo.cl)"])
+        self.assertEqual(self.complete_clients(''), [])
+    
+    def test_narrowed_search_uses_cache(self):
+        """Test a search extending a complete cached search runs no query."""
+        def fetch(text, limit):
+            self.fail("The search was not answered from the cache")
+        
+        self.complete_clients('jo')
+        
+        source = ('clients', None, False)
+        with self.assertNumQueries(0):
+            results = search.autocomplete_cache.lookup(source, 'jose m', fetch)
+            self.assertEqual([result.id for result in results], [self.jose.pk])
+            results = search.autocomplete_cache.lookup(source, 'josef', fetch)
+            self.assertEqual([result.id for result in results], [self.josefa.pk])
+    
+    def test_cache_cleared_on_save(self):
+        """Test saving a client drops the cached suggestions."""
+        self.assertEqual(self.complete_clients('jos', type='TENANT'), ["Josefa Rojas (jrojas@correo.cl)"])
+        
+        self.josefa.name = "María Rojas"
+        self.josefa.save()
+        self.assertEqual(self.complete_clients('jos', type='TENANT'), [])
+        self.assertEqual(self.complete_clients('mar', type='TENANT'), ["María Rojas (jrojas@correo.cl)"])
+    
+
+
+class ClientCounterTests(TestCase):
+    """Tests for the portfolio counters maintained on Client."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = create_client("Owner Test", "owner@test.com")
+        self.tenant = create_client("Tenant Test", "tenant@test.com", Client.ClientType.TENANT)
+        self.property = create_property(self.owner)
+        self.agreement = create_agreement(self.property, self.owner, self.tenant, payment_due_day=5)
+        self.monthly_rental = MonthlyRental.objects.create(
+            rental_agreement=self.agreement,
+            period_year=2024,
+            period_month=1,
+            transfer_amount=450000
+        )
+    
+    def counters(self, client):
+        """Return the stored counters of a client."""
+        return Client.objects.values_list(*Client.COUNTER_FIELDS).get(pk=client.pk)
+    
+    def test_property_counter(self):
+        """Test the property counter follows property saves, owner changes and deletes."""
+        self.assertEqual(self.counters(self.owner)[0], 1)
+        
+        new_owner = create_client("New Owner", "new.owner@test.com")
+        other = create_property(
+            new_owner,
+            address="Other Address",
+            offer_type=Property.OfferType.SALE,
+            price=90000000,
+            square_meters=80,
+            bedrooms=3,
+            bathrooms=2,
+        )
+        other.change_owner(self.owner)
+        self.assertEqual(self.counters(self.owner)[0], 2)
+        self.assertEqual(self.counters(new_owner)[0], 0)
+        
+        other.delete()
+        self.assertEqual(self.counters(self.owner)[0], 1)
+    
+    def test_agreement_and_unpaid_counters(self):
+        """Test the agreement and unpaid month counters follow single saves."""
+        self.assertEqual(self.counters(self.owner), (1, 1, 0, 0))
+        self.assertEqual(self.counters(self.tenant), (0, 0, 1, 0))
+        
+        self.monthly_rental.rent_status = MonthlyRental.UNPAID
+        self.monthly_rental.save()
+        self.assertEqual(self.counters(self.owner)[3], 1)
+        self.assertEqual(self.counters(self.tenant)[3], 1)
+        
+        self.monthly_rental.rent_status = MonthlyRental.PAID
+        self.monthly_rental.payment_date = timezone.datetime(2024, 2, 1).date()
+        self.monthly_rental.save()
+        self.assertEqual(self.counters(self.tenant)[3], 0)
+        
+        self.agreement.is_active = False
+        self.agreement.save()
+        self.assertEqual(self.counters(self.owner), (1, 0, 0, 0))
+        self.assertEqual(self.counters(self.tenant), (0, 0, 0, 0))
+    
+    def test_bulk_paths(self):
+        """Test mark_overdue, record_payments and transfer_portfolio keep the counters."""
+        self.assertEqual(MonthlyRental.mark_overdue(timezone.datetime(2024, 2, 1).date()), 1)
+        self.assertEqual(self.counters(self.owner), (1, 1, 0, 1))
+        self.assertEqual(self.counters(self.tenant), (0, 0, 1, 1))
+        
+        new_owner = create_client("New Owner", "new.owner@test.com")
+        PropertyOwnership.objects.create(
+            property=self.property, owner=self.owner, start_date=timezone.datetime(2023, 1, 1).date()
+        )
+        PropertyOwnership.transfer_portfolio(self.owner, new_owner, date=timezone.datetime(2024, 7, 1).date())
+        self.assertEqual(self.counters(self.owner), (0, 0, 0, 0))
+        self.assertEqual(self.counters(new_owner), (1, 1, 0, 1))
+        
+        MonthlyRental.bulk_record_payment(
+            [self.monthly_rental.pk], MonthlyRental.LATE, timezone.datetime(2024, 2, 10).date()
+        )
+        self.assertEqual(self.counters(new_owner), (1, 1, 0, 0))
+        self.assertEqual(self.counters(self.tenant), (0, 0, 1, 0))
+    
+    def test_stale_instance_keeps_counters(self):
+        """Test saving a client loaded before a counter change does not overwrite it."""
+        stale = Client.objects.get(pk=self.tenant.pk)
+        self.monthly_rental.rent_status = MonthlyRental.UNPAID
+        self.monthly_rental.save()
+        
+        stale.phone = "111111111"
+        stale.save()
+        self.assertEqual(self.counters(self.tenant), (0, 0, 1, 1))
+    
+    def test_recount_command(self):
+        """Test the repair command finds and fixes drifted counters."""
+        Client.objects.filter(pk=self.owner.pk).update(current_properties_count=7, unpaid_months_count=3)
+        
+        out = StringIO()
+        call_command('recount_clients', '--dry-run', stdout=out)
+        self.assertIn('1 clients have wrong counters', out.getvalue())
+        self.assertEqual(self.counters(self.owner), (7, 1, 0, 3))
+        
+        out = StringIO()
+        call_command('recount_clients', stdout=out)
+        self.assertIn('Recounted 1 clients', out.getvalue())
+        self.assertEqual(self.counters(self.owner), (1, 1, 0, 0))
+        self.assertFalse(Client.counter_drift().exists())
+    
+    def test_client_list_sorts_and_filters_without_joins(self):
+        """Test the owner list reads the counters instead of counting properties."""
+        empty_owner = create_client("Aaron Empty", "aaron@test.com")
+        User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+        url = reverse('clients:client_list')
+        
+        response = self.client.get(url, {'sort': 'properties'})
+        self.assertEqual(list(response.context['clients']), [self.owner, empty_owner])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'portfolio': 'without_properties'})
+        self.assertEqual(list(response.context['clients']), [empty_owner])
+        client_queries = [query['sql'] for query in queries if 'FROM "management_clients_client"' in query['sql']]
+        self.assertTrue(client_queries)
+        self.assertFalse(any('JOIN' in sql or 'management_properties_property' in sql for sql in client_queries))
+    
+    def test_client_list_pages_by_counter(self):
+        """Test the owner list sorted by a counter pages with a cursor, ties broken by name."""
+        for index in range(11):
+            create_client(f"Owner {index:02d}", f"owner{index}@test.com")
+        Client.objects.filter(name__startswith="Owner ").exclude(pk=self.owner.pk).update(current_properties_count=2)
+        User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+        
+        response = self.client.get(reverse('clients:client_list'), {'sort': 'properties'})
+        names = [client.name for client in response.context['clients']]
+        next_url = response.context['next_page_url']
+        self.assertIn('sort=properties', next_url)
+        self.assertIn('cursor=', next_url)
+        
+        response = self.client.get(reverse('clients:client_list') + next_url)
+        names += [client.name for client in response.context['clients']]
+        self.assertIsNone(response.context['next_page_url'])
+        self.assertEqual(names, [f"Owner {index:02d}" for index in range(11)] + ["Owner Test"])
+
+
+class ImportClientsTests(TestCase):
+    """Tests for the client upsert import and its normalization."""
+    
+    CLIENTS = (
+        "Name;Email;Phone;Client_Type\n"
+        "Owner Updated; OWNER@Test.com ;+56 9 1234 5678;\n"
+        "José Pérez;jperez@correo.cl;(09) 8765 4321;tenant\n"
+        "Sin Teléfono;nophone@correo.cl;12345;\n"
+        ";noname@correo.cl;912345678;\n"
+        "José Pérez Muñoz;JPEREZ@correo.cl;0056987654321;TENANT\n"
+    )
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = create_client("Owner Test", "owner@test.com")
+        self.tenant = create_client("Tenant Test", "tenant@test.com", Client.ClientType.TENANT)
+        create_property(self.owner)
+    
+    def import_clients(self, content, *args):
+        """Run the import on a CSV file with the given content and return its output."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as source:
+            source.write(content)
+        self.addCleanup(os.remove, source.name)
+        self.addCleanup(lambda: os.path.exists(f'{source.name}.errors.csv') and os.remove(f'{source.name}.errors.csv'))
+        
+        out = StringIO()
+        call_command('import_clients', source.name, *args, stdout=out)
+        return out.getvalue()
+    
+    def test_normalization(self):
+        """Test the spellings of a Chilean number and an email normalize to one value."""
+        for phone in ('+56 9 1234 5678', '56912345678', '0056912345678', '(09) 1234 5678', '9-1234-5678'):
+            self.assertEqual(normalize_phone(phone), '+56 9 1234 5678')
+        self.assertEqual(normalize_phone('+56 2 2345 6789'), '+56 2 2345 6789')
+        for phone in ('12345', '012345678', '+1 555 123 4567', ''):
+            self.assertIsNone(normalize_phone(phone))
+        
+        self.assertEqual(normalize_email(' Ana.Rojas@Correo.CL '), 'ana.rojas@correo.cl')
+        self.assertIsNone(normalize_email('  '))
+    
+    def test_import_upserts_on_normalized_email(self):
+        """Test rows are created, merged into existing clients or rejected."""
+        output = self.import_clients(self.CLIENTS, '--batch-size', '2')
+        
+        self.assertIn('1 clients created, 2 updated, 2 rows rejected', output)
+        self.assertEqual(Client.objects.count(), 3)
+        
+        # The owner keeps its type, since the file leaves it blank, and its counters
+        owner = Client.objects.get(pk=self.owner.pk)
+        self.assertEqual((owner.name, owner.email, owner.phone), ("Owner Updated", "OWNER@Test.com", "+56 9 1234 5678"))
+        self.assertEqual(owner.normalized_email, "owner@test.com")
+        self.assertEqual((owner.client_type, owner.current_properties_count), (Client.ClientType.OWNER, 1))
+        
+        jose = Client.objects.get(normalized_email='jperez@correo.cl')
+        # The email is stored as the file spells it, trimmed
+        self.assertEqual((jose.name, jose.email, jose.phone, jose.client_type), (
+            "José Pérez Muñoz", "JPEREZ@correo.cl", "+56 9 8765 4321", Client.ClientType.TENANT
+        ))
+        self.assertEqual(list(search.search(Client.objects.all(), 'munoz')), [jose])
+        
+        with open(output.split('See ')[1].rstrip('.\n'), encoding='utf-8') as report:
+            self.assertEqual(report.read().splitlines()[1:], [
+                '4,phone,Not a valid Chilean phone number',
+                '5,name,This field is required.',
+            ])
+    
+    def test_dry_run(self):
+        """Test a dry run counts the changes without saving them."""
+        output = self.import_clients(self.CLIENTS, '--dry-run')
+        
+        self.assertIn('Dry run: 1 clients created, 2 updated, 2 rows rejected', output)
+        # The two rows of the same new client land in different batches
+        output = self.import_clients(self.CLIENTS, '--dry-run', '--batch-size', '2')
+        self.assertIn('Dry run: 1 clients created, 2 updated, 2 rows rejected', output)
+        self.assertEqual(Client.objects.count(), 2)
+        self.assertEqual(Client.objects.get(pk=self.owner.pk).name, "Owner Test")
+    
+    def test_form_rejects_duplicate_email(self):
+        """Test the client form rejects an email already used, whatever its case."""
+        data = {'name': "Otro", 'email': "Owner@Test.com ", 'phone': "123", 'is_active': True,
+                'client_type': Client.ClientType.OWNER}
+        form = ClientForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+        
+        form = ClientForm(data, instance=self.owner)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_legacy_duplicates_can_be_edited(self):
+        """Test a client sharing its email since before the key was added still saves."""
+        from importlib import import_module
+        from django.apps import apps
+        
+        migration = import_module('apps.management_clients.migrations.0009_client_normalized_email')
+        first, second = Client.objects.bulk_create([
+            Client(name="Ana Rojas", email="ana@correo.cl", phone="912345678"),
+            Client(name="Ana Rojas Soto", email="Ana@Correo.cl", phone="912345678"),
+        ])
+        migration.normalize_emails(apps, None)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.normalized_email, second.normalized_email), ('ana@correo.cl', None))
+        
+        data = {'name': "Ana Rojas S.", 'email': second.email, 'phone': "912345678", 'is_active': True,
+                'client_type': Client.ClientType.OWNER}
+        form = ClientForm(data, instance=second)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        second.refresh_from_db()
+        self.assertEqual((second.name, second.normalized_email), ("Ana Rojas S.", None))
+        
+        # Moving to another client's email is still rejected, a free one takes the key
+        form = ClientForm({**data, 'email': "owner@test.com"}, instance=second)
+        self.assertFalse(form.is_valid())
+        second.email = "ana.soto@correo.cl"
+        second.save()
+        self.assertEqual(Client.objects.get(pk=second.pk).normalized_email, 'ana.soto@correo.cl')
+
 
-# Create your tests here.
+class DuplicateClientTests(TestCase):
+    """Tests for duplicate client detection and merging."""
+    
+    def setUp(self):
+        """Set up test data: the owner was entered again, before emails were unique."""
+        self.owner = create_client("Owner Test", "owner@test.com", phone="912345678")
+        self.tenant = create_client("Tenant Test", "tenant@test.com", Client.ClientType.TENANT, phone="987654321")
+        self.property = create_property(self.owner)
+        self.agreement = create_agreement(self.property, self.owner, self.tenant)
+        # bulk_create leaves the email key unset, like the legacy duplicates
+        self.duplicate = Client.objects.bulk_create([Client(
+            name="OWNER  test", email="Owner@Test.com", phone="+56 9 1234 5678",
+            client_type=Client.ClientType.OWNER,
+        )])[0]
+        self.own_property = create_property(self.duplicate, address="Own Address")
+        self.own_property.change_owner(self.duplicate)
+        self.own_agreement = create_agreement(self.own_property, self.duplicate, self.tenant)
+    
+    def test_find_duplicates(self):
+        """Test only clients sharing a blocking key are compared, and scored on name, email and phone."""
+        rows = [
+            (1, "José Pérez", "jperez@correo.cl", "+56 9 8765 4321"),
+            (2, "Pérez Muñoz, Jose", " JPEREZ@correo.cl", "0987654321"),
+            (3, "José Pérez", "otro@correo.cl", "912345678"),
+            (4, "Ana Rojas", "contacto@agencia.cl", "922222222"),
+            (5, "Pedro Soto", "contacto@agencia.cl", "933333333"),
+            (6, "Luis Díaz", "contacto@agencia.cl", "944444444"),
+        ]
+        result = find_duplicates(rows)
+        self.assertEqual([(pair.client_a_id, pair.client_b_id) for pair in result['pairs']], [(1, 2)])
+        pair = result['pairs'][0]
+        self.assertTrue(pair.same_email and pair.same_phone)
+        self.assertGreater(pair.score, 0.8)
+        # 1-3 share their name words; the agency email pairs 4, 5 and 6
+        self.assertEqual((result['compared'], result['skipped_blocks']), (6, 0))
+        
+        # Homonyms without a shared email or phone score low
+        result = find_duplicates(rows, min_score=0)
+        scores = {(pair.client_a_id, pair.client_b_id): pair.score for pair in result['pairs']}
+        self.assertEqual(scores[1, 3], 0.5)
+        
+        # The name block of 1, 2 and 3 and the agency block are too large
+        result = find_duplicates(rows, max_block_size=2)
+        self.assertEqual([(pair.client_a_id, pair.client_b_id) for pair in result['pairs']], [(1, 2)])
+        self.assertEqual((result['compared'], result['skipped_blocks']), (1, 2))
+        
+        self.assertEqual(group_pairs([(3, 2), (1, 2), (5, 4)]), [[1, 2, 3], [4, 5]])
+    
+    def test_command_keeps_dismissed_pairs(self):
+        """Test the command stores the pairs found and does not propose dismissed ones again."""
+        out = StringIO()
+        call_command('find_duplicate_clients', stdout=out)
+        self.assertIn('1 possible duplicates stored', out.getvalue())
+        candidate = DuplicateCandidate.objects.get()
+        self.assertEqual((candidate.client_a, candidate.client_b), (self.owner, self.duplicate))
+        self.assertEqual(candidate.score, 1)
+        
+        candidate.status = DuplicateCandidate.Status.DISMISSED
+        candidate.save()
+        call_command('find_duplicate_clients', stdout=StringIO())
+        self.assertEqual(list(DuplicateCandidate.objects.values_list('status', flat=True)), ['DISMISSED'])
+        
+        out = StringIO()
+        call_command('find_duplicate_clients', '--dry-run', '--min-score', '0', stdout=out)
+        self.assertIn('Dry run: 0 possible duplicates found', out.getvalue())
+    
+    def test_merge_repoints_foreign_keys(self):
+        """Test merging moves properties, ownerships and agreements to the oldest record in bulk."""
+        call_command('find_duplicate_clients', stdout=StringIO())
+        
+        result = Client.merge_duplicates([self.duplicate, self.owner])
+        
+        survivor = result['client']
+        self.assertEqual(survivor, self.owner)
+        self.assertEqual((result['merged'], result['properties'], result['rental_agreements']), (1, 1, 1))
+        self.assertFalse(Client.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertFalse(DuplicateCandidate.objects.exists())
+        
+        self.own_agreement.refresh_from_db()
+        self.assertEqual(self.own_agreement.owner, survivor)
+        self.assertEqual(PropertyOwnership.objects.get(property=self.own_property).owner, survivor)
+        self.assertEqual(survivor.normalized_email, 'owner@test.com')
+        self.assertEqual(
+            Client.objects.values_list(*Client.COUNTER_FIELDS).get(pk=survivor.pk), (2, 2, 0, 0)
+        )
+        self.assertFalse(Client.counter_drift().exists())
+        self.assertEqual(list(search.search(Client.objects.all(), 'owner')), [survivor])
+    
+    def test_merge_rejects_owner_and_tenant_of_same_agreement(self):
+        """Test the two sides of a rental agreement cannot be merged into one client."""
+        with self.assertRaises(ValidationError):
+            Client.merge_duplicates([self.owner, self.tenant])
+        with self.assertRaises(ValidationError):
+            Client.merge_duplicates([self.owner])
+        self.assertEqual(Client.objects.count(), 3)
+    
+    def test_merge_rejects_owner_and_tenant_twins(self):
+        """Test a tenant holding an agreement is not merged into an owner record of the same person."""
+        twin = Client.objects.bulk_create([Client(
+            name="TENANT  test", email="Tenant@Test.com", phone="+56 9 8765 4321",
+            client_type=Client.ClientType.OWNER,
+        )])[0]
+        
+        with self.assertRaisesMessage(ValidationError, 'Owners and tenants cannot be merged'):
+            Client.merge_duplicates([self.tenant, twin])
+        self.assertEqual(Client.objects.count(), 4)
+        self.agreement.refresh_from_db()
+        self.assertEqual(self.agreement.tenant, self.tenant)
+    
+    def test_admin_review(self):
+        """Test the admin action shows the merges, then runs them."""
+        call_command('find_duplicate_clients', stdout=StringIO())
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:management_clients_duplicatecandidate_changelist')
+        
+        response = self.client.get(url)
+        self.assertContains(response, 'owner@test.com')
+        
+        data = {'action': 'merge_clients', '_selected_action': [DuplicateCandidate.objects.get().pk]}
+        response = self.client.post(url, data)
+        self.assertContains(response, '<strong>Owner Test</strong> &lt;owner@test.com&gt;', html=False)
+        self.assertContains(response, '<li>OWNER  test &lt;Owner@Test.com&gt;', html=False)
+        self.assertEqual(Client.objects.count(), 3)
+        
+        response = self.client.post(url, {**data, 'apply': 'Merge'})
+        self.assertRedirects(response, url)
+        self.assertEqual(Client.objects.count(), 2)
+        self.assertEqual(set(RentalAgreement.objects.values_list('owner_id', flat=True)), {self.owner.pk})
@@ -12,6 +12,9 @@ urlpatterns = [
     # Create view - add new client
     path('create/', views.ClientCreateView.as_view(), name='client_create'),
     
+    # Autocomplete - JSON client search for the form selects
+    path('autocomplete/', views.ClientAutocompleteView.as_view(), name='client_autocomplete'),
+    
     # Detail view - show single client details
     path('<int:pk>/', views.ClientDetailView.as_view(), name='client_detail'),
     
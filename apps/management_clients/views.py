@@ -6,9 +6,12 @@ from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.core.exceptions import ValidationError
+from apps.core.autocomplete import AutocompleteView
+from apps.core.pagination import KeysetPaginationMixin
+from . import search as client_search
 from .models import Client
 from .forms import ClientForm, OwnerForm
-from django.db.models import Count, Q
+from django.db.models import Q
 
 # class ClientListView(LoginRequiredMixin, ListView):
 #     model = Client
@@ -35,11 +38,12 @@ from django.db.models import Count, Q
 #         return queryset.order_by('-is_active', 'name')
 
 
-class ClientListView(LoginRequiredMixin, ListView):
+class ClientListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Client
     template_name = 'management_clients/client_list.html'
     context_object_name = 'clients'
     paginate_by = 10
+    keyset_ordering = ('-is_active', 'name', 'id')
     
     # def get_queryset(self):
     #     queryset = super().get_queryset().annotate(
@@ -59,25 +63,41 @@ class ClientListView(LoginRequiredMixin, ListView):
     #         )
         
     #     return queryset.order_by('-is_active', 'name')
+    # Orderings offered by the sort selector, each matching an index of Client
+    sort_orderings = {
+        'properties': ('-current_properties_count', 'name', 'id'),
+        'unpaid': ('-unpaid_months_count', 'name', 'id'),
+    }
+    
+    # Portfolio filters, read from the maintained counters without any join
+    portfolio_filters = {
+        'with_properties': Q(current_properties_count__gt=0),
+        'without_properties': Q(current_properties_count=0),
+        'rented': Q(active_owner_agreements_count__gt=0),
+        'unpaid': Q(unpaid_months_count__gt=0),
+    }
+    
+    def get_keyset_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get('sort'), self.keyset_ordering)
+    
     def get_queryset(self):
-        queryset = super().get_queryset().annotate(
-            current_properties_count=Count('properties')
-        ).filter(client_type=Client.ClientType.OWNER)  # Add this line to filter only owners
+        queryset = super().get_queryset().filter(client_type=Client.ClientType.OWNER)  # Add this line to filter only owners
         
         status = self.request.GET.get('status')
         if status == 'active':
             queryset = queryset.filter(is_active=True)
         elif status == 'inactive':
             queryset = queryset.filter(is_active=False)
+        
+        portfolio = self.request.GET.get('portfolio')
+        if portfolio in self.portfolio_filters:
+            queryset = queryset.filter(self.portfolio_filters[portfolio])
             
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(email__icontains=search)
-            )
+            queryset = client_search.search(queryset, search)
         
-        return queryset.order_by('-is_active', 'name')
+        return queryset.order_by(*self.get_keyset_ordering())
 
 class ClientCreateView(LoginRequiredMixin, CreateView):
     model = Client
@@ -115,7 +135,7 @@ class ClientDeleteView(LoginRequiredMixin, DeleteView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Add property count to context
-        context['property_count'] = self.object.properties.count()
+        context['property_count'] = self.object.current_properties_count
         return context
     
     def delete(self, request, *args, **kwargs):
@@ -140,4 +160,29 @@ class ClientDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         # Get the clients properties ordered by address
         context['properties'] = self.object.properties.all().order_by('address')
-        return context          
\ No newline at end of file
+        return context          
+
+
+class ClientAutocompleteView(AutocompleteView):
+    """
+    JSON client search for the autocomplete selects of the forms.
+
+    Query string: q (search text), type (OWNER or TENANT, optional) and active=1 to
+    leave out inactive clients.
+    """
+    cache = client_search.autocomplete_cache
+
+    def get_source(self):
+        client_type = self.request.GET.get('type')
+        if client_type not in Client.ClientType.values:
+            client_type = None
+        return ('clients', client_type, self.request.GET.get('active') == '1')
+
+    def fetch(self, text, limit):
+        _, client_type, active_only = self.get_source()
+        queryset = Client.objects.all()
+        if client_type:
+            queryset = queryset.filter(client_type=client_type)
+        if active_only:
+            queryset = queryset.filter(is_active=True)
+        return client_search.autocomplete_results(queryset, text, limit)
@@ -1,10 +1,29 @@
 # REAL_ESTATE_MANAGER/apps/management_properties/admin.py
 
-from django.contrib import admin
-from .models import Property
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from apps.management_clients.models import Client, PropertyOwnership
+from .forms import PortfolioTransferForm
+from .models import Property, PropertyImage, Sequence
+
+class PropertyImageInline(admin.TabularInline):
+    model = PropertyImage
+    extra = 0
+    fields = ('original', 'caption', 'position', 'rendition_status', 'content_hash')
+    readonly_fields = ('original', 'rendition_status', 'content_hash')
+
+    # Photos are uploaded through PropertyImage.create_from_upload(), which hashes them
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
+    inlines = [PropertyImageInline]
     # List view configuration
     list_display = (
         'property_code',
@@ -29,6 +48,8 @@ class PropertyAdmin(admin.ModelAdmin):
         # 'pets_allowed'
     )
     
+    search_fields = ('property_code', 'address')
+    autocomplete_fields = ('current_owner',)
     readonly_fields = ('property_code', 'created_at', 'updated_at')
     
     # Detail view configuration with fieldsets
@@ -83,6 +104,8 @@ class PropertyAdmin(admin.ModelAdmin):
     # Ordering
     ordering = ('-date_published', 'property_code')
 
+    actions = ['transfer_portfolio']
+
     def save_model(self, request, obj, form, change):
         if change:  # If this is an edit, not a new property
             old_obj = Property.objects.get(pk=obj.pk)
@@ -98,4 +121,67 @@ class PropertyAdmin(admin.ModelAdmin):
             super().save_model(request, obj, form, change)
             if obj.current_owner:
                 # If new property has an owner, create initial ownership record
-                obj.change_owner(obj.current_owner)
\ No newline at end of file
+                obj.change_owner(obj.current_owner)
+
+    @admin.action(description="Transfer selected properties to another owner")
+    def transfer_portfolio(self, request, queryset):
+        """Ask for the new owner and date, then transfer the selection in one transaction."""
+        owner_ids = set(queryset.values_list('current_owner', flat=True))
+        if len(owner_ids) != 1 or None in owner_ids:
+            self.message_user(request, "Select properties of a single owner.", messages.ERROR)
+            return None
+        from_owner = Client.objects.get(pk=owner_ids.pop())
+
+        if 'apply' in request.POST:
+            form = PortfolioTransferForm(request.POST, from_owner=from_owner)
+        else:
+            form = PortfolioTransferForm(initial={'date': timezone.now().date()}, from_owner=from_owner)
+
+        if form.is_valid():
+            to_owner = form.cleaned_data['to_owner']
+            try:
+                result = PropertyOwnership.transfer_portfolio(
+                    from_owner, to_owner, queryset, form.cleaned_data['date']
+                )
+            except ValidationError as error:
+                self.message_user(request, ' '.join(error.messages), messages.ERROR)
+            else:
+                self.message_user(
+                    request,
+                    f"{result['properties']} properties and {result['rental_agreements']} active "
+                    f"rental agreements transferred from {from_owner.name} to {to_owner.name}.",
+                    messages.SUCCESS
+                )
+            return None
+
+        return TemplateResponse(request, 'admin/management_properties/property/transfer_portfolio.html', {
+            **self.admin_site.each_context(request),
+            'title': "Transfer properties to another owner",
+            'opts': self.model._meta,
+            'form': form,
+            'from_owner': from_owner,
+            'properties': queryset.order_by('property_code'),
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        })
+
+
+@admin.register(Sequence)
+class SequenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_value')
+    # Counters are only moved by Sequence.reserve()
+    readonly_fields = ('name', 'last_value')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PropertyImage)
+class PropertyImageAdmin(admin.ModelAdmin):
+    list_display = ('property', 'caption', 'position', 'width', 'height', 'rendition_status', 'created_at')
+    list_filter = ('rendition_status',)
+    search_fields = ('property__property_code', 'property__address', 'caption', 'content_hash')
+    list_select_related = ('property',)
+    readonly_fields = ('original', 'content_hash', 'width', 'height', 'rendition_status', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagementPropertiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.management_properties'
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.management_properties.signals  # noqa
@@ -0,0 +1,128 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/facets.py
+
+from django.db.models import Count, Q
+
+from .models import Property
+
+# Choice facets: (query string parameter, model field, choices)
+CHOICE_FACETS = (
+    ('status', 'status', Property.PropertyStatus.choices),
+    ('type', 'property_type', Property.PropertyType.choices),
+    ('offer', 'offer_type', Property.OfferType.choices),
+)
+
+# Range filters: (minimum parameter, maximum parameter, model field), bounds inclusive
+RANGE_FILTERS = (
+    ('price_min', 'price_max', 'price'),
+    ('m2_min', 'm2_max', 'square_meters'),
+    ('bedrooms_min', 'bedrooms_max', 'bedrooms'),
+)
+
+# Buckets counted for each range facet, as inclusive (minimum, maximum) pairs.
+# Rent and sale prices are orders of magnitude apart, so price buckets are only
+# counted once an offer type is selected.
+PRICE_RANGES = {
+    Property.OfferType.RENT: (
+        (None, 500000), (500001, 1000000), (1000001, 2000000), (2000001, None),
+    ),
+    Property.OfferType.SALE: (
+        (None, 100000000), (100000001, 200000000), (200000001, 400000000), (400000001, None),
+    ),
+}
+SQUARE_METER_RANGES = ((None, 50), (51, 100), (101, 200), (201, None))
+BEDROOM_RANGES = ((None, 1), (2, 2), (3, 3), (4, None))
+
+
+def range_condition(field, minimum=None, maximum=None):
+    """Return the Q selecting field values between minimum and maximum, both inclusive."""
+    condition = Q()
+    if minimum is not None:
+        condition &= Q(**{f'{field}__gte': minimum})
+    if maximum is not None:
+        condition &= Q(**{f'{field}__lte': maximum})
+    return condition
+
+
+def build_filters(values):
+    """
+    Turn the cleaned list filters into one condition per model field.
+
+    Args:
+        values (dict): Filters as returned by PropertyFilterForm.get_filters()
+
+    Returns:
+        dict: Model field name -> Q, for the active filters only
+    """
+    filters = {}
+    for param, field, _ in CHOICE_FACETS:
+        if values.get(param):
+            filters[field] = Q(**{field: values[param]})
+    for min_param, max_param, field in RANGE_FILTERS:
+        condition = range_condition(field, values.get(min_param), values.get(max_param))
+        if condition:
+            filters[field] = condition
+    return filters
+
+
+def combine(filters, exclude=None):
+    """AND together every filter but the one on the excluded field."""
+    condition = Q()
+    for field, field_condition in filters.items():
+        if field != exclude:
+            condition &= field_condition
+    return condition
+
+
+def get_range_buckets(field, offer_type=None):
+    """Return the buckets counted for a range facet."""
+    if field == 'price':
+        return PRICE_RANGES.get(offer_type, ())
+    if field == 'square_meters':
+        return SQUARE_METER_RANGES
+    return BEDROOM_RANGES
+
+
+def count_facets(queryset, filters, offer_type=None):
+    """
+    Count the listings behind every facet option in a single query.
+
+    Each option is counted with all the active filters except the one on its own
+    field, so it shows how many listings selecting it would give. Every count is a
+    conditional aggregate of the same statement, instead of one query per facet.
+
+    Args:
+        queryset (QuerySet): Properties before the list filters (e.g. search results)
+        filters (dict): Active filters as returned by build_filters()
+        offer_type (str, optional): Selected offer type, which picks the price buckets
+
+    Returns:
+        dict: 'total' count plus, for every facet field, a list of option dicts with
+        their count ('value'/'label' for choices, 'min'/'max' for ranges)
+    """
+    aggregates = {'total': Count('pk', filter=combine(filters) or None)}
+    options = {}
+
+    for _, field, choices in CHOICE_FACETS:
+        others = combine(filters, exclude=field)
+        options[field] = []
+        for index, (value, label) in enumerate(choices):
+            alias = f'{field}_{index}'
+            aggregates[alias] = Count('pk', filter=others & Q(**{field: value}))
+            options[field].append({'alias': alias, 'value': value, 'label': label})
+
+    for _, _, field in RANGE_FILTERS:
+        others = combine(filters, exclude=field)
+        options[field] = []
+        for index, (minimum, maximum) in enumerate(get_range_buckets(field, offer_type)):
+            alias = f'{field}_{index}'
+            aggregates[alias] = Count('pk', filter=others & range_condition(field, minimum, maximum))
+            options[field].append({'alias': alias, 'min': minimum, 'max': maximum})
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    facets = {'total': counts['total']}
+    for field, field_options in options.items():
+        for option in field_options:
+            option['count'] = counts[option.pop('alias')]
+        facets[field] = field_options
+    return facets
@@ -1,6 +1,8 @@
 # REAL_ESTATE_MANAGER/apps/management_properties/forms.py
 
 from django import forms
+from django.urls import reverse_lazy
+from apps.core.autocomplete import AutocompleteSelect
 from .models import Property
 from apps.management_clients.models import Client
 
@@ -22,6 +24,11 @@ class PropertyForm(forms.ModelForm):
             'requirements': forms.Textarea(attrs={'rows': 3}),
             'comments': forms.Textarea(attrs={'rows': 3}),
             'amenities': forms.Textarea(attrs={'rows': 3}),
+            # Only the selected owner is rendered; the others are searched as the user types
+            'current_owner': AutocompleteSelect(
+                reverse_lazy('clients:client_autocomplete'),
+                {'type': Client.ClientType.OWNER, 'active': 1},
+            ),
         }
         help_texts = {
             'price': 'Enter the price in Chilean Pesos (CLP)',
@@ -80,4 +87,77 @@ class PropertyForm(forms.ModelForm):
             if old_owner != property_instance.current_owner:
                 property_instance.change_owner(property_instance.current_owner)
         
-        return property_instance
\ No newline at end of file
+        return property_instance
+
+class PropertyImportForm(PropertyForm):
+    """
+    PropertyForm validation for bulk imports.
+    
+    The owner is resolved by the importer from a pre-built email lookup, so the
+    current_owner field (and the queryset it builds for every row) is left out.
+    """
+    class Meta(PropertyForm.Meta):
+        fields = [name for name in PropertyForm.Meta.fields if name != 'current_owner']
+
+    def __init__(self, *args, **kwargs):
+        # Skip PropertyForm.__init__, which only narrows the current_owner choices
+        forms.ModelForm.__init__(self, *args, **kwargs)
+
+class PropertyFilterForm(forms.Form):
+    """
+    Validates the filters of the property list.
+    
+    Invalid values are ignored by the list instead of raising an error, so a bad
+    query string only drops the filter it carries.
+    """
+    status = forms.ChoiceField(choices=[('', 'Todos')] + Property.PropertyStatus.choices, required=False)
+    type = forms.ChoiceField(choices=[('', 'Todos')] + Property.PropertyType.choices, required=False)
+    offer = forms.ChoiceField(choices=[('', 'Todos')] + Property.OfferType.choices, required=False)
+    price_min = forms.IntegerField(min_value=0, required=False)
+    price_max = forms.IntegerField(min_value=0, required=False)
+    m2_min = forms.IntegerField(min_value=0, required=False)
+    m2_max = forms.IntegerField(min_value=0, required=False)
+    bedrooms_min = forms.IntegerField(min_value=0, required=False)
+    bedrooms_max = forms.IntegerField(min_value=0, required=False)
+    
+    def get_filters(self):
+        """Return the cleaned value of every valid, non-empty filter."""
+        self.is_valid()
+        return {
+            name: value for name, value in self.cleaned_data.items()
+            if value not in (None, '')
+        }
+
+class PropertyImageForm(forms.Form):
+    """Upload of one property photo."""
+    image = forms.ImageField(label='Foto')
+    caption = forms.CharField(label='Descripción', max_length=255, required=False)
+
+class PriceCheckForm(forms.Form):
+    """Parameters of the price per m² check called by the property form."""
+    property_type = forms.ChoiceField(choices=Property.PropertyType.choices)
+    offer_type = forms.ChoiceField(choices=Property.OfferType.choices)
+    bedrooms = forms.IntegerField(min_value=0)
+    price = forms.IntegerField(min_value=0)
+    square_meters = forms.IntegerField(min_value=1)
+    # Id of the property being edited, left out of the comparison
+    exclude = forms.IntegerField(required=False)
+
+class PortfolioTransferForm(forms.Form):
+    """New owner and date of a transfer of several properties, asked by the admin action."""
+    to_owner = forms.ModelChoiceField(
+        queryset=Client.objects.none(),
+        label='New owner',
+        widget=AutocompleteSelect(
+            reverse_lazy('clients:client_autocomplete'),
+            {'type': Client.ClientType.OWNER, 'active': 1},
+        ),
+    )
+    date = forms.DateField(label='Transfer date', widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, from_owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        owners = Client.objects.filter(client_type=Client.ClientType.OWNER, is_active=True)
+        if from_owner is not None:
+            owners = owners.exclude(pk=from_owner.pk)
+        self.fields['to_owner'].queryset = owners
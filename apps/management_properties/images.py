@@ -0,0 +1,182 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/images.py
+
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# WebP quality of the renditions (0-100)
+WEBP_QUALITY = 80
+
+# Bytes hashed per read while fingerprinting an upload
+CHUNK_SIZE = 64 * 1024
+
+
+def read_image_info(upload):
+    """
+    Fingerprint an uploaded image and read its dimensions.
+
+    Args:
+        upload (File): The uploaded file
+
+    Returns:
+        tuple: (SHA-256 hex digest, width, height), with the dimensions after EXIF rotation
+
+    Raises:
+        ValidationError: If the file is not an image Pillow can read
+    """
+    from django.core.exceptions import ValidationError
+
+    digest = hashlib.sha256()
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+            # Renditions are rotated upright, so report the rotated size
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+    except (UnidentifiedImageError, OSError):
+        raise ValidationError("El archivo no es una imagen válida.")
+    finally:
+        upload.seek(0)
+
+    return digest.hexdigest(), width, height
+
+
+def render_renditions(data, widths, quality=WEBP_QUALITY):
+    """
+    Resize an original to every rendition width and encode each as WebP.
+
+    Runs in a worker process: it only needs the image bytes and touches neither the
+    database nor the storage.
+
+    Args:
+        data (bytes): The original image file
+        widths (dict): Rendition name -> target width in pixels
+        quality (int): WebP quality
+
+    Returns:
+        dict: Rendition name -> WebP bytes
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # JPEG can decode straight to a reduced scale, much cheaper than a full decode.
+        # Both sides stay at least as large as the widest rendition, whatever the rotation
+        largest = max(widths.values())
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+        renditions = {}
+        # Widest first, each rendition resized from the previous one
+        for name, width in sorted(widths.items(), key=lambda item: item[1], reverse=True):
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, 'WEBP', quality=quality, method=4)
+            renditions[name] = output.getvalue()
+
+    return renditions
+
+
+def generate_renditions(images, workers=None, batch_size=50):
+    """
+    Generate the missing renditions of property images in a process pool.
+
+    Every distinct original is rendered once, however many images share it, and all
+    the images sharing it are then marked ready (or failed).
+
+    Args:
+        images (QuerySet): PropertyImage rows to render
+        workers (int, optional): Number of worker processes. Defaults to the CPU count
+        batch_size (int): Originals submitted to the pool at a time
+
+    Returns:
+        dict: Numbers of 'rendered' and 'failed' originals, and the 'errors' list of
+        (original name, message) pairs
+    """
+    from django.core.files.base import ContentFile
+    from django.db import connections
+    from .models import PropertyImage
+
+    originals = dict(images.order_by().values_list('content_hash', 'original').distinct())
+    storage = PropertyImage._meta.get_field('original').storage
+    summary = {'rendered': 0, 'failed': 0, 'errors': []}
+    if not originals:
+        return summary
+
+    # Worker processes must not inherit open database connections
+    connections.close_all()
+
+    hashes = list(originals)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for start in range(0, len(hashes), batch_size):
+            batch = hashes[start:start + batch_size]
+            futures = {}
+            ready, failed = [], []
+            for content_hash in batch:
+                try:
+                    with storage.open(originals[content_hash], 'rb') as original:
+                        data = original.read()
+                except OSError as error:
+                    failed.append(content_hash)
+                    summary['errors'].append((originals[content_hash], str(error)))
+                    continue
+                futures[content_hash] = executor.submit(
+                    render_renditions, data, PropertyImage.RENDITION_WIDTHS
+                )
+
+            for content_hash, future in futures.items():
+                try:
+                    renditions = future.result()
+                except Exception as error:
+                    failed.append(content_hash)
+                    summary['errors'].append((originals[content_hash], str(error)))
+                    continue
+
+                image = PropertyImage(content_hash=content_hash)
+                for rendition, content in renditions.items():
+                    name = image.get_rendition_name(rendition)
+                    # Keep the content-derived name: replace a stale file instead of renaming
+                    if storage.exists(name):
+                        storage.delete(name)
+                    storage.save(name, ContentFile(content))
+                ready.append(content_hash)
+
+            PropertyImage.objects.filter(content_hash__in=ready).update(
+                rendition_status=PropertyImage.RenditionStatus.READY
+            )
+            PropertyImage.objects.filter(content_hash__in=failed).update(
+                rendition_status=PropertyImage.RenditionStatus.FAILED
+            )
+            summary['rendered'] += len(ready)
+            summary['failed'] += len(failed)
+
+    return summary
+
+
+def delete_files(content_hash, original_name):
+    """
+    Delete an original and its renditions once no image uses them anymore.
+
+    Args:
+        content_hash (str): Hash of the deleted image
+        original_name (str): Storage name of its original
+    """
+    from .models import PropertyImage
+
+    if PropertyImage.objects.filter(content_hash=content_hash).exists():
+        return
+
+    storage = PropertyImage._meta.get_field('original').storage
+    image = PropertyImage(content_hash=content_hash)
+    for name in [original_name, *(image.get_rendition_name(r) for r in PropertyImage.RENDITION_WIDTHS)]:
+        if name and storage.exists(name):
+            storage.delete(name)
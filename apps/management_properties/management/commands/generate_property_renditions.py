@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.management_properties import images
+from apps.management_properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Generate the thumbnail, medium and large WebP renditions of pending property images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Originals submitted to the pool at a time (default: 50)')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Also retry the images whose rendering failed')
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate the renditions of every image, e.g. after changing the sizes')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        queryset = PropertyImage.objects.all()
+        if not options['all']:
+            statuses = [PropertyImage.RenditionStatus.PENDING]
+            if options['retry_failed']:
+                statuses.append(PropertyImage.RenditionStatus.FAILED)
+            queryset = queryset.filter(rendition_status__in=statuses)
+
+        summary = images.generate_renditions(
+            queryset, workers=options['workers'], batch_size=options['batch_size']
+        )
+
+        for name, message in summary['errors']:
+            self.stderr.write(f'{name}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {summary['rendered']} images, {summary['failed']} failed."
+        ))
@@ -0,0 +1,171 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django import forms
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.management_clients.models import Client, PropertyOwnership
+from apps.management_properties import search
+from apps.management_properties.forms import PropertyImportForm
+from apps.management_properties.models import Property
+
+# Values accepted as "yes" in the boolean columns of a CSV file
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'si', 'sí', 'x'}
+
+
+class Command(BaseCommand):
+    help = 'Import properties from a CSV or JSONL file, validated with the PropertyForm rules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the CSV or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Properties inserted per bulk_create batch (default: 500)')
+        parser.add_argument('--errors', help='Path of the error report (default: <path>.errors.csv)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='File encoding (default: utf-8-sig)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only validate the file, without saving anything')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        # One query for every active owner; each row is then resolved with a dict lookup.
+        # An email shared by several owners maps to None: the row is rejected rather
+        # than given to whichever owner came last
+        owners = {}
+        for email, pk in Client.objects.filter(
+            client_type=Client.ClientType.OWNER,
+            is_active=True
+        ).values_list('email', 'pk').iterator():
+            email = email.strip().lower()
+            owners[email] = None if email in owners else pk
+
+        boolean_fields = {
+            name for name, field in PropertyImportForm.base_fields.items()
+            if isinstance(field, forms.BooleanField)
+        }
+
+        error_path = options['errors'] or f'{path}.errors.csv'
+        created = errors = 0
+
+        try:
+            with open(path, encoding=options['encoding'], newline='') as source, \
+                    open(error_path, 'w', encoding='utf-8', newline='') as report:
+                error_writer = csv.writer(report)
+                error_writer.writerow(['line', 'field', 'message'])
+
+                rows = self.read_rows(source, file_format)
+                while True:
+                    chunk = list(islice(rows, batch_size))
+                    if not chunk:
+                        break
+
+                    batch = []
+                    for line_number, row in chunk:
+                        instance, row_errors = self.build_property(row, owners, boolean_fields)
+                        if row_errors:
+                            errors += 1
+                            for field, message in row_errors:
+                                error_writer.writerow([line_number, field, message])
+                        else:
+                            batch.append(instance)
+
+                    if batch and not options['dry_run']:
+                        self.insert_batch(batch)
+                    created += len(batch)
+                    self.stdout.write(f'{created} properties processed, {errors} rows with errors...')
+        except OSError as error:
+            raise CommandError(error)
+
+        if not errors:
+            os.remove(error_path)
+
+        verb = 'would be imported' if options['dry_run'] else 'imported'
+        message = f'{created} properties {verb}, {errors} rows rejected.'
+        if errors:
+            message += f' See {error_path}.'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def read_rows(self, source, file_format):
+        """Yield (line_number, row dict) pairs without loading the file in memory."""
+        if file_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                row = {'__error__': f'Invalid JSON: {error}'}
+            yield line_number, row if isinstance(row, dict) else {'__error__': 'Expected a JSON object'}
+
+    def build_property(self, row, owners, boolean_fields):
+        """
+        Validate a row with the PropertyForm rules and resolve its owner.
+        
+        Returns:
+            tuple: (unsaved Property or None, list of (field, message) errors)
+        """
+        if '__error__' in row:
+            return None, [('', row['__error__'])]
+
+        data = {}
+        for name, value in row.items():
+            if name in boolean_fields and isinstance(value, str):
+                value = value.strip().lower() in TRUE_VALUES
+            data[name] = value.strip() if isinstance(value, str) else value
+
+        form = PropertyImportForm(data)
+        row_errors = [
+            (field, message)
+            for field, messages in form.errors.items()
+            for message in messages
+        ]
+
+        owner_email = (data.get('owner_email') or '').lower()
+        owner_id = owners.get(owner_email)
+        if owner_email and owner_email not in owners:
+            row_errors.append(('owner_email', f'No active owner with email {owner_email}'))
+        elif owner_email and owner_id is None:
+            row_errors.append(('owner_email', f'Several active owners have the email {owner_email}'))
+
+        if row_errors:
+            return None, row_errors
+
+        instance = form.save(commit=False)
+        instance.current_owner_id = owner_id
+        return instance, []
+
+    def insert_batch(self, batch):
+        """Insert a batch of properties, their initial ownership records and search index entries."""
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            for instance, code in zip(batch, Property.reserve_codes(len(batch))):
+                instance.property_code = code
+            Property.objects.bulk_create(batch)
+
+            # bulk_create sets the primary keys on PostgreSQL and SQLite
+            PropertyOwnership.objects.bulk_create([
+                PropertyOwnership(property=instance, owner_id=instance.current_owner_id, start_date=today)
+                for instance in batch
+                if instance.current_owner_id
+            ])
+
+            # bulk_create skips the post_save signals that keep the search index and the
+            # owner counters in sync
+            search.index_properties(batch)
+            Client.recount_counters(instance.current_owner_id for instance in batch)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.management_properties import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text property search index from the property table'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The full-text index is only available on SQLite with FTS5.')
+
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} properties.'))
@@ -0,0 +1,206 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/market_stats.py
+
+import numpy as np
+
+from .models import Property
+from .snapshots import PropertySnapshot, SnapshotCache, choice_codes
+
+# Listings on the market, which the statistics are computed from
+ACTIVE_STATUSES = (Property.PropertyStatus.AVAILABLE, Property.PropertyStatus.RESERVED)
+
+# Bedroom counts from this one up are grouped together
+BEDROOM_CAP = 5
+
+# A bedroom group with fewer listings falls back to all the bedroom counts
+MIN_SAMPLE = 5
+
+# Prices per m² outside [p25 - k·IQR, p75 + k·IQR] are flagged (Tukey's fences)
+OUTLIER_IQR_FACTOR = 1.5
+
+# Percentiles reported for every group
+QUARTILES = (25, 50, 75)
+
+PROPERTY_TYPES = [value for value, _ in Property.PropertyType.choices]
+OFFER_TYPES = [value for value, _ in Property.OfferType.choices]
+
+
+class InventorySnapshot(PropertySnapshot):
+    """Price per m² of every property with its type, offer type and bedroom count."""
+    source_columns = (
+        'id', 'updated_at', 'status', 'property_type', 'offer_type', 'bedrooms', 'price', 'square_meters',
+    )
+
+    def get_array_specs(self):
+        return {
+            'property_types': ((), np.int8),
+            'offer_types': ((), np.int8),
+            'bedrooms': ((), np.int16),
+            'price_per_m2': ((), np.float64),
+            'active': ((), bool),
+        }
+
+    def write(self, indexes, rows):
+        self.property_types[indexes] = choice_codes(rows, 'property_type', PROPERTY_TYPES)
+        self.offer_types[indexes] = choice_codes(rows, 'offer_type', OFFER_TYPES)
+        self.bedrooms[indexes] = [min(row['bedrooms'] or 0, BEDROOM_CAP) for row in rows]
+        self.price_per_m2[indexes] = [
+            float(row['price']) / float(row['square_meters']) if row['square_meters'] else np.nan
+            for row in rows
+        ]
+        self.active[indexes] = [row['status'] in ACTIVE_STATUSES for row in rows]
+
+    def inventory_mask(self):
+        """Rows of the active inventory with a usable price per m²."""
+        size = self.size
+        return (
+            self.alive[:size] & self.active[:size]
+            & (self.property_types[:size] >= 0) & (self.offer_types[:size] >= 0)
+            & np.isfinite(self.price_per_m2[:size])
+        )
+
+    def group_stats(self, by_bedrooms=True):
+        """
+        Compute the price per m² quartiles of every group of the active inventory.
+
+        The rows are sorted once by group and price per m².
+
+        Args:
+            by_bedrooms (bool): Group by bedroom count too, not only by type and offer
+
+        Returns:
+            list: One dict per group with property_type, offer_type, bedrooms (None when
+            not grouped by bedrooms), count, p25, median and p75
+        """
+        mask = self.inventory_mask()
+        values = self.price_per_m2[:self.size][mask]
+        keys = (
+            self.property_types[:self.size][mask].astype(np.int64) * len(OFFER_TYPES)
+            + self.offer_types[:self.size][mask]
+        )
+        if by_bedrooms:
+            keys = keys * (BEDROOM_CAP + 1) + self.bedrooms[:self.size][mask]
+
+        order = np.lexsort((values, keys))
+        keys, values = keys[order], values[order]
+        group_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+
+        # Every group is a sorted slice, so its quartiles are read off directly with
+        # the linear interpolation of np.percentile, for all the groups at once
+        positions = starts[:, None] + np.array(QUARTILES) / 100 * (counts[:, None] - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, (starts + counts - 1)[:, None])
+        quartiles = values[lower] + (values[upper] - values[lower]) * (positions - lower)
+
+        groups = []
+        for key, count, (p25, median, p75) in zip(group_keys.tolist(), counts.tolist(), quartiles.tolist()):
+            bedrooms = None
+            if by_bedrooms:
+                key, bedrooms = divmod(key, BEDROOM_CAP + 1)
+            property_type, offer_type = divmod(key, len(OFFER_TYPES))
+            groups.append({
+                'property_type': PROPERTY_TYPES[property_type],
+                'offer_type': OFFER_TYPES[offer_type],
+                'bedrooms': bedrooms,
+                'count': count,
+                'p25': round(p25),
+                'median': round(median),
+                'p75': round(p75),
+            })
+        return groups
+
+    def stats_for(self, property_type, offer_type, bedrooms=None, exclude=None):
+        """
+        Compute the price per m² quartiles of one group of the active inventory.
+
+        Args:
+            property_type (str): Property type of the group
+            offer_type (str): Offer type of the group
+            bedrooms (int, optional): Bedroom count of the group, all counts if None
+            exclude (int, optional): Id of a property to leave out, e.g. the one being edited
+
+        Returns:
+            dict: count, p25, median and p75 (None when the group is empty)
+        """
+        if property_type not in PROPERTY_TYPES or offer_type not in OFFER_TYPES:
+            return summarize(np.empty(0))
+
+        size = self.size
+        mask = (
+            self.inventory_mask()
+            & (self.property_types[:size] == PROPERTY_TYPES.index(property_type))
+            & (self.offer_types[:size] == OFFER_TYPES.index(offer_type))
+        )
+        if bedrooms is not None:
+            mask &= self.bedrooms[:size] == min(bedrooms, BEDROOM_CAP)
+        if exclude in self.rows_by_id:
+            mask[self.rows_by_id[exclude]] = False
+        return summarize(self.price_per_m2[:size][mask])
+
+
+def summarize(values):
+    """Return the count and quartiles of prices per m², rounded to whole pesos."""
+    if not len(values):
+        return {'count': 0, 'p25': None, 'median': None, 'p75': None}
+    p25, median, p75 = np.percentile(values, QUARTILES)
+    return {'count': len(values), 'p25': round(p25), 'median': round(median), 'p75': round(p75)}
+
+
+_cache = SnapshotCache(InventorySnapshot)
+
+# The process-wide snapshot, kept current by the signal handlers
+get_snapshot = _cache.get
+update_property = _cache.update
+remove_property = _cache.remove
+reset = _cache.reset
+
+
+def price_check(property_type, offer_type, bedrooms, price, square_meters, exclude=None):
+    """
+    Compare a price with the active inventory of the same type, offer and bedroom count.
+
+    Falls back to all bedroom counts when the bedroom group has fewer than MIN_SAMPLE
+    listings.
+
+    Args:
+        property_type (str): Property type of the listing
+        offer_type (str): Offer type of the listing
+        bedrooms (int): Bedroom count of the listing
+        price (int): Asked price
+        square_meters (int): Surface of the listing
+        exclude (int, optional): Id of the listing when it already exists
+
+    Returns:
+        dict: The listing's price_per_m2, the group compared with ('bedrooms' is None
+        after a fallback), its statistics and a 'verdict': 'low', 'high', 'ok', or
+        'unknown' when there are too few comparable listings
+    """
+    snapshot = get_snapshot()
+    group_bedrooms = min(bedrooms, BEDROOM_CAP)
+    stats = snapshot.stats_for(property_type, offer_type, group_bedrooms, exclude=exclude)
+    if stats['count'] < MIN_SAMPLE:
+        group_bedrooms = None
+        stats = snapshot.stats_for(property_type, offer_type, exclude=exclude)
+
+    price_per_m2 = round(price / square_meters)
+    verdict = 'unknown'
+    low_fence = high_fence = None
+    if stats['count'] >= MIN_SAMPLE:
+        spread = OUTLIER_IQR_FACTOR * (stats['p75'] - stats['p25'])
+        low_fence, high_fence = round(stats['p25'] - spread), round(stats['p75'] + spread)
+        if price_per_m2 < low_fence:
+            verdict = 'low'
+        elif price_per_m2 > high_fence:
+            verdict = 'high'
+        else:
+            verdict = 'ok'
+
+    return {
+        'price_per_m2': price_per_m2,
+        'property_type': property_type,
+        'offer_type': offer_type,
+        'bedrooms': group_bedrooms,
+        **stats,
+        'low_fence': low_fence,
+        'high_fence': high_fence,
+        'verdict': verdict,
+    }
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+def seed_property_code_sequence(apps, schema_editor):
+    """Start the property code sequence after the highest numeric code in use."""
+    Property = apps.get_model('management_properties', 'Property')
+    Sequence = apps.get_model('management_properties', 'Sequence')
+
+    # Compare numerically: a string sort puts P9999 after P10000
+    last_value = 0
+    for code in Property.objects.values_list('property_code', flat=True).iterator():
+        if code[1:].isdigit():
+            last_value = max(last_value, int(code[1:]))
+
+    Sequence.objects.update_or_create(name='property_code', defaults={'last_value': last_value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_properties', '0002_property_current_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0, help_text='Last number handed out')),
+            ],
+        ),
+        migrations.RunPython(seed_property_code_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+INDEX_TABLE = 'management_properties_property_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the FTS5 property index (SQLite only; other databases use icontains)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+        "address, property_description, amenities, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {INDEX_TABLE} (rowid, address, property_description, amenities) "
+        "SELECT id, address, property_description, amenities FROM management_properties_property"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_properties', '0003_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
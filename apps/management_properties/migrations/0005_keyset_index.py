@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0005_keyset_index'),
+        ('management_properties', '0004_property_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='management__status_cdd576_idx'),
+        ),
+    ]
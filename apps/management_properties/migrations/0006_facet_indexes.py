@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0005_keyset_index'),
+        ('management_properties', '0005_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'offer_type', 'property_type', 'price', 'square_meters', 'bedrooms'], name='management__status_0f4b37_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['offer_type', 'price'], name='management__offer_t_5fa653_idx'),
+        ),
+    ]
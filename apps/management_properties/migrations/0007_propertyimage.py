@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:51
+
+import apps.management_properties.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_properties', '0006_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.ImageField(max_length=255, upload_to=apps.management_properties.models.property_image_path)),
+                ('content_hash', models.CharField(db_index=True, editable=False, help_text='SHA-256 of the original file', max_length=64)),
+                ('width', models.PositiveIntegerField(editable=False)),
+                ('height', models.PositiveIntegerField(editable=False)),
+                ('caption', models.CharField(blank=True, max_length=255)),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Display order; the first image is the cover')),
+                ('rendition_status', models.CharField(choices=[('PND', 'Pendiente'), ('RDY', 'Lista'), ('ERR', 'Error')], default='PND', editable=False, max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='management_properties.property')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'indexes': [models.Index(fields=['rendition_status'], name='management__renditi_4e7d84_idx')],
+                'constraints': [models.UniqueConstraint(fields=('property', 'content_hash'), name='unique_property_image_content')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0005_keyset_index'),
+        ('management_properties', '0007_propertyimage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['updated_at'], name='management__updated_3662af_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_properties', '0008_property_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearchIndex',
+            fields=[
+                ('property', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='management_properties.property')),
+                ('document', models.TextField(db_column='management_properties_property_fts')),
+            ],
+            options={
+                'db_table': 'management_properties_property_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,9 +1,61 @@
 # REAL_ESTATE_MANAGER/apps/management_properties/models.py
 
-from django.db import models
+import builtins
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from . import search
+
+
+class Sequence(models.Model):
+    """
+    Named counter used to hand out unique, gap-tolerant numbers such as property codes.
+    
+    The counter row is incremented with a single UPDATE, so concurrent transactions
+    serialize on the row lock instead of racing on a max() lookup.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_value = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Last number handed out"
+    )
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, name, count=1):
+        """
+        Atomically reserve the next block of numbers of a sequence.
+        
+        Must be called inside the transaction that uses the numbers, so the counter row
+        stays locked until the rows using them are inserted.
+        
+        Args:
+            name (str): Name of the sequence
+            count (int): How many consecutive numbers to reserve
+        
+        Returns:
+            range: The reserved numbers
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(last_value=F('last_value') + count):
+                # First use of the sequence: create the row, tolerating a concurrent creator
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, last_value=count)
+                except IntegrityError:
+                    cls.objects.filter(name=name).update(last_value=F('last_value') + count)
+            last_value = cls.objects.values_list('last_value', flat=True).get(name=name)
+
+        return range(last_value - count + 1, last_value + 1)
+
 
 class Property(models.Model):
     class PropertyType(models.TextChoices):
@@ -98,44 +150,254 @@ class Property(models.Model):
         
         change_date = change_date or timezone.now().date()
         
-        # If there was a previous owner, close their ownership period
-        if self.current_owner:
-            # Get the latest ownership record
-            current_ownership = PropertyOwnership.objects.filter(
-                property=self,
-                owner=self.current_owner,
-                end_date=None
-            ).first()
+        with transaction.atomic():
+            # Close the open ownership period, whoever it belongs to: the form and the
+            # admin call this after current_owner already holds the new owner
+            PropertyOwnership.objects.filter(property=self, end_date=None).update(end_date=change_date)
             
-            if current_ownership:
-                current_ownership.end_date = change_date
-                current_ownership.save()
-                
-        # Only create new ownership record if there's a new owner
-        if new_owner is not None:
-            PropertyOwnership.objects.create(
-                property=self,
-                owner=new_owner,
-                start_date=change_date
-            )
-        
-        # Update current owner
-        self.current_owner = new_owner
-        self.save()
+            # Only create new ownership record if there's a new owner
+            if new_owner is not None:
+                PropertyOwnership.objects.create(
+                    property=self,
+                    owner=new_owner,
+                    start_date=change_date
+                )
+            
+            # Update current owner
+            self.current_owner = new_owner
+            self.save()
+
+    # Name of the Sequence row numbering the property codes
+    CODE_SEQUENCE = 'property_code'
+
+    @staticmethod
+    def format_code(number):
+        """
+        Format a property code number: P0001 ... P9999, then P10000 and up.
+        
+        Args:
+            number (int): The sequence number
+        """
+        return f'P{number:04d}'
+
+    @classmethod
+    def reserve_codes(cls, count):
+        """
+        Reserve a block of property codes, e.g. before a bulk import.
+        
+        Args:
+            count (int): How many codes to reserve
+        
+        Returns:
+            list: The reserved codes, in order
+        """
+        return [cls.format_code(number) for number in Sequence.reserve(cls.CODE_SEQUENCE, count)]
 
     def save(self, *args, **kwargs):
-        if not self.property_code:
-            last_property = Property.objects.order_by('-property_code').first()
-            if not last_property:
-                next_number = 1
-            else:
-                last_number = int(last_property.property_code[1:])
-                next_number = last_number + 1
-            self.property_code = f'P{next_number:04d}'
-        super().save(*args, **kwargs)
+        # Take the code from the sequence in the same transaction as the insert
+        with transaction.atomic():
+            if not self.property_code:
+                self.property_code = self.reserve_codes(1)[0]
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.property_code} - {self.address} ({self.get_property_type_display()})"
 
     class Meta:
-        verbose_name_plural = "Properties"
\ No newline at end of file
+        verbose_name_plural = "Properties"
+        indexes = [
+            # Matches the keyset ordering of the property list
+            models.Index(fields=['status', '-created_at', '-id']),
+            # Equality filters of the list followed by its range filters. It holds every
+            # faceted column, so the facet counts are answered from the index alone
+            models.Index(fields=['status', 'offer_type', 'property_type', 'price', 'square_meters', 'bedrooms']),
+            # Price ranges across all statuses, for a given offer type
+            models.Index(fields=['offer_type', 'price']),
+            # Properties changed since the similarity matrix was last synced
+            models.Index(fields=['updated_at']),
+        ]
+
+def property_image_path(instance, filename):
+    """Store originals under their content hash, so identical uploads share one file."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'jpg'
+    return f'{PropertyImage.STORAGE_DIR}/{instance.content_hash[:2]}/{instance.content_hash}.{extension}'
+
+
+class PropertyImageQuerySet(models.QuerySet):
+    def ready(self):
+        """Images whose renditions have been generated."""
+        return self.filter(rendition_status=PropertyImage.RenditionStatus.READY)
+
+
+class PropertyImage(models.Model):
+    """
+    Photo of a property.
+    
+    Files are content addressed: the original and its WebP renditions are named after
+    the SHA-256 of the uploaded bytes, so the same photo is stored and rendered once
+    however many times it is uploaded. Renditions are generated offline by the
+    generate_property_renditions command, never while serving a page.
+    """
+    class RenditionStatus(models.TextChoices):
+        PENDING = 'PND', 'Pendiente'
+        READY = 'RDY', 'Lista'
+        FAILED = 'ERR', 'Error'
+
+    STORAGE_DIR = 'property_images'
+
+    # Target width of every rendition, in pixels. Renditions are never upscaled
+    RENDITION_WIDTHS = {
+        'thumbnail': 320,
+        'medium': 800,
+        'large': 1600,
+    }
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='images'
+    )
+    original = models.ImageField(upload_to=property_image_path, max_length=255)
+    content_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        editable=False,
+        help_text="SHA-256 of the original file"
+    )
+    width = models.PositiveIntegerField(editable=False)
+    height = models.PositiveIntegerField(editable=False)
+    caption = models.CharField(max_length=255, blank=True)
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Display order; the first image is the cover"
+    )
+    rendition_status = models.CharField(
+        max_length=3,
+        choices=RenditionStatus.choices,
+        default=RenditionStatus.PENDING,
+        editable=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PropertyImageQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.property.property_code} - {self.caption or self.content_hash[:12]}"
+
+    # The property field shadows the builtin in this class body
+    @builtins.property
+    def is_ready(self):
+        return self.rendition_status == self.RenditionStatus.READY
+
+    @classmethod
+    def create_from_upload(cls, property, upload, caption=''):
+        """
+        Attach an uploaded photo to a property, reusing the stored file if the same
+        bytes were uploaded before.
+        
+        Args:
+            property (Property): The property the photo belongs to
+            upload (File): The uploaded image
+            caption (str, optional): Caption shown with the photo
+        
+        Returns:
+            PropertyImage: The new image
+        
+        Raises:
+            ValidationError: If the file is not an image or the property already has it
+        """
+        from django.core.exceptions import ValidationError
+        from django.db.models import Max
+        from .images import read_image_info
+        
+        content_hash, width, height = read_image_info(upload)
+        
+        if cls.objects.filter(property=property, content_hash=content_hash).exists():
+            raise ValidationError("Esta foto ya fue subida para esta propiedad.")
+        
+        image = cls(
+            property=property,
+            content_hash=content_hash,
+            width=width,
+            height=height,
+            caption=caption,
+            position=(property.images.aggregate(last=Max('position'))['last'] or 0) + 1,
+        )
+        
+        # Same bytes already stored (maybe for another property): share the file and
+        # the renditions generated for it, which are named after the same hash
+        existing = cls.objects.filter(content_hash=content_hash).first()
+        if existing is not None:
+            image.original.name = existing.original.name
+            image.rendition_status = existing.rendition_status
+            image.save()
+        else:
+            image.original.save(upload.name, upload, save=False)
+            image.save()
+        
+        return image
+
+    def get_rendition_name(self, rendition):
+        """Return the storage name of a rendition of this image."""
+        return f'{self.STORAGE_DIR}/{self.content_hash[:2]}/{self.content_hash}-{rendition}.webp'
+
+    def get_rendition_width(self, rendition):
+        """Return the actual width of a rendition, which is never wider than the original."""
+        return min(self.RENDITION_WIDTHS[rendition], self.width)
+
+    @builtins.property
+    def rendition_urls(self):
+        """URL of every rendition, by name."""
+        storage = self.original.storage
+        return {
+            rendition: storage.url(self.get_rendition_name(rendition))
+            for rendition in self.RENDITION_WIDTHS
+        }
+
+    @builtins.property
+    def srcset(self):
+        """srcset attribute value listing the renditions with their widths."""
+        candidates = {}
+        for rendition, url in self.rendition_urls.items():
+            # Small originals give renditions of the same width: list each width once
+            candidates.setdefault(self.get_rendition_width(rendition), url)
+        return ', '.join(f'{url} {width}w' for width, url in sorted(candidates.items()))
+
+    class Meta:
+        ordering = ['position', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'content_hash'],
+                name='unique_property_image_content'
+            ),
+        ]
+        indexes = [
+            # Pending renditions picked up by generate_property_renditions
+            models.Index(fields=['rendition_status']),
+        ]
+
+
+class PropertySearchIndex(models.Model):
+    """
+    Row of the FTS5 property index, mapped so searches join it through the ORM.
+
+    The virtual table is created by a migration on SQLite only and kept in sync by
+    search.py; Django neither creates nor writes it.
+    """
+    property = models.OneToOneField(
+        Property,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_index'
+    )
+    # The hidden column named after the table: the target of MATCH and of bm25()
+    document = models.TextField(db_column=search.INDEX_TABLE)
+
+    class Meta:
+        managed = False
+        db_table = search.INDEX_TABLE
+
+
+PropertySearchIndex._meta.get_field('document').register_lookup(search.Match)
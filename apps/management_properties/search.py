@@ -0,0 +1,223 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/search.py
+
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+from apps.core.autocomplete import AutocompleteResult, PrefixCache, query_terms
+
+# FTS5 table mirroring the searchable property columns; its rowid is the property id
+INDEX_TABLE = 'management_properties_property_fts'
+INDEX_COLUMNS = ('address', 'property_description', 'amenities')
+
+# bm25 weight of each column, in INDEX_COLUMNS order: address matches rank first
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class Match(Lookup):
+    """FTS5 MATCH on the hidden column of an index table: search_index__document__match='"word"*'."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def is_available():
+    """
+    Return whether the full-text index exists (SQLite with FTS5 only).
+
+    The table list is read once per database connection, not on every save and search.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+
+    connection.ensure_connection()
+    checked = getattr(connection, 'property_index_checked', None)
+    if checked is None or checked[0] is not connection.connection:
+        checked = (connection.connection, INDEX_TABLE in connection.introspection.table_names())
+        connection.property_index_checked = checked
+    return checked[1]
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, as a prefix.
+
+    Args:
+        text (str): The search text typed by the user
+
+    Returns:
+        str: The MATCH expression, or '' if the text has no words
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(text))
+
+
+def index_properties(properties):
+    """
+    Add or refresh properties in the full-text index.
+
+    Args:
+        properties (iterable): Saved Property instances
+    """
+    if not is_available():
+        return
+
+    rows = [
+        (prop.pk, *(getattr(prop, column) or '' for column in INDEX_COLUMNS))
+        for prop in properties
+    ]
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {INDEX_TABLE} (rowid, {", ".join(INDEX_COLUMNS)}) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def remove_property(pk):
+    """
+    Remove a property from the full-text index.
+
+    Args:
+        pk (int): Id of the deleted property
+    """
+    if not is_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    """
+    Rebuild the full-text index from the property table with set-based statements.
+
+    Returns:
+        int: Number of properties indexed
+    """
+    from .models import Property
+
+    columns = ', '.join(INDEX_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {INDEX_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM {Property._meta.db_table}'
+        )
+        cursor.execute(f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {INDEX_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def matching_ids(text, columns=INDEX_COLUMNS):
+    """
+    Return the ids of the properties matching a search, as a subquery.
+
+    Meant for filters on related models, such as Q(property__in=matching_ids(text)).
+    Falls back to icontains on other databases.
+
+    Args:
+        text (str): The search text typed by the user
+        columns (tuple): Indexed columns to search in
+
+    Returns:
+        RawSQL or QuerySet: The matching property ids, or None if the text has no words
+    """
+    from .models import Property
+
+    match = build_match_query(text)
+    if not match:
+        return None
+
+    if not is_available():
+        condition = Q()
+        for word in WORD_RE.findall(text):
+            word_condition = Q()
+            for column in columns:
+                word_condition |= Q(**{f'{column}__icontains': word})
+            condition &= word_condition
+        return Property.objects.filter(condition).values('pk')
+
+    if tuple(columns) != INDEX_COLUMNS:
+        match = f'{{{" ".join(columns)}}} : ({match})'
+    return RawSQL(f'SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s', [match])
+
+
+def search(queryset, text):
+    """
+    Filter a Property queryset by full-text search, best matches first.
+
+    Uses the FTS5 index when available and falls back to icontains on other databases.
+
+    Args:
+        queryset (QuerySet): Properties to search in
+        text (str): The search text typed by the user
+
+    Returns:
+        QuerySet: The matching properties, ordered by relevance
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset
+
+    if not is_available():
+        condition = Q()
+        for word in WORD_RE.findall(text):
+            condition &= (
+                Q(address__icontains=word) |
+                Q(property_description__icontains=word) |
+                Q(amenities__icontains=word)
+            )
+        return queryset.filter(condition)
+
+    # Join the index on rowid so SQLite drives the query from the MATCH lookup and
+    # ranks in the same statement
+    rank = Func(
+        F('search_index__document'), *(Value(weight) for weight in COLUMN_WEIGHTS),
+        function='bm25', output_field=FloatField()
+    )
+    return queryset.filter(search_index__document__match=match).annotate(search_rank=rank).order_by(
+        'search_rank', '-created_at'
+    )
+
+
+# Autocomplete searches of the forms, cleared by the signal handlers on every save
+autocomplete_cache = PrefixCache()
+
+
+def autocomplete_results(queryset, text, limit):
+    """
+    Return the properties of a queryset matching an autocomplete search, by code prefix or address.
+
+    Args:
+        queryset (QuerySet): Properties to search in
+        text (str): The search text typed by the user
+        limit (int): Maximum number of results
+
+    Returns:
+        list: AutocompleteResult, by property code
+    """
+    code = text.strip().upper()
+    if not code:
+        return []
+
+    # A range on the unique code index: LIKE is case-insensitive on SQLite and cannot use it
+    condition = Q(property_code__gte=code, property_code__lt=code + '\U0010ffff')
+    ids = matching_ids(text, columns=('address',))
+    if ids is not None:
+        condition |= Q(pk__in=ids)
+
+    properties = queryset.filter(condition).order_by('property_code')
+    return [
+        AutocompleteResult(prop.pk, str(prop), query_terms(prop.property_code) + query_terms(prop.address))
+        for prop in properties[:limit]
+    ]
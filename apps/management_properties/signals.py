@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import images, market_stats, search, similarity
+from .models import Property, PropertyImage
+
+
+@receiver(post_save, sender=Property)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Refresh the full-text index entry of a saved property."""
+    if update_fields is not None and not set(update_fields) & set(search.INDEX_COLUMNS):
+        return
+    search.index_properties([instance])
+    search.autocomplete_cache.clear()
+
+
+@receiver(post_save, sender=Property)
+def update_snapshots(sender, instance, **kwargs):
+    """Refresh the row of a saved property in this process's in-memory snapshots, once committed."""
+    def update():
+        similarity.update_property(instance)
+        market_stats.update_property(instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop a deleted property from the full-text index."""
+    search.remove_property(instance.pk)
+    search.autocomplete_cache.clear()
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_snapshots(sender, instance, **kwargs):
+    """Drop a deleted property from this process's in-memory snapshots, once committed."""
+    pk = instance.pk
+
+    def remove():
+        similarity.remove_property(pk)
+        market_stats.remove_property(pk)
+
+    transaction.on_commit(remove)
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_unused_image_files(sender, instance, **kwargs):
+    """Delete the files of a removed photo once no other image shares them."""
+    transaction.on_commit(
+        lambda: images.delete_files(instance.content_hash, instance.original.name)
+    )
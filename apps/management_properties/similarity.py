@@ -0,0 +1,158 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/similarity.py
+
+import numpy as np
+
+from .models import Property
+from .snapshots import PropertySnapshot, SnapshotCache, choice_codes
+
+# Columns read from the database for every property, in this order
+SOURCE_COLUMNS = (
+    'id', 'updated_at', 'offer_type', 'status', 'property_type',
+    'price', 'square_meters', 'bedrooms', 'bathrooms', 'has_parking', 'has_storage_unit',
+)
+
+# Weight of every feature in the distance. Numeric features are standardized first,
+# prices and surfaces on a log scale so that relative differences count
+NUMERIC_WEIGHTS = {
+    'price': 3.0,
+    'square_meters': 2.0,
+    'bedrooms': 1.5,
+    'bathrooms': 1.0,
+}
+FLAG_WEIGHTS = {
+    'has_parking': 0.5,
+    'has_storage_unit': 0.25,
+}
+PROPERTY_TYPE_WEIGHT = 2.0
+LOG_SCALED = ('price', 'square_meters')
+
+PROPERTY_TYPES = [value for value, _ in Property.PropertyType.choices]
+OFFER_TYPES = [value for value, _ in Property.OfferType.choices]
+STATUSES = [value for value, _ in Property.PropertyStatus.choices]
+
+
+class FeatureMatrix(PropertySnapshot):
+    """
+    Weighted, standardized feature vectors of every property, for nearest-neighbour queries.
+
+    The scaling of the numeric features is fixed when the matrix is built.
+    """
+    source_columns = SOURCE_COLUMNS
+
+    def prepare(self, rows):
+        numeric = self._numeric_values(rows)
+        self.means = numeric.mean(axis=0) if rows else np.zeros(len(NUMERIC_WEIGHTS))
+        stds = numeric.std(axis=0) if rows else np.ones(len(NUMERIC_WEIGHTS))
+        self.scales = np.array(list(NUMERIC_WEIGHTS.values())) / np.where(stds > 0, stds, 1.0)
+
+    def get_array_specs(self):
+        width = len(NUMERIC_WEIGHTS) + len(FLAG_WEIGHTS) + len(PROPERTY_TYPES)
+        return {
+            'vectors': ((width,), np.float32),
+            'norms': ((), np.float32),
+            'offer_types': ((), np.int8),
+            'statuses': ((), np.int8),
+        }
+
+    @staticmethod
+    def _numeric_values(rows):
+        """Return the raw numeric features of rows, log-scaling prices and surfaces."""
+        numeric = np.array(
+            [[float(row[name] or 0) for name in NUMERIC_WEIGHTS] for row in rows],
+            dtype=np.float64
+        ).reshape(len(rows), len(NUMERIC_WEIGHTS))
+        for position, name in enumerate(NUMERIC_WEIGHTS):
+            if name in LOG_SCALED:
+                numeric[:, position] = np.log1p(numeric[:, position])
+        return numeric
+
+    def write(self, indexes, rows):
+        """Vectorize rows into the given matrix rows."""
+        vectors = np.zeros((len(rows), self.vectors.shape[1]), dtype=np.float32)
+        columns = len(NUMERIC_WEIGHTS)
+        vectors[:, :columns] = (self._numeric_values(rows) - self.means) * self.scales
+        for position, (name, weight) in enumerate(FLAG_WEIGHTS.items()):
+            vectors[:, columns + position] = [weight if row[name] else 0.0 for row in rows]
+        columns += len(FLAG_WEIGHTS)
+        property_types = choice_codes(rows, 'property_type', PROPERTY_TYPES)
+        known = property_types >= 0
+        vectors[np.flatnonzero(known), columns + property_types[known]] = PROPERTY_TYPE_WEIGHT
+
+        self.vectors[indexes] = vectors
+        self.norms[indexes] = np.einsum('ij,ij->i', vectors, vectors)
+        self.offer_types[indexes] = choice_codes(rows, 'offer_type', OFFER_TYPES)
+        self.statuses[indexes] = choice_codes(rows, 'status', STATUSES)
+
+    def nearest(self, pk, k):
+        """
+        Return the available properties with the same offer type closest to a property.
+
+        Args:
+            pk (int): Id of the reference property
+            k (int): Number of neighbours to return
+
+        Returns:
+            list: Ids of the neighbours, closest first
+        """
+        index = self.rows_by_id.get(pk)
+        if index is None or k < 1:
+            return []
+
+        size = self.size
+        candidates = (
+            self.alive[:size]
+            & (self.offer_types[:size] == self.offer_types[index])
+            & (self.statuses[:size] == STATUSES.index(Property.PropertyStatus.AVAILABLE))
+        )
+        candidates[index] = False
+        count = int(candidates.sum())
+        if not count:
+            return []
+
+        # |a - b|² = |a|² - 2 a·b + |b|²: one matrix-vector product instead of
+        # materializing the difference of every row
+        vector = self.vectors[index]
+        distances = self.norms[:size] - 2 * (self.vectors[:size] @ vector) + self.norms[index]
+        distances[~candidates] = np.inf
+
+        k = min(k, count)
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest], kind='stable')]
+        return self.ids[closest].tolist()
+
+
+_cache = SnapshotCache(FeatureMatrix)
+
+# The process-wide matrix, kept current by the signal handlers
+get_matrix = _cache.get
+update_property = _cache.update
+remove_property = _cache.remove
+reset = _cache.reset
+
+
+def similar_properties(property, k=6):
+    """
+    Return the available listings most similar to a property.
+
+    Args:
+        property (Property): The reference property
+        k (int): Number of listings to return
+
+    Returns:
+        list: Property instances, most similar first
+    """
+    # Ask for a few extra ids: rows changed behind the matrix's back (e.g. by
+    # queryset.update()) are checked against the database below
+    ids = get_matrix().nearest(property.pk, k * 2)
+    if not ids:
+        return []
+
+    # Look the rows up by primary key only: with the status and offer type in the
+    # WHERE clause SQLite prefers the facet index and scans every available listing
+    listings = Property.objects.in_bulk(ids)
+    return [
+        listings[pk] for pk in ids
+        if pk in listings
+        and listings[pk].status == Property.PropertyStatus.AVAILABLE
+        and listings[pk].offer_type == property.offer_type
+    ][:k]
@@ -0,0 +1,166 @@
+# REAL_ESTATE_MANAGER/apps/management_properties/snapshots.py
+
+import threading
+
+import numpy as np
+
+from .models import Property
+
+# Rows added beyond the current size when a snapshot has to grow
+GROWTH_FACTOR = 1.5
+
+
+def choice_codes(rows, name, values):
+    """Return the position of every row's value in values, -1 if unknown."""
+    positions = {value: position for position, value in enumerate(values)}
+    return np.array([positions.get(row[name], -1) for row in rows], dtype=np.int8)
+
+
+class PropertySnapshot:
+    """
+    In-memory columns of every property, held in preallocated NumPy arrays.
+
+    Subclasses list the database columns they read in source_columns, declare their
+    arrays in get_array_specs() and fill them in write(). Saving a property updates or
+    appends one row instead of rebuilding the snapshot; deleted properties are only
+    flagged in the alive array.
+    """
+    source_columns = ('id', 'updated_at')
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+
+        capacity = max(len(rows), 64)
+        self.array_names = ['ids', 'alive']
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        for name, (shape, dtype) in self.get_array_specs().items():
+            setattr(self, name, np.zeros((capacity, *shape), dtype=dtype))
+            self.array_names.append(name)
+
+        self.size = len(rows)
+        self.rows_by_id = {row['id']: index for index, row in enumerate(rows)}
+        self.synced_at = None
+        if rows:
+            self._write(np.arange(len(rows)), rows)
+
+    @classmethod
+    def build(cls):
+        """Build the snapshot of every property with a single query."""
+        return cls(Property.objects.values(*cls.source_columns).iterator(chunk_size=5000))
+
+    def prepare(self, rows):
+        """Hook run once with the initial rows, e.g. to fix a scaling."""
+
+    def get_array_specs(self):
+        """Return the per-row arrays of the snapshot: name -> (extra dimensions, dtype)."""
+        return {}
+
+    def write(self, indexes, rows):
+        """Fill the subclass arrays at indexes from rows."""
+        raise NotImplementedError
+
+    def _write(self, indexes, rows):
+        self.write(indexes, rows)
+        self.ids[indexes] = [row['id'] for row in rows]
+        self.alive[indexes] = True
+
+        updated = [row['updated_at'] for row in rows if row.get('updated_at')]
+        if updated and (self.synced_at is None or max(updated) > self.synced_at):
+            self.synced_at = max(updated)
+
+    def _grow(self):
+        capacity = int(len(self.ids) * GROWTH_FACTOR) + 1
+        for name in self.array_names:
+            array = getattr(self, name)
+            grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def upsert(self, row):
+        """
+        Add a property to the snapshot, or refresh its row.
+
+        Args:
+            row (dict): Values of source_columns
+        """
+        index = self.rows_by_id.get(row['id'])
+        if index is None:
+            if self.size == len(self.ids):
+                self._grow()
+            index = self.size
+            self.size += 1
+            self.rows_by_id[row['id']] = index
+
+        self._write(np.array([index]), [row])
+
+    def remove(self, pk):
+        """Drop a deleted property."""
+        index = self.rows_by_id.get(pk)
+        if index is not None:
+            self.alive[index] = False
+
+    def retain(self, ids):
+        """Drop the properties whose id is not in ids, e.g. deleted by another process."""
+        rows = slice(0, self.size)
+        self.alive[rows] &= np.isin(self.ids[rows], ids)
+
+
+class SnapshotCache:
+    """
+    Process-wide instance of a PropertySnapshot, built on first use.
+
+    Properties saved by other processes (or by bulk_create) since the last call are
+    picked up through an indexed updated_at query, so the snapshot stays current
+    without being rebuilt. Deletions that sent no signal (another process, or a
+    queryset delete()) show up as more live rows than properties, and are then
+    dropped by comparing the ids. Saves and deletes in this process are applied
+    directly by the signal handlers.
+    """
+
+    def __init__(self, snapshot_class):
+        self.snapshot_class = snapshot_class
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the up-to-date snapshot."""
+        with self.lock:
+            if self.snapshot is None:
+                self.snapshot = self.snapshot_class.build()
+            elif self.snapshot.synced_at is not None:
+                changed = Property.objects.filter(
+                    updated_at__gte=self.snapshot.synced_at
+                ).values(*self.snapshot_class.source_columns)
+                for row in changed:
+                    self.snapshot.upsert(row)
+                self._sync_deletions()
+            return self.snapshot
+
+    def _sync_deletions(self):
+        # Every property is in the snapshot after the upserts, so equal counts mean
+        # nothing was deleted and the ids need not be read
+        if int(self.snapshot.alive.sum()) == Property.objects.count():
+            return
+        ids = Property.objects.values_list('id', flat=True).iterator(chunk_size=5000)
+        self.snapshot.retain(np.fromiter(ids, dtype=np.int64))
+
+    def update(self, instance):
+        """Refresh the row of a saved property, if the snapshot was built in this process."""
+        with self.lock:
+            if self.snapshot is not None:
+                self.snapshot.upsert({
+                    name: getattr(instance, name) for name in self.snapshot_class.source_columns
+                })
+
+    def remove(self, pk):
+        """Drop a deleted property, if the snapshot was built in this process."""
+        with self.lock:
+            if self.snapshot is not None:
+                self.snapshot.remove(pk)
+
+    def reset(self):
+        """Discard the snapshot; the next call rebuilds it."""
+        with self.lock:
+            self.snapshot = None
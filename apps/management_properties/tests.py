@@ -1,3 +1,743 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.management_clients.models import Client, PropertyOwnership
+from . import search
+from .models import Property, PropertyImage, Sequence
+
+
+def create_property(**kwargs):
+    """Create an available 60 m², two bedroom house for rent at $500.000, with any field overridden."""
+    values = {
+        'address': "Test Address",
+        'property_type': Property.PropertyType.HOUSE,
+        'offer_type': Property.OfferType.RENT,
+        'price': 500000,
+        'square_meters': 60,
+        'bedrooms': 2,
+        'bathrooms': 1,
+        'property_description': "Test property",
+        'date_published': timezone.datetime(2024, 1, 1).date(),
+    }
+    values.update(kwargs)
+    return Property.objects.create(**values)
+
+
+class PropertyCodeTests(TestCase):
+    """Tests for the property codes handed out by the code sequence."""
+    
+    def setUp(self):
+        """Start the code sequence from zero."""
+        Sequence.objects.update_or_create(name=Property.CODE_SEQUENCE, defaults={'last_value': 0})
+    
+    def test_codes_are_sequential(self):
+        """Test new properties get consecutive codes and keep them when saved again."""
+        codes = [create_property(address=f"Address {number}").property_code for number in range(3)]
+        self.assertEqual(codes, ['P0001', 'P0002', 'P0003'])
+        
+        prop = Property.objects.get(property_code='P0002')
+        prop.price = 600000
+        prop.save()
+        self.assertEqual(Property.objects.get(pk=prop.pk).property_code, 'P0002')
+    
+    def test_block_reservation(self):
+        """Test a reserved block is skipped by the following saves."""
+        self.assertEqual(Property.reserve_codes(3), ['P0001', 'P0002', 'P0003'])
+        self.assertEqual(create_property().property_code, 'P0004')
+        
+        # A new sequence starts from one
+        self.assertEqual(Sequence.reserve('other', 2), range(1, 3))
+        self.assertEqual(Sequence.objects.get(name='other').last_value, 2)
+        with self.assertRaises(ValueError):
+            Sequence.reserve('other', 0)
+    
+    def test_codes_past_p9999(self):
+        """Test the codes widen after P9999 and keep counting numerically."""
+        Sequence.objects.filter(name=Property.CODE_SEQUENCE).update(last_value=9998)
+        codes = [create_property(address=f"Address {number}").property_code for number in range(3)]
+        
+        self.assertEqual(codes, ['P9999', 'P10000', 'P10001'])
+    
+    def test_sequence_seeded_from_existing_codes(self):
+        """Test the migration starts after the highest numeric code and blank codes are filled on save."""
+        from importlib import import_module
+        from django.apps import apps
+        
+        migration = import_module('apps.management_properties.migrations.0003_sequence')
+        first, second, third = [create_property(address=f"Address {number}") for number in range(3)]
+        Property.objects.filter(pk=first.pk).update(property_code='P0007')
+        Property.objects.filter(pk=second.pk).update(property_code='P10002')
+        Property.objects.filter(pk=third.pk).update(property_code='LEGACY-1')
+        Sequence.objects.all().delete()
+        
+        migration.seed_property_code_sequence(apps, None)
+        self.assertEqual(Sequence.objects.get(name=Property.CODE_SEQUENCE).last_value, 10002)
+        
+        Property.objects.filter(pk=third.pk).update(property_code='')
+        third.refresh_from_db()
+        third.save()
+        self.assertEqual(third.property_code, 'P10003')
+
+
+class PropertyFacetTests(TestCase):
+    """Tests for the faceted property list."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        
+        # (offer type, status, price, square meters, bedrooms)
+        listings = [
+            (Property.OfferType.RENT, Property.PropertyStatus.AVAILABLE, 500000, 60, 2),
+            (Property.OfferType.RENT, Property.PropertyStatus.AVAILABLE, 400000, 45, 1),
+            (Property.OfferType.RENT, Property.PropertyStatus.AVAILABLE, 900000, 80, 3),
+            (Property.OfferType.RENT, Property.PropertyStatus.RENTED, 1500000, 120, 4),
+            (Property.OfferType.SALE, Property.PropertyStatus.AVAILABLE, 150000000, 150, 3),
+            (Property.OfferType.SALE, Property.PropertyStatus.SOLD, 450000000, 300, 5),
+        ]
+        for offer_type, status, price, square_meters, bedrooms in listings:
+            create_property(
+                property_type=Property.PropertyType.APARTMENT,
+                offer_type=offer_type,
+                status=status,
+                price=price,
+                square_meters=square_meters,
+                bedrooms=bedrooms,
+            )
+        
+        self.client.login(username='agent', password='testpass123')
+        self.url = reverse('properties:property_list')
+    
+    def options(self, response, title):
+        """Return the (label, count) pairs of a facet group."""
+        group = next(group for group in response.context['facet_groups'] if group['title'] == title)
+        return [(option['label'], option['count']) for option in group['options']]
+    
+    def test_counts_ignore_their_own_filter(self):
+        """Test every facet is counted with the other filters only."""
+        response = self.client.get(self.url, {'offer': 'RENT'})
+        
+        self.assertEqual(response.context['result_count'], 3)
+        self.assertEqual(len(response.context['properties']), 3)
+        self.assertEqual(
+            self.options(response, 'Estado'),
+            [('Disponible', 3), ('Reservada', 0), ('Arrendada', 1), ('Vendida', 0)]
+        )
+        self.assertEqual(self.options(response, 'Tipo Oferta'), [('Arriendo', 3), ('Venta', 1)])
+        self.assertEqual(
+            self.options(response, 'Precio'),
+            [('Hasta $500.000', 2), ('$500.001 - $1.000.000', 1),
+             ('$1.000.001 - $2.000.000', 0), ('$2.000.001 o más', 0)]
+        )
+    
+    def test_range_filters(self):
+        """Test the price, square meter and bedroom ranges filter the list."""
+        response = self.client.get(self.url, {'status': '', 'bedrooms_min': 3, 'm2_max': 200})
+        
+        self.assertEqual(response.context['result_count'], 3)
+        self.assertEqual(
+            sorted(int(prop.price) for prop in response.context['properties']),
+            [900000, 1500000, 150000000]
+        )
+        self.assertEqual(
+            self.options(response, 'Dormitorios'),
+            [('Hasta 1 dorm.', 1), ('2 dorm.', 1), ('3 dorm.', 2), ('4 dorm. o más', 1)]
+        )
+    
+    def test_invalid_filters_are_ignored(self):
+        """Test a malformed filter is dropped instead of failing the page."""
+        response = self.client.get(self.url, {'price_min': 'abc', 'type': 'CASTLE'})
+        
+        # Only the default status filter is left
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result_count'], 4)
+    
+    def test_facet_links(self):
+        """Test facet links select an option and clicking it again clears it."""
+        response = self.client.get(self.url, {'offer': 'SALE'})
+        group = next(group for group in response.context['facet_groups'] if group['title'] == 'Tipo Oferta')
+        sale = group['options'][1]
+        
+        self.assertTrue(sale['selected'])
+        self.assertNotIn('offer=', sale['url'])
+        self.assertIn('offer=RENT', group['options'][0]['url'])
+    
+    def test_facets_are_counted_in_one_query(self):
+        """Test all the facet counts come from a single statement."""
+        from apps.management_properties import facets
+        
+        filters = facets.build_filters({'status': 'AVL', 'offer': 'RENT', 'price_max': 1000000})
+        with CaptureQueriesContext(connection) as queries:
+            counts = facets.count_facets(Property.objects.all(), filters, offer_type='RENT')
+        
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(
+            counts['total'],
+            Property.objects.filter(status='AVL', offer_type='RENT', price__lte=1000000).count()
+        )
+    
+    def test_list_pages_by_cursor_and_keeps_filters(self):
+        """Test the list pages with a cursor, and a search falls back to page numbers."""
+        for index in range(12):
+            create_property(address=f"Extra Address {index}")
+        expected = set(Property.objects.filter(status='AVL', offer_type='RENT').values_list('pk', flat=True))
+        
+        seen = []
+        response = self.client.get(self.url, {'offer': 'RENT'})
+        while True:
+            seen.extend(prop.pk for prop in response.context['properties'])
+            next_url = response.context['next_page_url']
+            if next_url is None:
+                break
+            self.assertIn('offer=RENT', next_url)
+            self.assertIn('cursor=', next_url)
+            response = self.client.get(self.url + next_url)
+        
+        self.assertEqual(len(seen), len(expected))
+        self.assertEqual(set(seen), expected)
+        self.assertIn('cursor=', response.context['previous_page_url'])
+        
+        response = self.client.get(self.url, {'q': 'extra'})
+        self.assertEqual(len(response.context['properties']), 10)
+        self.assertIn('page=2', response.context['next_page_url'])
+        self.assertIn('q=extra', response.context['next_page_url'])
+
+
+class PropertyImageTests(TestCase):
+    """Tests for the content-addressed property photos and their renditions."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.property = create_property()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def tearDown(self):
+        """Remove the uploaded files."""
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def make_upload(self, size=(2000, 1500), color='red', name='photo.jpg'):
+        """Return an uploaded JPEG of the given size."""
+        from PIL import Image
+        
+        output = BytesIO()
+        Image.new('RGB', size, color).save(output, 'JPEG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/jpeg')
+    
+    def render(self):
+        """Generate the pending renditions with a single worker."""
+        from apps.management_properties import images
+        
+        return images.generate_renditions(
+            PropertyImage.objects.filter(rendition_status=PropertyImage.RenditionStatus.PENDING),
+            workers=1
+        )
+    
+    def test_identical_uploads_share_one_file(self):
+        """Test the same bytes are stored once and rendered once."""
+        other = create_property(address="Other Address", offer_type=Property.OfferType.SALE, price=100000000)
+        first = PropertyImage.create_from_upload(self.property, self.make_upload(name='a.jpg'))
+        second = PropertyImage.create_from_upload(other, self.make_upload(name='b.jpg'))
+        
+        self.assertEqual(first.original.name, second.original.name)
+        self.assertEqual((first.width, first.height), (2000, 1500))
+        self.assertEqual(self.render()['rendered'], 1)
+        self.assertEqual(
+            PropertyImage.objects.filter(rendition_status=PropertyImage.RenditionStatus.READY).count(), 2
+        )
+        
+        # A later upload of the same photo is ready straight away
+        third = PropertyImage.create_from_upload(
+            create_property(address="Third Address"),
+            self.make_upload(name='c.jpg')
+        )
+        self.assertTrue(third.is_ready)
+    
+    def test_duplicate_upload_for_the_same_property(self):
+        """Test a property cannot get the same photo twice."""
+        PropertyImage.create_from_upload(self.property, self.make_upload())
+        
+        with self.assertRaises(ValidationError):
+            PropertyImage.create_from_upload(self.property, self.make_upload(name='again.jpg'))
+    
+    def test_renditions_are_webp_and_never_upscaled(self):
+        """Test every rendition is a WebP of its target width, capped at the original width."""
+        from PIL import Image
+        
+        image = PropertyImage.create_from_upload(self.property, self.make_upload(size=(1000, 500)))
+        self.render()
+        image.refresh_from_db()
+        
+        storage = image.original.storage
+        widths = {}
+        for rendition in PropertyImage.RENDITION_WIDTHS:
+            with storage.open(image.get_rendition_name(rendition)) as rendered:
+                with Image.open(rendered) as opened:
+                    self.assertEqual(opened.format, 'WEBP')
+                    widths[rendition] = opened.width
+        
+        self.assertEqual(widths, {'thumbnail': 320, 'medium': 800, 'large': 1000})
+        self.assertEqual(
+            image.srcset,
+            f"{image.rendition_urls['thumbnail']} 320w, {image.rendition_urls['medium']} 800w, "
+            f"{image.rendition_urls['large']} 1000w"
+        )
+    
+    def test_pages_only_show_ready_renditions(self):
+        """Test the list and detail pages point at the renditions once they exist."""
+        PropertyImage.create_from_upload(self.property, self.make_upload())
+        detail_url = reverse('properties:property_detail', args=[self.property.property_code])
+        
+        response = self.client.get(detail_url)
+        self.assertEqual(response.context['pending_images'], 1)
+        self.assertNotContains(response, 'srcset=')
+        
+        self.render()
+        response = self.client.get(detail_url)
+        self.assertContains(response, '-large.webp 1600w')
+        
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('properties:property_list'))
+        self.assertContains(response, '-thumbnail.webp 320w')
+    
+    def test_upload_view(self):
+        """Test uploading a photo and rejecting a file that is not an image."""
+        url = reverse('properties:property_image_upload', args=[self.property.property_code])
+        
+        self.client.post(url, {'image': self.make_upload(), 'caption': 'Fachada'})
+        response = self.client.post(url, {
+            'image': SimpleUploadedFile('notes.jpg', b'not an image', content_type='image/jpeg')
+        })
+        
+        self.assertRedirects(response, reverse('properties:property_detail', args=[self.property.property_code]))
+        self.assertEqual(list(self.property.images.values_list('caption', flat=True)), ['Fachada'])
+    
+    def test_files_are_deleted_with_their_last_image(self):
+        """Test shared files survive until no image uses them."""
+        image = PropertyImage.create_from_upload(self.property, self.make_upload())
+        self.render()
+        storage = image.original.storage
+        name = image.original.name
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(image.get_rendition_name('large')))
+
+
+class SimilarPropertiesTests(TestCase):
+    """Tests for the similar properties recommender."""
+    
+    def setUp(self):
+        """Set up test data."""
+        from apps.management_properties import similarity
+        
+        self.similarity = similarity
+        similarity.reset()
+        
+        # A 60 m², 2 bedroom house for rent at $500.000
+        self.property = create_property()
+        self.close = create_property(price=520000, square_meters=62, bedrooms=2)
+        self.farther = create_property(price=900000, square_meters=110, bedrooms=3)
+        self.farthest = create_property(price=2500000, square_meters=300, bedrooms=5)
+        create_property(price=510000, square_meters=60, bedrooms=2, offer_type=Property.OfferType.SALE)
+        create_property(price=500000, square_meters=60, bedrooms=2, status=Property.PropertyStatus.RENTED)
+    
+    def tearDown(self):
+        """Do not leak the matrix into other tests."""
+        self.similarity.reset()
+    
+    def test_closest_comparable_listings_first(self):
+        """Test only available listings with the same offer type are returned, closest first."""
+        similar = self.similarity.similar_properties(self.property, k=5)
+        
+        self.assertEqual(similar, [self.close, self.farther, self.farthest])
+    
+    def test_matrix_is_updated_incrementally(self):
+        """Test saving or deleting a property updates the cached matrix in place."""
+        matrix = self.similarity.get_matrix()
+        closer = create_property(price=500000, square_meters=60, bedrooms=2)
+        self.close.status = Property.PropertyStatus.RESERVED
+        self.close.save()
+        self.farther.delete()
+        
+        self.assertIs(self.similarity.get_matrix(), matrix)
+        self.assertEqual(self.similarity.similar_properties(self.property, k=5), [closer, self.farthest])
+    
+    def test_changes_made_elsewhere_are_picked_up(self):
+        """Test rows saved without this process's signals are synced from updated_at."""
+        self.similarity.get_matrix()
+        Property.objects.bulk_create([Property(
+            property_code=Property.reserve_codes(1)[0],
+            address="Imported Address",
+            property_type=Property.PropertyType.HOUSE,
+            offer_type=Property.OfferType.RENT,
+            price=500000,
+            square_meters=60,
+            bedrooms=2,
+            bathrooms=1,
+            property_description="Imported property",
+            date_published=timezone.datetime(2024, 1, 1).date(),
+        )])
+        
+        similar = self.similarity.similar_properties(self.property, k=1)
+        self.assertEqual(similar[0].address, "Imported Address")
+    
+    def test_large_matrix_query_time(self):
+        """Test a k-nearest-neighbour query over 100k listings stays within 10 ms."""
+        import time
+        import random
+        
+        rng = random.Random(1)
+        rows = [
+            {
+                'id': pk,
+                'updated_at': None,
+                'offer_type': rng.choice(['RENT', 'SALE']),
+                'status': rng.choice(['AVL', 'RNT']),
+                'property_type': rng.choice(['HOUSE', 'APT', 'OFC', 'LAND']),
+                'price': rng.randint(200000, 500000000),
+                'square_meters': rng.randint(30, 300),
+                'bedrooms': rng.randint(0, 5),
+                'bathrooms': rng.randint(1, 3),
+                'has_parking': rng.random() < 0.5,
+                'has_storage_unit': rng.random() < 0.3,
+            }
+            for pk in range(1, 100001)
+        ]
+        matrix = self.similarity.FeatureMatrix(rows)
+        
+        started = time.perf_counter()
+        for pk in range(1, 101):
+            matrix.nearest(pk, 12)
+        elapsed = (time.perf_counter() - started) / 100
+        
+        self.assertLess(elapsed, 0.01)
+    
+    def test_detail_view_panel(self):
+        """Test the detail page lists the similar properties."""
+        User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+        
+        response = self.client.get(reverse('properties:property_detail', args=[self.property.property_code]))
+        
+        self.assertEqual(response.context['similar_properties'], [self.close, self.farther, self.farthest])
+        self.assertContains(response, 'Propiedades similares')
+
+
+class MarketStatsTests(TestCase):
+    """Tests for the price per m² statistics of the active inventory."""
+    
+    def setUp(self):
+        """Set up test data."""
+        from apps.management_properties import market_stats
+        
+        self.market_stats = market_stats
+        market_stats.reset()
+        
+        # Two bedroom rentals: one of 60 m² at $500.000, and five of 50 m² at $8.000
+        # to $16.000 per m²
+        self.property = create_property()
+        for price in (400000, 500000, 600000, 700000, 800000):
+            self.create_property(price=price)
+        # Listings off the market do not count
+        self.create_property(price=5000000, status=Property.PropertyStatus.RENTED)
+        
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def tearDown(self):
+        """Do not leak the snapshot into other tests."""
+        self.market_stats.reset()
+    
+    def create_property(self, **kwargs):
+        """Create an available two bedroom, 50 m² house for rent."""
+        return create_property(**{'square_meters': 50, **kwargs})
+    
+    def test_group_stats(self):
+        """Test the quartiles of every group match a direct computation."""
+        import statistics
+        
+        groups = self.market_stats.get_snapshot().group_stats()
+        
+        prices_per_m2 = [8000, 10000, 12000, 14000, 16000, 500000 / 60]
+        quartiles = statistics.quantiles(prices_per_m2, n=4, method='inclusive')
+        self.assertEqual(groups, [{
+            'property_type': 'HOUSE',
+            'offer_type': 'RENT',
+            'bedrooms': 2,
+            'count': 6,
+            'p25': round(quartiles[0]),
+            'median': round(quartiles[1]),
+            'p75': round(quartiles[2]),
+        }])
+    
+    def test_snapshot_is_refreshed_on_save(self):
+        """Test saving a property updates the cached snapshot in place."""
+        snapshot = self.market_stats.get_snapshot()
+        self.create_property(property_type=Property.PropertyType.APARTMENT, price=1000000)
+        self.property.status = Property.PropertyStatus.SOLD
+        self.property.save()
+        
+        self.assertIs(self.market_stats.get_snapshot(), snapshot)
+        groups = snapshot.group_stats(by_bedrooms=False)
+        self.assertEqual([(group['property_type'], group['count']) for group in groups], [('HOUSE', 5), ('APT', 1)])
+    
+    def test_rolled_back_save_leaves_snapshot(self):
+        """Test a save undone by its transaction never reaches the cached snapshot."""
+        snapshot = self.market_stats.get_snapshot()
+        groups = snapshot.group_stats()
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValidationError):
+                with transaction.atomic():
+                    self.property.price = 50000000
+                    self.property.save()
+                    raise ValidationError('Failed later in the same transaction')
+        
+        self.assertEqual(callbacks, [])
+        self.assertEqual(snapshot.group_stats(), groups)
+    
+    def test_snapshot_drops_properties_deleted_without_signals(self):
+        """Test listings deleted by another process are dropped on the next call."""
+        snapshot = self.market_stats.get_snapshot()
+        # A DELETE run by another process: no signal reaches this one
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Property._meta.db_table} WHERE price >= %s AND square_meters = %s",
+                [700000, 50]
+            )
+        
+        self.assertIs(self.market_stats.get_snapshot(), snapshot)
+        self.assertEqual(snapshot.group_stats(by_bedrooms=False)[0]['count'], 4)
+        self.assertEqual(self.market_stats.price_check('HOUSE', 'RENT', 3, 600000, 50)['count'], 4)
+    
+    def test_price_check(self):
+        """Test prices far outside the interquartile range are flagged."""
+        check = self.market_stats.price_check
+        
+        self.assertEqual(check('HOUSE', 'RENT', 2, 600000, 50)['verdict'], 'ok')
+        self.assertEqual(check('HOUSE', 'RENT', 2, 2000000, 50)['verdict'], 'high')
+        self.assertEqual(check('HOUSE', 'RENT', 2, 10000, 50)['verdict'], 'low')
+        
+        # Too few three bedroom listings: compared with every bedroom count
+        self.assertEqual(check('HOUSE', 'RENT', 3, 600000, 50)['bedrooms'], None)
+        self.assertEqual(check('HOUSE', 'RENT', 3, 600000, 50)['count'], 6)
+        self.assertEqual(check('OFC', 'SALE', 1, 600000, 50)['verdict'], 'unknown')
+    
+    def test_price_check_endpoint(self):
+        """Test the JSON endpoint leaves the edited property out and validates its input."""
+        url = reverse('properties:price_check')
+        params = {
+            'property_type': 'HOUSE', 'offer_type': 'RENT', 'bedrooms': 2,
+            'price': 600000, 'square_meters': 50, 'exclude': self.property.pk,
+        }
+        
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 5)
+        self.assertEqual(response.json()['price_per_m2'], 12000)
+        
+        response = self.client.get(url, {**params, 'square_meters': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('square_meters', response.json()['errors'])
+    
+    def test_stats_page(self):
+        """Test the statistics page lists the groups."""
+        response = self.client.get(reverse('properties:market_stats'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sections'][0]['types'][0]['total']['count'], 6)
+        self.assertContains(response, '$11.000')
+
+
+class PropertySearchTests(TestCase):
+    """Tests for the ranked full-text property search."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.lastarria = create_property(
+            address="Avenida Lastarria 120, Ñuñoa", property_description="Departamento luminoso"
+        )
+        self.merced = create_property(
+            address="Calle Merced 45", property_description="A pasos de Lastarria", amenities="Terraza"
+        )
+        self.matta = create_property(address="Avenida Matta 900", property_description="Casa con patio")
+    
+    def search(self, text):
+        """Return the addresses found, best match first."""
+        return [prop.address for prop in search.search(Property.objects.all(), text)]
+    
+    def test_ranking(self):
+        """Test address matches rank above description matches."""
+        self.assertEqual(self.search('lastarria'), ["Avenida Lastarria 120, Ñuñoa", "Calle Merced 45"])
+        self.assertEqual(self.search('avenida'), ["Avenida Matta 900", "Avenida Lastarria 120, Ñuñoa"])
+    
+    def test_accent_folding_and_prefixes(self):
+        """Test words match without accents or case, by prefix, and all of them must match."""
+        self.assertEqual(self.search('NUNOA'), ["Avenida Lastarria 120, Ñuñoa"])
+        self.assertEqual(self.search('lumin'), ["Avenida Lastarria 120, Ñuñoa"])
+        self.assertEqual(self.search('terr merced'), ["Calle Merced 45"])
+        self.assertEqual(self.search('patio lastarria'), [])
+        self.assertEqual(len(self.search('"*')), 3)
+    
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is refreshed when a property is edited or deleted."""
+        self.matta.address = "Avenida Italia 1500"
+        self.matta.save()
+        self.assertEqual(self.search('matta'), [])
+        self.assertEqual(self.search('italia'), ["Avenida Italia 1500"])
+        
+        self.matta.delete()
+        self.assertEqual(self.search('italia'), [])
+    
+    def test_rebuild_command(self):
+        """Test the index is rebuilt from the property table."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.INDEX_TABLE}')
+        self.assertEqual(self.search('lastarria'), [])
+        
+        out = StringIO()
+        call_command('rebuild_property_index', stdout=out)
+        self.assertIn('Indexed 3 properties', out.getvalue())
+        self.assertEqual(self.search('lastarria'), ["Avenida Lastarria 120, Ñuñoa", "Calle Merced 45"])
+    
+    def test_availability_is_checked_once_per_connection(self):
+        """Test the table list is not read again on every search."""
+        self.assertTrue(search.is_available())
+        with self.assertNumQueries(0):
+            self.assertTrue(search.is_available())
+
+
+class PropertyAutocompleteTests(TestCase):
+    """Tests for the property autocomplete endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        from apps.management_properties import search
+        
+        # Rolled back rows do not send signals, so start every test with an empty cache
+        search.autocomplete_cache.clear()
+        self.property = create_property()
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def test_property_results(self):
+        """Test properties are suggested by code prefix or by address."""
+        url = reverse('properties:property_autocomplete')
+        code = self.property.property_code
+        
+        for text in (code[:3], code.lower(), 'test addr'):
+            response = self.client.get(url, {'q': text})
+            self.assertEqual([result['id'] for result in response.json()['results']], [self.property.pk])
+        response = self.client.get(url, {'q': 'nowhere'})
+        self.assertEqual(response.json()['results'], [])
+    
+
+
+class ImportPropertiesTests(TestCase):
+    """Tests for the bulk property import command."""
+    
+    HEADER = (
+        "address,property_type,offer_type,status,price,square_meters,bedrooms,bathrooms,"
+        "property_description,date_published,has_parking,owner_email\n"
+    )
+    ROWS = (
+        "Avenida Lastarria 120,APT,RENT,AVL,450000,55,2,1,Luminoso,2024-03-01,si,Owner@Test.com\n"
+        "Calle Merced 45,HOUSE,RENT,AVL,abc,80,3,2,Casa,2024-03-01,,owner@test.com\n"
+        "Pasaje Los Aromos 7,HOUSE,SALE,AVL,150000000,120,4,2,Casa amplia,2024-03-01,no,\n"
+        "Avenida Matta 900,APT,RENT,AVL,380000,40,1,1,Departamento,2024-03-01,,nobody@test.com\n"
+        "Calle Condell 310,OFC,RENT,AVL,900000,70,0,1,Oficina,2024-03-01,x,shared@test.com\n"
+        "Avenida Italia 1500,APT,SALE,AVL,95000000,65,2,2,Departamento,2024-03-01,,owner@test.com\n"
+    )
+    
+    def setUp(self):
+        """Set up test data: an owner, and two owners entered with the same email."""
+        self.owner = Client.objects.create(name="Owner Test", email="owner@test.com", phone="123456789")
+        Client.objects.bulk_create([
+            Client(name="Shared Owner", email="shared@test.com", phone="1"),
+            Client(name="Shared Owner Bis", email="Shared@Test.com", phone="2"),
+        ])
+    
+    def import_properties(self, content, *args, suffix='.csv'):
+        """Run the import on a file with the given content and return its output."""
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as source:
+            source.write(content)
+        self.addCleanup(os.remove, source.name)
+        self.addCleanup(lambda: os.path.exists(f'{source.name}.errors.csv') and os.remove(f'{source.name}.errors.csv'))
+        
+        out = StringIO()
+        call_command('import_properties', source.name, *args, stdout=out)
+        return out.getvalue()
+    
+    def test_import_in_batches(self):
+        """Test the valid rows are inserted batch by batch with codes, ownerships and index entries."""
+        Sequence.objects.update_or_create(name=Property.CODE_SEQUENCE, defaults={'last_value': 0})
+        output = self.import_properties(self.HEADER + self.ROWS, '--batch-size', '2')
+        
+        self.assertIn('3 properties imported, 3 rows rejected', output)
+        self.assertEqual(output.count('properties processed'), 3)
+        self.assertEqual(
+            list(Property.objects.order_by('property_code').values_list('property_code', 'address', 'has_parking')),
+            [('P0001', "Avenida Lastarria 120", True), ('P0002', "Pasaje Los Aromos 7", False),
+             ('P0003', "Avenida Italia 1500", False)]
+        )
+        
+        owned = Property.objects.filter(current_owner=self.owner)
+        self.assertEqual(owned.count(), 2)
+        self.assertEqual(
+            sorted(PropertyOwnership.objects.filter(end_date__isnull=True).values_list('property__address', 'owner')),
+            [("Avenida Italia 1500", self.owner.pk), ("Avenida Lastarria 120", self.owner.pk)]
+        )
+        self.assertEqual(Client.objects.get(pk=self.owner.pk).current_properties_count, 2)
+        self.assertEqual(
+            [prop.address for prop in search.search(Property.objects.all(), 'aromos')], ["Pasaje Los Aromos 7"]
+        )
+        
+        with open(output.split('See ')[1].rstrip('.\n'), encoding='utf-8') as report:
+            lines = report.read().splitlines()
+        self.assertEqual(lines[0], 'line,field,message')
+        self.assertEqual([line.split(',')[:2] for line in lines[1:]], [
+            ['3', 'price'], ['5', 'owner_email'], ['6', 'owner_email'],
+        ])
+        self.assertIn('Several active owners have the email shared@test.com', lines[3])
+    
+    def test_jsonl(self):
+        """Test a JSONL file is read line by line and a malformed line is reported."""
+        content = (
+            '{"address": "Avenida Lastarria 120", "property_type": "APT", "offer_type": "RENT", "status": "AVL", '
+            '"price": 450000, "square_meters": 55, "bedrooms": 2, "bathrooms": 1, '
+            '"property_description": "Luminoso", "date_published": "2024-03-01", "has_parking": true}\n'
+            '\n'
+            '{"address": \n'
+        )
+        output = self.import_properties(content, suffix='.jsonl')
+        
+        self.assertIn('1 properties imported, 1 rows rejected', output)
+        self.assertTrue(Property.objects.get().has_parking)
+    
+    def test_dry_run(self):
+        """Test a dry run validates the rows without saving anything."""
+        output = self.import_properties(self.HEADER + self.ROWS, '--dry-run')
+        
+        self.assertIn('3 properties would be imported, 3 rows rejected', output)
+        self.assertFalse(Property.objects.exists())
+        self.assertFalse(PropertyOwnership.objects.exists())
+        self.assertEqual(Client.objects.get(pk=self.owner.pk).current_properties_count, 0)
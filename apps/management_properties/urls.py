@@ -10,12 +10,22 @@ urlpatterns = [
     # Create view - add new property
     path('create/', views.PropertyCreateView.as_view(), name='property_create'),
 
+    # Market statistics - price per m² of the active inventory
+    path('stats/', views.MarketStatsView.as_view(), name='market_stats'),
+    path('stats/price-check/', views.PriceCheckView.as_view(), name='price_check'),
+
+    # Autocomplete - JSON property search for the form selects
+    path('autocomplete/', views.PropertyAutocompleteView.as_view(), name='property_autocomplete'),
+
     # Detail view - shows single property details
     path('<str:property_code>/', views.PropertyDetailView.as_view(), name='property_detail'),
     
     # Update view - edit existing property
     path('<str:property_code>/edit/', views.PropertyUpdateView.as_view(), name='property_update'),
     
+    # Photo upload - renditions are generated by generate_property_renditions
+    path('<str:property_code>/images/', views.PropertyImageUploadView.as_view(), name='property_image_upload'),
+    
     # Delete view - remove property
     path('<str:property_code>/delete/', views.PropertyDeleteView.as_view(), name='property_delete'),
 ]
\ No newline at end of file
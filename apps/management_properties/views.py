@@ -1,48 +1,137 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.http import JsonResponse
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Property
-from .forms import PropertyForm
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch, prefetch_related_objects
+from django.shortcuts import get_object_or_404, redirect
+from apps.core.autocomplete import AutocompleteView
+from apps.core.pagination import CURSOR_VAR, KeysetPaginationMixin
+from .models import Property, PropertyImage
+from .forms import PriceCheckForm, PropertyForm, PropertyFilterForm, PropertyImageForm
+from .templatetags.property_filters import clp
+from . import facets, market_stats, search, similarity
 
-class PropertyListView(LoginRequiredMixin, ListView):
+class PropertyListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Property
     template_name = 'management_properties/property_list.html'
     context_object_name = 'properties'
     paginate_by = 10
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['selected_status'] = self.request.GET.get('status', 'AVL')
-        return context
-    # def get_queryset(self):
-    #     queryset = super().get_queryset()
-    #     # Add basic filtering
-    #     status = self.request.GET.get('status')
-    #     property_type = self.request.GET.get('type')
-    #     offer_type = self.request.GET.get('offer')
-        
-    #     if status:
-    #         queryset = queryset.filter(status=status)
-    #     if property_type:
-    #         queryset = queryset.filter(property_type=property_type)
-    #     if offer_type:
-    #         queryset = queryset.filter(offer_type=offer_type)
-            
-    #     return queryset.order_by('status', '-created_at')
+    keyset_ordering = ('status', '-created_at', '-id')
+    FACET_TITLES = {
+        'status': 'Estado',
+        'property_type': 'Tipo Propiedad',
+        'offer_type': 'Tipo Oferta',
+        'price': 'Precio',
+        'square_meters': 'Superficie',
+        'bedrooms': 'Dormitorios',
+    }
+    
+    def get_keyset_ordering(self):
+        # Search results are ordered by relevance, which cannot be used as a keyset
+        if self.request.GET.get('q', '').strip():
+            return None
+        return super().get_keyset_ordering()
+    
+    def get_filter_params(self):
+        """Return the query string with the default status filter applied."""
+        params = self.request.GET.copy()
+        params.setdefault('status', Property.PropertyStatus.AVAILABLE)
+        return params
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        status = self.request.GET.get('status', 'AVL')  # Default to AVL if not specified
-        property_type = self.request.GET.get('type')
-        offer_type = self.request.GET.get('offer')
+        self.filter_values = PropertyFilterForm(self.get_filter_params()).get_filters()
+        self.filters = facets.build_filters(self.filter_values)
+        query = self.request.GET.get('q', '').strip()
+        
+        # Facets are counted over the search results before the list filters
+        self.base_queryset = search.search(queryset, query) if query else queryset
+        queryset = self.base_queryset.filter(facets.combine(self.filters)).prefetch_related(
+            Prefetch('images', queryset=PropertyImage.objects.ready(), to_attr='ready_images')
+        )
+        if query:
+            # Ranked full-text search, best matches first
+            return queryset
         
-        if status:
-            queryset = queryset.filter(status=status)
-        if property_type:
-            queryset = queryset.filter(property_type=property_type)
-        if offer_type:
-            queryset = queryset.filter(offer_type=offer_type)
-            
         return queryset.order_by('status', '-created_at')
+    
+    def get_filter_url(self, **params):
+        """Return the current query string with the given filters replaced (None removes them)."""
+        query = self.request.GET.copy()
+        for name in (CURSOR_VAR, self.page_kwarg, *params):
+            query.pop(name, None)
+        for name, value in params.items():
+            if value is not None:
+                query[name] = value
+        return f'?{query.urlencode()}'
+    
+    def get_facet_groups(self):
+        """Build the facet links shown above the list, with their counts."""
+        counts = facets.count_facets(
+            self.base_queryset, self.filters, offer_type=self.filter_values.get('offer')
+        )
+        groups = []
+        
+        for param, field, _ in facets.CHOICE_FACETS:
+            selected = self.filter_values.get(param)
+            options = []
+            for option in counts[field]:
+                is_selected = option['value'] == selected
+                # Clicking the selected option clears it ('' keeps the status filter off)
+                value = ('' if param == 'status' else None) if is_selected else option['value']
+                options.append({
+                    'label': option['label'],
+                    'count': option['count'],
+                    'selected': is_selected,
+                    'url': self.get_filter_url(**{param: value}),
+                })
+            groups.append({'title': self.FACET_TITLES[field], 'options': options})
+        
+        for min_param, max_param, field in facets.RANGE_FILTERS:
+            selected = (self.filter_values.get(min_param), self.filter_values.get(max_param))
+            options = []
+            for option in counts[field]:
+                bounds = (option['min'], option['max'])
+                is_selected = bounds == selected
+                # Clicking the selected bucket clears the range
+                minimum, maximum = (None, None) if is_selected else bounds
+                options.append({
+                    'label': self.format_range(field, *bounds),
+                    'count': option['count'],
+                    'selected': is_selected,
+                    'url': self.get_filter_url(**{min_param: minimum, max_param: maximum}),
+                })
+            groups.append({'title': self.FACET_TITLES[field], 'options': options})
+        
+        return counts['total'], groups
+    
+    @staticmethod
+    def format_range(field, minimum, maximum):
+        """Return the label of a range bucket, e.g. '51 - 100 m²' or 'Hasta $500.000'."""
+        if field == 'price':
+            fmt = lambda value: f'${clp(value)}'
+        elif field == 'square_meters':
+            fmt = lambda value: f'{value} m²'
+        else:
+            fmt = lambda value: f'{value} dorm.'
+        
+        if minimum is None:
+            return f'Hasta {fmt(maximum)}'
+        if maximum is None:
+            return f'{fmt(minimum)} o más'
+        if minimum == maximum:
+            return fmt(minimum)
+        return f'{fmt(minimum)} - {fmt(maximum)}'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['selected_status'] = self.get_filter_params().get('status')
+        context['search_query'] = self.request.GET.get('q', '').strip()
+        context['filter_values'] = self.filter_values
+        context['result_count'], context['facet_groups'] = self.get_facet_groups()
+        return context
 
 class PropertyDetailView(LoginRequiredMixin, DetailView):
     model = Property
@@ -50,6 +139,47 @@ class PropertyDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'property'
     slug_field = 'property_code'
     slug_url_kwarg = 'property_code'
+    # Listings shown in the similar properties panel
+    similar_count = 6
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        images = list(self.object.images.all())
+        # Photos are only shown once their renditions exist
+        context['images'] = [image for image in images if image.is_ready]
+        context['pending_images'] = len(images) - len(context['images'])
+        context['image_form'] = PropertyImageForm()
+        context['similar_properties'] = similarity.similar_properties(self.object, k=self.similar_count)
+        if context['similar_properties']:
+            prefetch_related_objects(
+                context['similar_properties'],
+                Prefetch('images', queryset=PropertyImage.objects.ready(), to_attr='ready_images')
+            )
+        return context
+
+class PropertyImageUploadView(LoginRequiredMixin, View):
+    """Attach a photo to a property; its renditions are generated offline."""
+
+    def post(self, request, *args, **kwargs):
+        property = get_object_or_404(Property, property_code=kwargs['property_code'])
+        form = PropertyImageForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            try:
+                PropertyImage.create_from_upload(
+                    property, form.cleaned_data['image'], form.cleaned_data['caption']
+                )
+            except ValidationError as error:
+                form.add_error('image', error)
+
+        if form.errors:
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, f'No se pudo subir la foto: {error}')
+        else:
+            messages.success(request, 'Foto subida. Se publicará cuando sus versiones estén listas.')
+
+        return redirect('properties:property_detail', property_code=property.property_code)
 
 class PropertyCreateView(LoginRequiredMixin, CreateView):
     model = Property
@@ -76,4 +206,63 @@ class PropertyDeleteView(LoginRequiredMixin, DeleteView):
     template_name = 'management_properties/property_confirm_delete.html'
     success_url = reverse_lazy('properties:property_list')
     slug_field = 'property_code'
-    slug_url_kwarg = 'property_code'
\ No newline at end of file
+    slug_url_kwarg = 'property_code'
+
+class MarketStatsView(LoginRequiredMixin, TemplateView):
+    """Price per m² quartiles of the active inventory by type, offer and bedrooms."""
+    template_name = 'management_properties/market_stats.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        snapshot = market_stats.get_snapshot()
+        type_labels = dict(Property.PropertyType.choices)
+        offer_labels = dict(Property.OfferType.choices)
+
+        # Each type and offer total, followed by its bedroom groups
+        bedroom_groups = {}
+        for group in snapshot.group_stats():
+            bedroom_groups.setdefault((group['property_type'], group['offer_type']), []).append(group)
+
+        sections = {}
+        for total in snapshot.group_stats(by_bedrooms=False):
+            key = (total['property_type'], total['offer_type'])
+            sections.setdefault(total['offer_type'], []).append({
+                'label': type_labels[total['property_type']],
+                'total': total,
+                'groups': bedroom_groups.get(key, []),
+            })
+
+        context['sections'] = [
+            {'label': offer_labels[offer_type], 'types': sections[offer_type]}
+            for offer_type in offer_labels if offer_type in sections
+        ]
+        context['bedroom_cap'] = market_stats.BEDROOM_CAP
+        return context
+
+class PriceCheckView(LoginRequiredMixin, View):
+    """JSON comparison of a price per m² with the active inventory, for the property form."""
+
+    def get(self, request, *args, **kwargs):
+        form = PriceCheckForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        return JsonResponse(market_stats.price_check(
+            form.cleaned_data['property_type'],
+            form.cleaned_data['offer_type'],
+            form.cleaned_data['bedrooms'],
+            form.cleaned_data['price'],
+            form.cleaned_data['square_meters'],
+            exclude=form.cleaned_data['exclude'],
+        ))
+
+
+class PropertyAutocompleteView(AutocompleteView):
+    """JSON property search by code prefix or address, for the autocomplete selects of the forms."""
+    cache = search.autocomplete_cache
+
+    def get_source(self):
+        return ('properties',)
+
+    def fetch(self, text, limit):
+        return search.autocomplete_results(Property.objects.all(), text, limit)
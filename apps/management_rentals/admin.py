@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import RentalAgreement, MonthlyRental
+
+from apps.core.pagination import KeysetPaginationAdminMixin
+from .models import RentalAgreement, MonthlyRental, MonthlyRollup, BankStatementLine
 
 
 class MonthlyRentalInline(admin.TabularInline):
@@ -15,10 +17,10 @@ class MonthlyRentalInline(admin.TabularInline):
 class RentalAgreementAdmin(admin.ModelAdmin):
     """Admin for rental agreements."""
     list_display = ('property', 'owner', 'tenant', 'rent_amount', 
-                   'commission_amount', 'start_date', 'end_date', 'is_active')
+                   'commission_amount', 'start_date', 'end_date', 'payment_due_day', 'is_active')
     list_filter = ('is_active',)
-    search_fields = ('property__address', 'owner__first_name', 'owner__last_name',
-                    'tenant__first_name', 'tenant__last_name')
+    search_fields = ('property__address', 'owner__name', 'tenant__name')
+    autocomplete_fields = ('property', 'owner', 'tenant')
     date_hierarchy = 'start_date'
     inlines = [MonthlyRentalInline]
     
@@ -30,21 +32,20 @@ class RentalAgreementAdmin(admin.ModelAdmin):
 
 
 @admin.register(MonthlyRental)
-class MonthlyRentalAdmin(admin.ModelAdmin):
-    """Admin for monthly rentals."""
+class MonthlyRentalAdmin(KeysetPaginationAdminMixin, admin.ModelAdmin):
+    """Admin for monthly rentals, paginated by keyset on (period, id)."""
     list_display = ('rental_agreement', 'period_month', 'period_year', 
                    'rent_status', 'payment_date', 'transfer_status', 'transfer_date')
     list_filter = ('rent_status', 'transfer_status', 'period_year', 'period_month')
     search_fields = ('rental_agreement__property__address', 
-                    'rental_agreement__owner__first_name', 'rental_agreement__owner__last_name',
-                    'rental_agreement__tenant__first_name', 'rental_agreement__tenant__last_name')
+                    'rental_agreement__owner__name', 'rental_agreement__tenant__name')
     date_hierarchy = 'payment_date'
     fieldsets = (
         (None, {
             'fields': ('rental_agreement', 'period_year', 'period_month')
         }),
         ('Rent Information', {
-            'fields': ('rent_status', 'payment_date')
+            'fields': ('rent_amount', 'commission_amount', 'rent_status', 'payment_date')
         }),
         ('Transfer Information', {
             'fields': ('transfer_amount', 'transfer_status', 'transfer_date')
@@ -53,4 +54,32 @@ class MonthlyRentalAdmin(admin.ModelAdmin):
             'fields': ('notes',)
         }),
     )
-    readonly_fields = ('rental_agreement', 'period_year', 'period_month')
\ No newline at end of file
+    readonly_fields = ('rental_agreement', 'period_year', 'period_month',
+                       'rent_amount', 'commission_amount')
+
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    """Read-only admin for the pre-aggregated monthly rollups."""
+    list_display = ('period', 'total_count', 'total_rent', 'total_commission', 'total_transfer',
+                   'pending_count', 'paid_count', 'late_count', 'unpaid_count',
+                   'paid_untransferred_count', 'updated_at')
+    list_filter = ('period_year',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BankStatementLine)
+class BankStatementLineAdmin(admin.ModelAdmin):
+    """Admin for imported bank statement lines."""
+    list_display = ('transaction_date', 'amount', 'reference', 'period', 'status',
+                   'monthly_rental', 'source', 'line_number')
+    list_filter = ('status', 'source')
+    search_fields = ('reference', 'note')
+    date_hierarchy = 'transaction_date'
+    raw_id_fields = ('monthly_rental', 'candidates')
+    readonly_fields = ('source', 'line_number', 'transaction_date', 'amount', 'reference', 'period')
@@ -1,8 +1,11 @@
 from django import forms
+from django.urls import reverse_lazy
 from django.utils import timezone
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, HTML, Field
 
+from apps.core.autocomplete import AutocompleteSelect
+from apps.management_clients.models import Client
 from .models import RentalAgreement, MonthlyRental
 
 
@@ -13,21 +16,38 @@ class RentalAgreementForm(forms.ModelForm):
         model = RentalAgreement
         fields = [
             'property', 'owner', 'tenant', 'rent_amount', 
-            'commission_amount', 'start_date', 'end_date', 'is_active'
+            'commission_amount', 'start_date', 'end_date', 'payment_due_day',
+            'grace_period_days', 'is_active'
         ]
         widgets = {
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
+            # Only the selected options are rendered; the others are searched as the user types
+            'property': AutocompleteSelect(
+                reverse_lazy('properties:property_autocomplete'), attrs={'class': 'form-control'}
+            ),
+            'owner': AutocompleteSelect(
+                reverse_lazy('clients:client_autocomplete'), {'type': Client.ClientType.OWNER},
+                attrs={'class': 'form-control'},
+            ),
+            'tenant': AutocompleteSelect(
+                reverse_lazy('clients:client_autocomplete'), {'type': Client.ClientType.TENANT},
+                attrs={'class': 'form-control'},
+            ),
         }
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         # Filter owners and tenants by client type
-        from apps.management_clients.models import Client
         self.fields['owner'].queryset = Client.objects.filter(client_type=Client.ClientType.OWNER)
         self.fields['tenant'].queryset = Client.objects.filter(client_type=Client.ClientType.TENANT)
         
+        # The property and owner of an existing agreement cannot be changed
+        if self.instance.pk:
+            for name in ('property', 'owner'):
+                self.fields[name].widget.attrs['readonly'] = True
+        
         self.helper = FormHelper()
         self.helper.form_method = 'post'
         self.helper.layout = Layout(
@@ -51,6 +71,11 @@ class RentalAgreementForm(forms.ModelForm):
                 Column('end_date', css_class='form-group col-md-6'),
                 css_class='form-row'
             ),
+            Row(
+                Column('payment_due_day', css_class='form-group col-md-6'),
+                Column('grace_period_days', css_class='form-group col-md-6'),
+                css_class='form-row'
+            ),
             Submit('submit', 'Save', css_class='btn-primary')
         )
     
@@ -213,4 +238,124 @@ class MonthFilterForm(forms.Form):
             Field('year', css_class='mr-2'),
             Field('month', css_class='mr-2'),
             Submit('submit', 'Filter', css_class='btn-info')
-        )
\ No newline at end of file
+        )
+
+
+class IdListField(forms.MultipleChoiceField):
+    """Field accepting a list of integer IDs without building a choice list."""
+    widget = forms.MultipleHiddenInput
+    
+    def to_python(self, value):
+        """Convert the submitted values to integers."""
+        try:
+            return [int(pk) for pk in super().to_python(value)]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid ID list")
+    
+    def validate(self, value):
+        """Only check that a value was submitted when the field is required."""
+        if self.required and not value:
+            raise forms.ValidationError(self.error_messages['required'], code='required')
+
+
+class BulkPaymentForm(forms.Form):
+    """Form for recording the payment of several monthly rentals at once."""
+    MAX_BATCH_SIZE = 1000
+    
+    monthly_rentals = IdListField(
+        error_messages={'required': 'Select at least one monthly rental'}
+    )
+    rent_status = forms.ChoiceField(
+        choices=[
+            (MonthlyRental.PAID, 'Paid'),
+            (MonthlyRental.LATE, 'Late'),
+        ]
+    )
+    payment_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['payment_date'].initial = timezone.now().date()
+    
+    def clean_monthly_rentals(self):
+        """Limit the size of a batch."""
+        ids = self.cleaned_data.get('monthly_rentals')
+        
+        if len(ids) > self.MAX_BATCH_SIZE:
+            raise forms.ValidationError(
+                f"Cannot record more than {self.MAX_BATCH_SIZE} payments at once"
+            )
+        
+        return ids
+
+
+class PayoutConfirmForm(forms.Form):
+    """Form for confirming an owner payout run."""
+    year = forms.IntegerField(widget=forms.HiddenInput)
+    month = forms.IntegerField(min_value=1, max_value=12, widget=forms.HiddenInput)
+    monthly_rentals = IdListField(
+        error_messages={'required': 'There are no transfers to confirm'}
+    )
+    transfer_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control mr-2'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['transfer_date'].initial = timezone.now().date()
+
+
+class BankStatementUploadForm(forms.Form):
+    """Form for uploading a bank statement CSV to reconcile."""
+    statement = forms.FileField(
+        help_text="CSV export with date, amount and reference columns"
+    )
+    delimiter = forms.ChoiceField(
+        choices=[
+            ('', 'Detect automatically'),
+            (',', 'Comma'),
+            (';', 'Semicolon'),
+            ('\t', 'Tab'),
+        ],
+        required=False
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text="Only report what would be matched"
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        self.helper = FormHelper()
+        self.helper.form_method = 'post'
+        self.helper.layout = Layout(
+            Field('statement'),
+            Field('delimiter'),
+            Field('dry_run'),
+            Submit('submit', 'Import Statement', css_class='btn-primary')
+        )
+
+
+class ResolveBankStatementLineForm(forms.Form):
+    """Form for resolving a bank statement line from the review queue."""
+    monthly_rental = forms.IntegerField(required=False)
+    
+    def __init__(self, *args, line=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.line = line
+    
+    def clean_monthly_rental(self):
+        """Only accept one of the line's candidates, or nothing to dismiss the line."""
+        pk = self.cleaned_data.get('monthly_rental')
+        
+        if pk is None:
+            return None
+        
+        monthly_rental = self.line.candidates.filter(pk=pk).first()
+        if monthly_rental is None:
+            raise forms.ValidationError("The selected monthly rental is not a candidate for this line")
+        
+        return monthly_rental
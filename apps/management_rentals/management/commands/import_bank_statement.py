@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.management_rentals.models import BankStatementLine, iter_bank_statement
+
+
+class Command(BaseCommand):
+    """Import a bank statement CSV and reconcile its lines with the monthly rentals."""
+    help = 'Import a bank statement CSV, record the payments it matches and queue the rest for review'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the bank statement CSV')
+        parser.add_argument('--delimiter', help='Field delimiter (detected from the header by default)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='File encoding (default: utf-8-sig)')
+        parser.add_argument('--date-column', default='date', help='Name of the transaction date column')
+        parser.add_argument('--amount-column', default='amount', help='Name of the amount column')
+        parser.add_argument('--reference-column', default='reference',
+                            help='Name of the column holding the tenant name or email')
+        parser.add_argument('--period-column', default='period',
+                            help='Name of the optional period (YYYY-MM) column')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be matched without saving anything')
+    
+    def handle(self, *args, **options):
+        """Stream the file through the reconciliation and report the result."""
+        columns = {
+            'date': options['date_column'],
+            'amount': options['amount_column'],
+            'reference': options['reference_column'],
+            'period': options['period_column'],
+        }
+        
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as statement:
+                summary = BankStatementLine.reconcile(
+                    iter_bank_statement(statement, options['delimiter'], columns),
+                    source=os.path.basename(options['path']),
+                    dry_run=options['dry_run']
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        
+        for line_number, message in summary['errors']:
+            self.stderr.write(f'Line {line_number}: {message}')
+        
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{summary['matched']} payments recorded, "
+            f"{summary['ambiguous']} ambiguous and {summary['unmatched']} unmatched lines "
+            f"queued for review, {summary['duplicate']} already imported, "
+            f"{summary['ignored']} debits ignored, {len(summary['errors'])} errors."
+        ))
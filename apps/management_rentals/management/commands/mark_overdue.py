@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.management_rentals.models import MonthlyRental
+
+
+class Command(BaseCommand):
+    """Mark the pending monthly rentals that are past their due date as unpaid."""
+    help = 'Mark every pending monthly rental past its due date and grace period as unpaid'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Evaluate the due dates as of this date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many rentals are overdue without updating them')
+    
+    def handle(self, *args, **options):
+        """Flip the overdue rentals and report how many changed."""
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        
+        count = MonthlyRental.mark_overdue(today, dry_run=options['dry_run'])
+        
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {count} monthly rentals would be marked as unpaid.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Marked {count} monthly rentals as unpaid.'))
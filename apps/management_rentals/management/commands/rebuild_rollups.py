@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.management_rentals.models import MonthlyRollup
+
+
+class Command(BaseCommand):
+    """Rebuild the monthly rollups from the monthly rental records."""
+    help = 'Rebuild the pre-aggregated monthly rollups from the monthly rental records'
+    
+    def handle(self, *args, **options):
+        """Rebuild every rollup in one transaction."""
+        count = MonthlyRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {count} periods.'))
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlyrental',
+            name='rent_amount',
+            field=models.DecimalField(blank=True, decimal_places=0, help_text='Rent amount for this period (copied from the agreement when created)', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='monthlyrental',
+            name='commission_amount',
+            field=models.DecimalField(blank=True, decimal_places=0, help_text='Commission amount for this period (copied from the agreement when created)', max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def backfill_amounts(apps, schema_editor):
+    """Copy rent and commission from each agreement onto its monthly rentals, in primary key batches."""
+    MonthlyRental = apps.get_model('management_rentals', 'MonthlyRental')
+    RentalAgreement = apps.get_model('management_rentals', 'RentalAgreement')
+
+    agreement = RentalAgreement.objects.filter(pk=OuterRef('rental_agreement_id'))
+    pending = MonthlyRental.objects.filter(rent_amount__isnull=True).order_by('pk')
+
+    last_pk = 0
+    while True:
+        batch_pks = list(pending.filter(pk__gt=last_pk).values_list('pk', flat=True)[:BATCH_SIZE])
+        if not batch_pks:
+            break
+        MonthlyRental.objects.filter(pk__in=batch_pks).update(
+            rent_amount=Subquery(agreement.values('rent_amount')[:1]),
+            commission_amount=Subquery(agreement.values('commission_amount')[:1]),
+        )
+        last_pk = batch_pks[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0002_monthlyrental_rent_amount_commission_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_amounts, migrations.RunPython.noop),
+    ]
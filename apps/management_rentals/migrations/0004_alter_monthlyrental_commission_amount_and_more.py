@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0003_backfill_monthlyrental_amounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='monthlyrental',
+            name='commission_amount',
+            field=models.DecimalField(blank=True, decimal_places=0, help_text='Commission amount for this period (copied from the agreement when created)', max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='monthlyrental',
+            name='rent_amount',
+            field=models.DecimalField(blank=True, decimal_places=0, help_text='Rent amount for this period (copied from the agreement when created)', max_digits=10),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_period(apps, schema_editor):
+    """Derive the yyyymm period key from period_year and period_month."""
+    MonthlyRental = apps.get_model('management_rentals', 'MonthlyRental')
+    MonthlyRental.objects.filter(period__isnull=True).update(
+        period=F('period_year') * 100 + F('period_month')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0004_alter_monthlyrental_commission_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlyrental',
+            name='period',
+            field=models.PositiveIntegerField(editable=False, help_text='Period key as yyyymm, kept in sync with period_year and period_month', null=True),
+        ),
+        migrations.RunPython(backfill_period, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0005_monthlyrental_period'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='monthlyrental',
+            options={'ordering': ['-period'], 'verbose_name': 'Monthly Rental', 'verbose_name_plural': 'Monthly Rentals'},
+        ),
+        migrations.AlterField(
+            model_name='monthlyrental',
+            name='period',
+            field=models.PositiveIntegerField(editable=False, help_text='Period key as yyyymm, kept in sync with period_year and period_month'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyrental',
+            index=models.Index(fields=['period', 'rent_status'], name='management__period_d2c5b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyrental',
+            index=models.Index(fields=['rental_agreement', 'period'], name='management__rental__5548ac_idx'),
+        ),
+    ]
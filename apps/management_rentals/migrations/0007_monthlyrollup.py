@@ -0,0 +1,66 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:26
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """Aggregate the existing monthly rentals into one rollup per period."""
+    MonthlyRental = apps.get_model('management_rentals', 'MonthlyRental')
+    MonthlyRollup = apps.get_model('management_rentals', 'MonthlyRollup')
+
+    rows = (
+        MonthlyRental.objects.order_by()
+        .values('period', 'period_year', 'period_month')
+        .annotate(
+            total_rent=Sum('rent_amount'),
+            total_commission=Sum('commission_amount'),
+            total_transfer=Sum('transfer_amount'),
+            total_count=Count('id'),
+            pending_count=Count('id', filter=Q(rent_status='pending')),
+            paid_count=Count('id', filter=Q(rent_status='paid')),
+            late_count=Count('id', filter=Q(rent_status='late')),
+            unpaid_count=Count('id', filter=Q(rent_status='unpaid')),
+            transfer_pending_count=Count('id', filter=Q(transfer_status='pending')),
+            transfer_completed_count=Count('id', filter=Q(transfer_status='completed')),
+            paid_untransferred_count=Count('id', filter=Q(rent_status='paid', transfer_status='pending')),
+        )
+    )
+    MonthlyRollup.objects.bulk_create([MonthlyRollup(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0006_monthlyrental_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveIntegerField(help_text='Period key as yyyymm', unique=True)),
+                ('period_year', models.PositiveSmallIntegerField(help_text='Year of this rental period')),
+                ('period_month', models.PositiveSmallIntegerField(help_text='Month of this rental period (1-12)')),
+                ('total_rent', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('total_commission', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('total_transfer', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('paid_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('unpaid_count', models.PositiveIntegerField(default=0)),
+                ('transfer_pending_count', models.PositiveIntegerField(default=0)),
+                ('transfer_completed_count', models.PositiveIntegerField(default=0)),
+                ('paid_untransferred_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Monthly Rollup',
+                'verbose_name_plural': 'Monthly Rollups',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0007_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(editable=False, max_length=40, unique=True)),
+                ('source', models.CharField(blank=True, help_text='Name of the imported file', max_length=255)),
+                ('line_number', models.PositiveIntegerField(help_text='Line of the file the record came from')),
+                ('transaction_date', models.DateField(help_text='Date of the bank transaction')),
+                ('amount', models.DecimalField(decimal_places=0, help_text='Amount credited', max_digits=10)),
+                ('reference', models.CharField(blank=True, help_text='Reference given by the bank', max_length=255)),
+                ('period', models.PositiveIntegerField(help_text='Period key (yyyymm) the payment is for')),
+                ('status', models.CharField(choices=[('matched', 'Matched'), ('ambiguous', 'Ambiguous'), ('unmatched', 'Unmatched'), ('resolved', 'Resolved'), ('dismissed', 'Dismissed')], max_length=10)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidates', models.ManyToManyField(blank=True, help_text='Monthly rentals this line could belong to', related_name='candidate_bank_statement_lines', to='management_rentals.monthlyrental')),
+                ('monthly_rental', models.ForeignKey(blank=True, help_text='The monthly rental this line paid', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_statement_lines', to='management_rentals.monthlyrental')),
+            ],
+            options={
+                'verbose_name': 'Bank Statement Line',
+                'verbose_name_plural': 'Bank Statement Lines',
+                'ordering': ['transaction_date', 'line_number'],
+                'indexes': [models.Index(fields=['status', 'transaction_date'], name='management__status_db488c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:35
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_rentals', '0008_bankstatementline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalagreement',
+            name='grace_period_days',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Days after the due day before an unpaid rent is marked as overdue'),
+        ),
+        migrations.AddField(
+            model_name='rentalagreement',
+            name='payment_due_day',
+            field=models.PositiveSmallIntegerField(default=5, help_text='Day of the month the rent is due (1-28)', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(28)]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management_clients', '0005_keyset_index'),
+        ('management_properties', '0005_keyset_index'),
+        ('management_rentals', '0009_rentalagreement_payment_terms'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rentalagreement',
+            index=models.Index(fields=['-is_active', '-start_date', '-id'], name='management__is_acti_3dbe3f_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.management_properties.models import Property
 from apps.management_clients.models import Client
 
@@ -17,6 +18,8 @@ class RentalAgreement(models.Model):
         commission_amount: The agent's commission for managing the property
         start_date: When the rental agreement begins
         end_date: When the rental agreement ends (optional)
+        payment_due_day: Day of the month the rent is due
+        grace_period_days: Days after the due day before an unpaid rent is overdue
         is_active: Whether the rental agreement is currently active
         created_at: When the record was created
         updated_at: When the record was last updated
@@ -55,6 +58,15 @@ class RentalAgreement(models.Model):
         blank=True,
         help_text="When the rental agreement ends (if applicable)"
     )
+    payment_due_day = models.PositiveSmallIntegerField(
+        default=5,
+        validators=[MinValueValidator(1), MaxValueValidator(28)],
+        help_text="Day of the month the rent is due (1-28)"
+    )
+    grace_period_days = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Days after the due day before an unpaid rent is marked as overdue"
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Whether this rental agreement is currently active"
@@ -66,6 +78,10 @@ class RentalAgreement(models.Model):
         ordering = ['-is_active', '-start_date']
         verbose_name = "Rental Agreement"
         verbose_name_plural = "Rental Agreements"
+        indexes = [
+            # Matches the keyset ordering of the rental agreement list
+            models.Index(fields=['-is_active', '-start_date', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.property} - {self.tenant} - {self.start_date}"
@@ -84,18 +100,46 @@ class RentalAgreement(models.Model):
                 'end_date': 'End date must be after start date'
             })
         
-        # Ensure owner is actually the owner of the property
-        if self.property.current_owner != self.owner:
+        # Ensure owner is actually the owner of the property. The related fields are
+        # unset when the form already rejected the submitted ids
+        if self.property_id and self.owner_id and self.property.current_owner_id != self.owner_id:
             raise ValidationError({
                 'owner': 'Selected client is not the current owner of this property'
             })
         
         # Ensure owner and tenant are different people
-        if self.owner == self.tenant:
+        if self.owner_id and self.owner_id == self.tenant_id:
             raise ValidationError({
                 'tenant': 'Owner and tenant cannot be the same person'
             })
     
+    def save(self, *args, **kwargs):
+        """Save in a transaction so the client counter updates done by the signals are atomic with it."""
+        from django.db import transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    @classmethod
+    def valid_for_period(cls, year, month):
+        """
+        Return the active rental agreements that should have a monthly rental record
+        for the given period.
+        
+        Args:
+            year: The year of the period
+            month: The month of the period (1-12)
+        """
+        from django.db.models import Q
+        
+        period_start = timezone.datetime(year, month, 1).date()
+        return cls.objects.filter(
+            is_active=True,
+            start_date__lte=period_start,
+        ).filter(
+            Q(end_date__isnull=True) |
+            Q(end_date__gte=period_start)
+        )
+    
     def calculate_transfer_amount(self):
         """Calculate the amount to transfer to the owner (rent minus commission)."""
         return self.rent_amount - self.commission_amount
@@ -116,6 +160,22 @@ class RentalAgreement(models.Model):
         return True
 
 
+def period_key(year, month):
+    """Return the compact integer key (yyyymm) for a rental period."""
+    return year * 100 + month
+
+
+class MonthlyRentalQuerySet(models.QuerySet):
+    """QuerySet for monthly rentals that keeps the period key in sync on bulk inserts."""
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """Set the period key on every object before inserting them."""
+        objs = list(objs)
+        for obj in objs:
+            obj.period = period_key(obj.period_year, obj.period_month)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class MonthlyRental(models.Model):
     """
     Model representing a monthly rental record for a specific rental agreement.
@@ -124,8 +184,11 @@ class MonthlyRental(models.Model):
         rental_agreement: The associated rental agreement
         period_year: The year of this rental period
         period_month: The month of this rental period (1-12)
+        period: Compact period key (yyyymm) derived from period_year and period_month
         rent_status: Current status of the rent payment
         payment_date: When the rent was paid (if applicable)
+        rent_amount: Rent amount for this period, copied from the agreement on creation
+        commission_amount: Commission for this period, copied from the agreement on creation
         transfer_amount: Amount to be transferred to owner
         transfer_status: Current status of the transfer to owner
         transfer_date: When the transfer to owner was completed (if applicable)
@@ -163,6 +226,10 @@ class MonthlyRental(models.Model):
         help_text="Month of this rental period (1-12)",
         choices=[(i, i) for i in range(1, 13)]
     )
+    period = models.PositiveIntegerField(
+        editable=False,
+        help_text="Period key as yyyymm, kept in sync with period_year and period_month"
+    )
     rent_status = models.CharField(
         max_length=10,
         choices=RENT_STATUS_CHOICES,
@@ -174,6 +241,18 @@ class MonthlyRental(models.Model):
         blank=True,
         help_text="When the rent was paid"
     )
+    rent_amount = models.DecimalField(
+        max_digits=10, 
+        decimal_places=0,
+        blank=True,
+        help_text="Rent amount for this period (copied from the agreement when created)"
+    )
+    commission_amount = models.DecimalField(
+        max_digits=10, 
+        decimal_places=0,
+        blank=True,
+        help_text="Commission amount for this period (copied from the agreement when created)"
+    )
     transfer_amount = models.DecimalField(
         max_digits=10, 
         decimal_places=0,
@@ -194,12 +273,18 @@ class MonthlyRental(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MonthlyRentalQuerySet.as_manager()
+    
     class Meta:
-        ordering = ['-period_year', '-period_month']
+        ordering = ['-period']
         verbose_name = "Monthly Rental"
         verbose_name_plural = "Monthly Rentals"
         # Ensure uniqueness for rental agreement + period year + period month
         unique_together = ['rental_agreement', 'period_year', 'period_month']
+        indexes = [
+            models.Index(fields=['period', 'rent_status']),
+            models.Index(fields=['rental_agreement', 'period']),
+        ]
     
     def __str__(self):
         return f"{self.rental_agreement.property} - {self.period_month}/{self.period_year}"
@@ -232,58 +317,1027 @@ class MonthlyRental(models.Model):
             (self.period_year == end_date.year and self.period_month > end_date.month)):
             raise ValidationError("Rental period cannot be after the agreement end date")
     
+    @property
+    def due_date(self):
+        """Date the rent of this period is due, per the agreement's payment due day."""
+        from datetime import date
+        
+        return date(self.period_year, self.period_month, self.rental_agreement.payment_due_day)
+    
     def save(self, *args, **kwargs):
-        """Override save to set transfer_amount if not provided."""
+        """Override save to snapshot the agreement amounts, set transfer_amount if not provided and sync the period key."""
+        self.period = period_key(self.period_year, self.period_month)
+        if self.rent_amount is None:
+            self.rent_amount = self.rental_agreement.rent_amount
+        if self.commission_amount is None:
+            self.commission_amount = self.rental_agreement.commission_amount
         if not self.transfer_amount:
-            self.transfer_amount = self.rental_agreement.calculate_transfer_amount()
-        super().save(*args, **kwargs)
+            self.transfer_amount = self.rent_amount - self.commission_amount
+        # Run in a transaction so the rollup update done by the signals is atomic with the save
+        from django.db import transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     @classmethod
-    def initialize_month(cls, year, month):
+    def initialize_month(cls, year, month, end_year=None, end_month=None):
         """
-        Initialize monthly rental records for all active rental agreements for a specific month.
+        Initialize monthly rental records for all active rental agreements for a specific
+        month, or for every month of an inclusive range when end_year/end_month are given.
+        
+        Existing records are fetched in a single query and the missing ones are inserted
+        with bulk_create inside one transaction, which locks the agreements so that the
+        created count is exactly the number of records this call inserted.
         
         Args:
             year: The year to initialize
             month: The month to initialize (1-12)
+            end_year: Last year of the range to initialize (optional)
+            end_month: Last month of the range to initialize (optional)
             
         Returns:
             tuple: (created_count, existing_count)
         """
+        from django.db import transaction
         from django.db.models import Q
         
-        created_count = 0
-        existing_count = 0
+        end_year = end_year or year
+        end_month = end_month or month
+        periods = list(iter_periods(year, month, end_year, end_month))
+        if not periods:
+            raise ValueError("End of the period range must not be before its start")
         
-        # Get all active rental agreements that are valid for the given month/year
-        active_agreements = RentalAgreement.objects.filter(
+        first_day = timezone.datetime(year, month, 1).date()
+        last_day = timezone.datetime(end_year, end_month, 1).date()
+        
+        # All active rental agreements that are valid for at least one month of the range
+        agreements = RentalAgreement.objects.filter(
             is_active=True,
-            start_date__lte=timezone.datetime(year, month, 1).date(),
+            start_date__lte=last_day,
         ).filter(
-            Q(end_date__isnull=True) | 
-            Q(end_date__gte=timezone.datetime(year, month, 1).date())
+            Q(end_date__isnull=True) |
+            Q(end_date__gte=first_day)
         )
         
-        # Create monthly rental records for each active agreement
-        for agreement in active_agreements:
-            # Check if a record already exists for this agreement in this period
-            existing = cls.objects.filter(
-                rental_agreement=agreement,
-                period_year=year,
-                period_month=month
-            ).exists()
+        created_count = 0
+        existing_count = 0
+        
+        with transaction.atomic():
+            # Locking the agreements makes a concurrent initialization, or a save of one of
+            # them (whose signal creates its first month), wait for this transaction
+            active_agreements = list(agreements.select_for_update().values_list(
+                'id', 'start_date', 'end_date', 'rent_amount', 'commission_amount'
+            ))
             
-            if existing:
-                existing_count += 1
-                continue
+            # Fetch the (agreement, period) keys that already exist for the range
+            range_records = cls.objects.filter(
+                rental_agreement__in=agreements.values('id'),
+                period__range=(period_key(year, month), period_key(end_year, end_month)),
+            )
+            existing_keys = set(range_records.values_list('rental_agreement_id', 'period'))
+            
+            new_records = []
+            for period_year, period_month in periods:
+                period_start = timezone.datetime(period_year, period_month, 1).date()
+                for agreement_id, start_date, end_date, rent_amount, commission_amount in active_agreements:
+                    if start_date > period_start or (end_date and end_date < period_start):
+                        continue
+                    
+                    if (agreement_id, period_key(period_year, period_month)) in existing_keys:
+                        existing_count += 1
+                        continue
+                    
+                    new_records.append(cls(
+                        rental_agreement_id=agreement_id,
+                        period_year=period_year,
+                        period_month=period_month,
+                        rent_amount=rent_amount,
+                        commission_amount=commission_amount,
+                        transfer_amount=rent_amount - commission_amount
+                    ))
+            
+            cls.objects.bulk_create(new_records, batch_size=500, ignore_conflicts=True)
+            # ignore_conflicts also skips rows the existing keys missed, so count the rows
+            # added to the range: with the agreements locked, they are the ones inserted here
+            if new_records:
+                created_count = range_records.count() - len(existing_keys)
+            
+            # bulk_create bypasses the signals, so refresh the affected rollups
+            MonthlyRollup.refresh(period_key(*period) for period in periods)
+        
+        return created_count, existing_count
+    
+    @classmethod
+    def bulk_record_payment(cls, ids, rent_status, payment_date):
+        """
+        Record the payment of several monthly rentals in one transaction.
+        
+        Only records whose payment can still be recorded (pending or unpaid) are updated;
+        the others are reported back without changes.
+        
+        Args:
+            ids: IDs of the monthly rentals to update
+            rent_status: New rent status (PAID or LATE)
+            payment_date: Date the rent was paid
+        
+        Returns:
+            list: One dict per requested ID with 'id', 'monthly_rental', 'result'
+            ('updated', 'skipped' or 'not_found') and 'message'
+        """
+        return cls.record_payments(dict.fromkeys(ids, payment_date), rent_status)
+    
+    @classmethod
+    def record_payments(cls, payment_dates, rent_status):
+        """
+        Record the payment of several monthly rentals, each with its own payment date.
+        
+        Args:
+            payment_dates: dict mapping monthly rental IDs to the date they were paid
+            rent_status: New rent status (PAID or LATE)
+        
+        Returns:
+            list: One dict per requested ID, as returned by bulk_record_payment()
+        """
+        from django.db import transaction
+        
+        if rent_status not in (cls.PAID, cls.LATE):
+            raise ValueError(f"Invalid rent status for a payment: {rent_status}")
+        
+        results = []
+        
+        with transaction.atomic():
+            records = cls.objects.select_for_update().select_related(
+                'rental_agreement__property'
+            ).in_bulk(list(payment_dates))
+            
+            now = timezone.now()
+            updated = []
+            settled = []
+            for pk, payment_date in payment_dates.items():
+                monthly_rental = records.get(pk)
+                if monthly_rental is None:
+                    results.append({'id': pk, 'monthly_rental': None, 'result': 'not_found',
+                                    'message': 'Monthly rental not found'})
+                    continue
+                
+                if monthly_rental.rent_status not in (cls.PENDING, cls.UNPAID):
+                    results.append({'id': pk, 'monthly_rental': monthly_rental, 'result': 'skipped',
+                                    'message': f'Rent is already {monthly_rental.rent_status}'})
+                    continue
                 
-            # Create new monthly rental record
-            cls.objects.create(
-                rental_agreement=agreement,
-                period_year=year,
-                period_month=month,
-                transfer_amount=agreement.calculate_transfer_amount()
+                if monthly_rental.rent_status == cls.UNPAID:
+                    settled.append(monthly_rental)
+                monthly_rental.rent_status = rent_status
+                monthly_rental.payment_date = payment_date
+                monthly_rental.updated_at = now
+                updated.append(monthly_rental)
+                results.append({'id': pk, 'monthly_rental': monthly_rental, 'result': 'updated',
+                                'message': f'Marked as {rent_status}'})
+            
+            cls.objects.bulk_update(updated, ['rent_status', 'payment_date', 'updated_at'], batch_size=500)
+            
+            # bulk_update bypasses the signals, so refresh the affected rollups and the
+            # unpaid month counters of the clients whose overdue rents were paid
+            MonthlyRollup.refresh(monthly_rental.period for monthly_rental in updated)
+            Client.recount_counters(
+                client_id
+                for agreement in {monthly_rental.rental_agreement for monthly_rental in settled}
+                for client_id in (agreement.owner_id, agreement.tenant_id)
+            )
+        
+        return results
+    
+    @classmethod
+    def mark_overdue(cls, today=None, dry_run=False):
+        """
+        Mark every pending monthly rental whose due date and grace period have passed as unpaid.
+        
+        Agreements are grouped by (payment due day, grace period), so the whole portfolio is
+        flipped with a single UPDATE. Running it again on the same day changes nothing.
+        
+        Args:
+            today: Date to evaluate the due dates against (defaults to today)
+            dry_run: Whether to only count the rows without updating them
+        
+        Returns:
+            int: Number of monthly rentals marked as unpaid
+        """
+        from datetime import timedelta
+        from django.db import transaction
+        from django.db.models import Q
+        
+        today = today or timezone.now().date()
+        
+        # A period is overdue when its due date is before today minus the grace period,
+        # so every (due day, grace) pair maps to the latest overdue period key
+        overdue = Q(pk__in=[])
+        terms = RentalAgreement.objects.order_by().values_list(
+            'payment_due_day', 'grace_period_days'
+        ).distinct()
+        for due_day, grace_period_days in terms:
+            cutoff = today - timedelta(days=grace_period_days)
+            last_period = period_key(cutoff.year, cutoff.month)
+            if due_day >= cutoff.day:
+                last_period = period_key(cutoff.year - 1, 12) if cutoff.month == 1 else last_period - 1
+            overdue |= Q(
+                rental_agreement__payment_due_day=due_day,
+                rental_agreement__grace_period_days=grace_period_days,
+                period__lte=last_period
+            )
+        
+        queryset = cls.objects.filter(overdue, rent_status=cls.PENDING)
+        
+        if dry_run:
+            return queryset.count()
+        
+        with transaction.atomic():
+            affected = list(queryset.order_by().values_list(
+                'period', 'rental_agreement__owner', 'rental_agreement__tenant'
+            ).distinct())
+            count = queryset.update(rent_status=cls.UNPAID, updated_at=timezone.now())
+            
+            # update() bypasses the signals, so refresh the affected rollups and the
+            # unpaid month counters of the agreements' clients
+            MonthlyRollup.refresh(period for period, _, _ in affected)
+            Client.recount_counters(
+                client_id for _, owner_id, tenant_id in affected for client_id in (owner_id, tenant_id)
+            )
+        
+        return count
+    
+    @classmethod
+    def payout_queryset(cls, year, month):
+        """
+        Return the paid monthly rentals of a period whose transfer to the owner is pending.
+        
+        Args:
+            year: The year of the period
+            month: The month of the period (1-12)
+        """
+        return cls.objects.filter(
+            period=period_key(year, month),
+            rent_status=cls.PAID,
+            transfer_status=cls.PENDING
+        )
+    
+    @classmethod
+    def payout_by_owner(cls, year, month):
+        """
+        Group the pending transfers of a period per owner with a single query.
+        
+        Args:
+            year: The year of the period
+            month: The month of the period (1-12)
+        
+        Yields:
+            dict: 'owner', 'monthly_rentals' and 'total_transfer' for each owner,
+            ordered by owner name
+        """
+        from itertools import groupby
+        
+        monthly_rentals = cls.payout_queryset(year, month).select_related(
+            'rental_agreement__owner',
+            'rental_agreement__property'
+        ).order_by('rental_agreement__owner__name', 'rental_agreement__owner_id', 'pk')
+        
+        for _, group in groupby(monthly_rentals.iterator(), key=lambda rental: rental.rental_agreement.owner_id):
+            group = list(group)
+            yield {
+                'owner': group[0].rental_agreement.owner,
+                'monthly_rentals': group,
+                'total_transfer': sum(rental.transfer_amount for rental in group),
+            }
+    
+    @classmethod
+    def complete_transfers(cls, ids, transfer_date):
+        """
+        Mark the given monthly rentals as transferred in one transaction.
+        
+        Only rows that are still paid and pending transfer are updated, so rows changed
+        since the payout run was prepared are left alone.
+        
+        Args:
+            ids: IDs of the monthly rentals included in the payout run
+            transfer_date: Date the transfers were made
+        
+        Returns:
+            int: Number of monthly rentals marked as completed
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            monthly_rentals = list(
+                cls.objects.select_for_update().filter(
+                    pk__in=list(ids),
+                    rent_status=cls.PAID,
+                    transfer_status=cls.PENDING
+                )
+            )
+            
+            now = timezone.now()
+            for monthly_rental in monthly_rentals:
+                monthly_rental.transfer_status = 'completed'
+                monthly_rental.transfer_date = transfer_date
+                monthly_rental.updated_at = now
+            
+            cls.objects.bulk_update(
+                monthly_rentals, ['transfer_status', 'transfer_date', 'updated_at'], batch_size=500
+            )
+            
+            # bulk_update bypasses the signals, so refresh the affected rollups
+            MonthlyRollup.refresh(monthly_rental.period for monthly_rental in monthly_rentals)
+        
+        return len(monthly_rentals)
+    
+    @classmethod
+    def count_missing(cls, year, month):
+        """
+        Count the rental agreements valid for a period that have no monthly rental record yet.
+        
+        Args:
+            year: The year of the period
+            month: The month of the period (1-12)
+            
+        Returns:
+            int: Number of records initialize_month would create for the period
+        """
+        from django.db.models import Exists, OuterRef
+        
+        existing = cls.objects.filter(
+            rental_agreement=OuterRef('pk'),
+            period=period_key(year, month)
+        )
+        return RentalAgreement.valid_for_period(year, month).filter(~Exists(existing)).count()
+    
+    @classmethod
+    def summarize_by_month(cls, start_year, end_year=None):
+        """
+        Aggregate rent totals and status counts per month with a single GROUP BY query.
+        
+        Args:
+            start_year: First year to summarize
+            end_year: Last year to summarize (defaults to start_year)
+        
+        Returns:
+            dict: Aggregated values keyed by (period_year, period_month). Months without
+            records are not included.
+        """
+        end_year = end_year or start_year
+        rows = cls.summarize(
+            cls.objects.filter(period__range=(period_key(start_year, 1), period_key(end_year, 12)))
+        )
+        return {(row['period_year'], row['period_month']): row for row in rows}
+    
+    @classmethod
+    def summarize(cls, queryset):
+        """
+        Group a queryset of monthly rentals by period and annotate the rollup aggregates.
+        
+        Args:
+            queryset: The monthly rentals to summarize
+        
+        Returns:
+            QuerySet: One values() row per period
+        """
+        from django.db.models import Count, Q, Sum
+        
+        return (
+            queryset.order_by()
+            .values('period', 'period_year', 'period_month')
+            .annotate(
+                total_rent=Sum('rent_amount'),
+                total_commission=Sum('commission_amount'),
+                total_transfer=Sum('transfer_amount'),
+                paid_count=Count('id', filter=Q(rent_status=cls.PAID)),
+                pending_count=Count('id', filter=Q(rent_status=cls.PENDING)),
+                late_count=Count('id', filter=Q(rent_status=cls.LATE)),
+                unpaid_count=Count('id', filter=Q(rent_status=cls.UNPAID)),
+                transfer_pending_count=Count('id', filter=Q(transfer_status=cls.PENDING)),
+                transfer_completed_count=Count('id', filter=Q(transfer_status='completed')),
+                paid_untransferred_count=Count(
+                    'id', filter=Q(rent_status=cls.PAID, transfer_status=cls.PENDING)
+                ),
+                total_count=Count('id'),
+            )
+        )
+
+
+def iter_periods(start_year, start_month, end_year, end_month):
+    """
+    Yield every (year, month) pair between two periods, both ends included.
+    
+    Args:
+        start_year: Year of the first period
+        start_month: Month of the first period (1-12)
+        end_year: Year of the last period
+        end_month: Month of the last period (1-12)
+    """
+    for month in (start_month, end_month):
+        if not 1 <= month <= 12:
+            raise ValueError(f"Invalid month: {month}")
+    
+    index = start_year * 12 + start_month - 1
+    end_index = end_year * 12 + end_month - 1
+    while index <= end_index:
+        yield index // 12, index % 12 + 1
+        index += 1
+
+
+class MonthlyRollup(models.Model):
+    """
+    Pre-aggregated financial totals and status counts for one rental period.
+    
+    Rows are kept up to date in the same transaction as the monthly rentals they
+    summarize: single saves and deletes apply their difference through signals,
+    and bulk operations call refresh() for the periods they touched.
+    
+    Args:
+        period: Period key (yyyymm)
+        period_year: The year of the period
+        period_month: The month of the period (1-12)
+        total_rent: Sum of rent amounts
+        total_commission: Sum of commission amounts
+        total_transfer: Sum of transfer amounts
+        total_count: Number of monthly rentals
+        pending_count / paid_count / late_count / unpaid_count: Counts per rent status
+        transfer_pending_count / transfer_completed_count: Counts per transfer status
+        paid_untransferred_count: Paid rentals whose transfer is still pending
+        updated_at: When the rollup was last updated
+    """
+    
+    # Counter field for each rent and transfer status
+    RENT_STATUS_FIELDS = {
+        MonthlyRental.PENDING: 'pending_count',
+        MonthlyRental.PAID: 'paid_count',
+        MonthlyRental.LATE: 'late_count',
+        MonthlyRental.UNPAID: 'unpaid_count',
+    }
+    TRANSFER_STATUS_FIELDS = {
+        MonthlyRental.PENDING: 'transfer_pending_count',
+        'completed': 'transfer_completed_count',
+    }
+    AGGREGATE_FIELDS = [
+        'total_rent', 'total_commission', 'total_transfer', 'total_count',
+        'pending_count', 'paid_count', 'late_count', 'unpaid_count',
+        'transfer_pending_count', 'transfer_completed_count', 'paid_untransferred_count',
+    ]
+    
+    period = models.PositiveIntegerField(unique=True, help_text="Period key as yyyymm")
+    period_year = models.PositiveSmallIntegerField(help_text="Year of this rental period")
+    period_month = models.PositiveSmallIntegerField(help_text="Month of this rental period (1-12)")
+    total_rent = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    total_commission = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    total_transfer = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    paid_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    unpaid_count = models.PositiveIntegerField(default=0)
+    transfer_pending_count = models.PositiveIntegerField(default=0)
+    transfer_completed_count = models.PositiveIntegerField(default=0)
+    paid_untransferred_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-period']
+        verbose_name = "Monthly Rollup"
+        verbose_name_plural = "Monthly Rollups"
+    
+    def __str__(self):
+        return f"{self.period_month}/{self.period_year}"
+    
+    @classmethod
+    def contribution(cls, state):
+        """
+        Return what a single monthly rental adds to its period's rollup.
+        
+        Args:
+            state: dict with period, rent_amount, commission_amount, transfer_amount,
+                rent_status and transfer_status of the monthly rental
+        """
+        values = {
+            'total_rent': state['rent_amount'],
+            'total_commission': state['commission_amount'],
+            'total_transfer': state['transfer_amount'],
+            'total_count': 1,
+        }
+        if state['rent_status'] in cls.RENT_STATUS_FIELDS:
+            values[cls.RENT_STATUS_FIELDS[state['rent_status']]] = 1
+        if state['transfer_status'] in cls.TRANSFER_STATUS_FIELDS:
+            values[cls.TRANSFER_STATUS_FIELDS[state['transfer_status']]] = 1
+        if state['rent_status'] == MonthlyRental.PAID and state['transfer_status'] == MonthlyRental.PENDING:
+            values['paid_untransferred_count'] = 1
+        return values
+    
+    @classmethod
+    def apply_change(cls, old_state=None, new_state=None):
+        """
+        Apply the difference between the old and new state of one monthly rental.
+        
+        Args:
+            old_state: State before the change (None when the record was created)
+            new_state: State after the change (None when the record was deleted)
+        """
+        from collections import defaultdict
+        from django.db.models import F
+        
+        deltas = defaultdict(lambda: defaultdict(int))
+        if old_state:
+            for field, value in cls.contribution(old_state).items():
+                deltas[old_state['period']][field] -= value
+        if new_state:
+            for field, value in cls.contribution(new_state).items():
+                deltas[new_state['period']][field] += value
+        
+        for period, delta in deltas.items():
+            delta = {field: value for field, value in delta.items() if value}
+            if not delta:
+                continue
+            cls.objects.get_or_create(
+                period=period,
+                defaults={'period_year': period // 100, 'period_month': period % 100}
+            )
+            cls.objects.filter(period=period).update(
+                **{field: F(field) + value for field, value in delta.items()}
+            )
+    
+    @classmethod
+    def refresh(cls, periods):
+        """
+        Recompute the rollups of the given periods from the monthly rentals, used by bulk
+        operations that bypass the per-record signals.
+        
+        Args:
+            periods: Iterable of period keys (yyyymm)
+        """
+        periods = sorted(set(periods))
+        if not periods:
+            return
+        
+        rows = MonthlyRental.summarize(MonthlyRental.objects.filter(period__in=periods))
+        rollups = [
+            cls(**{field: row[field] or 0 for field in cls.AGGREGATE_FIELDS},
+                period=row['period'], period_year=row['period_year'], period_month=row['period_month'])
+            for row in rows
+        ]
+        
+        cls.objects.filter(period__in=periods).exclude(
+            period__in=[rollup.period for rollup in rollups]
+        ).delete()
+        cls.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['period'],
+            update_fields=cls.AGGREGATE_FIELDS + ['updated_at'],
+        )
+    
+    @classmethod
+    def rebuild(cls):
+        """
+        Rebuild every rollup from scratch.
+        
+        Returns:
+            int: Number of periods rebuilt
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            periods = set(MonthlyRental.objects.order_by().values_list('period', flat=True).distinct())
+            periods.update(cls.objects.values_list('period', flat=True))
+            cls.refresh(periods)
+        return cls.objects.count()
+    
+    @classmethod
+    def summarize_by_month(cls, start_year, end_year=None):
+        """
+        Return the rollups of a year range in the format of MonthlyRental.summarize_by_month.
+        
+        Args:
+            start_year: First year to summarize
+            end_year: Last year to summarize (defaults to start_year)
+        """
+        end_year = end_year or start_year
+        rows = cls.objects.filter(
+            period__range=(period_key(start_year, 1), period_key(end_year, 12))
+        ).values('period', 'period_year', 'period_month', *cls.AGGREGATE_FIELDS)
+        return {(row['period_year'], row['period_month']): row for row in rows}
+
+
+def normalize_reference(value):
+    """
+    Normalize a tenant reference for matching: strip accents, casefold and collapse spaces.
+    
+    Args:
+        value: Free-text reference (tenant name, email, bank transfer description)
+    """
+    import unicodedata
+    
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.casefold().split())
+
+
+def parse_statement_amount(value):
+    """
+    Parse an amount from a bank statement, accepting formats like "350000", "350.000",
+    "$ 350.000" or "350.000,00".
+    
+    Args:
+        value: The amount as exported by the bank
+    
+    Returns:
+        Decimal: The amount rounded to whole pesos
+    """
+    from decimal import Decimal, InvalidOperation
+    
+    cleaned = ''.join(char for char in value if char.isdigit() or char in '-,.')
+    # Dots are thousands separators and a comma starts the decimals
+    cleaned = cleaned.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(cleaned).quantize(Decimal('1'))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+
+
+def parse_statement_date(value):
+    """
+    Parse a date from a bank statement (YYYY-MM-DD, DD/MM/YYYY or DD-MM-YYYY).
+    
+    Args:
+        value: The date as exported by the bank
+    """
+    from datetime import datetime
+    
+    value = value.strip()
+    for date_format in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value!r}")
+
+
+def iter_bank_statement(lines, delimiter=None, columns=None):
+    """
+    Stream-parse a bank statement CSV, one line at a time.
+    
+    The first line must be a header. The columns holding the date, amount, reference and
+    (optionally) the rental period are looked up by name, case-insensitively. When the
+    period column is missing the month of the transaction date is used.
+    
+    Args:
+        lines: Iterable of text lines (an open file, or a decoded upload)
+        delimiter: Field delimiter; detected from the header when not given
+        columns: dict overriding the column names for 'date', 'amount', 'reference'
+            and 'period'
+    
+    Yields:
+        dict: 'line_number', 'transaction_date', 'amount', 'reference' and 'period' for
+        each line, or 'line_number' and 'error' for lines that could not be parsed
+    """
+    import csv
+    from itertools import chain
+    
+    names = {'date': 'date', 'amount': 'amount', 'reference': 'reference', 'period': 'period'}
+    names.update(columns or {})
+    
+    lines = iter(lines)
+    header = next(lines, '')
+    if delimiter is None:
+        delimiter = max((',', ';', '\t'), key=header.count)
+    
+    reader = csv.reader(chain([header], lines), delimiter=delimiter)
+    header = [name.strip().lstrip('\ufeff').casefold() for name in next(reader, [])]
+    
+    positions = {}
+    for key, name in names.items():
+        if name.casefold() in header:
+            positions[key] = header.index(name.casefold())
+        elif key != 'period':
+            raise ValueError(f"Column {name!r} not found in the bank statement header")
+    
+    for line_number, row in enumerate(reader, start=2):
+        if not any(field.strip() for field in row):
+            continue
+        try:
+            transaction_date = parse_statement_date(row[positions['date']])
+            amount = parse_statement_amount(row[positions['amount']])
+            reference = row[positions['reference']].strip()
+            
+            period = None
+            if 'period' in positions and row[positions['period']].strip():
+                period_date = parse_statement_date(f"{row[positions['period']].strip()}-01")
+                period = period_key(period_date.year, period_date.month)
+        except IndexError:
+            yield {'line_number': line_number, 'error': 'Missing columns'}
+            continue
+        except ValueError as error:
+            yield {'line_number': line_number, 'error': str(error)}
+            continue
+        
+        yield {
+            'line_number': line_number,
+            'transaction_date': transaction_date,
+            'amount': amount,
+            'reference': reference,
+            'period': period or period_key(transaction_date.year, transaction_date.month),
+        }
+
+
+class BankStatementLine(models.Model):
+    """
+    Model representing an imported bank statement line and how it was reconciled.
+    
+    Lines matched to exactly one open monthly rental record its payment automatically;
+    ambiguous and unmatched lines stay in the review queue until someone resolves them.
+    
+    Args:
+        fingerprint: Hash identifying the line, so re-importing a statement is a no-op
+        source: Name of the imported file
+        line_number: Line of the file the record came from
+        transaction_date: Date of the bank transaction
+        amount: Amount credited
+        reference: Reference (tenant name or email) given by the bank
+        period: Period key (yyyymm) the payment is for
+        status: Reconciliation status of the line
+        monthly_rental: The monthly rental the line was matched or resolved to
+        candidates: Monthly rentals the line could belong to, for the review queue
+        note: Why the line needs review
+        created_at: When the record was created
+        updated_at: When the record was last updated
+    """
+    
+    # Status choices
+    MATCHED = 'matched'
+    AMBIGUOUS = 'ambiguous'
+    UNMATCHED = 'unmatched'
+    RESOLVED = 'resolved'
+    DISMISSED = 'dismissed'
+    
+    STATUS_CHOICES = [
+        (MATCHED, 'Matched'),
+        (AMBIGUOUS, 'Ambiguous'),
+        (UNMATCHED, 'Unmatched'),
+        (RESOLVED, 'Resolved'),
+        (DISMISSED, 'Dismissed'),
+    ]
+    
+    REVIEW_STATUSES = (AMBIGUOUS, UNMATCHED)
+    
+    fingerprint = models.CharField(max_length=40, unique=True, editable=False)
+    source = models.CharField(max_length=255, blank=True, help_text="Name of the imported file")
+    line_number = models.PositiveIntegerField(help_text="Line of the file the record came from")
+    transaction_date = models.DateField(help_text="Date of the bank transaction")
+    amount = models.DecimalField(max_digits=10, decimal_places=0, help_text="Amount credited")
+    reference = models.CharField(max_length=255, blank=True, help_text="Reference given by the bank")
+    period = models.PositiveIntegerField(help_text="Period key (yyyymm) the payment is for")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    monthly_rental = models.ForeignKey(
+        MonthlyRental,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bank_statement_lines',
+        help_text="The monthly rental this line paid"
+    )
+    candidates = models.ManyToManyField(
+        MonthlyRental,
+        blank=True,
+        related_name='candidate_bank_statement_lines',
+        help_text="Monthly rentals this line could belong to"
+    )
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['transaction_date', 'line_number']
+        verbose_name = "Bank Statement Line"
+        verbose_name_plural = "Bank Statement Lines"
+        indexes = [
+            models.Index(fields=['status', 'transaction_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_date} - {self.amount} - {self.reference}"
+    
+    @property
+    def period_year(self):
+        return self.period // 100
+    
+    @property
+    def period_month(self):
+        return self.period % 100
+    
+    @staticmethod
+    def make_fingerprint(line, occurrence):
+        """
+        Return the fingerprint of a parsed statement line.
+        
+        Args:
+            line: dict as yielded by iter_bank_statement()
+            occurrence: How many identical lines came before this one in the statement
+        """
+        import hashlib
+        
+        raw = '|'.join([
+            line['transaction_date'].isoformat(),
+            str(line['amount']),
+            normalize_reference(line['reference']),
+            str(occurrence),
+        ])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def build_match_index(cls, periods):
+        """
+        Index the open monthly rentals of the given periods with a single query.
+        
+        Every record is indexed under both its tenant's name and email, so bank
+        references using either one match.
+        
+        Args:
+            periods: Period keys (yyyymm) to index
+        
+        Returns:
+            tuple: (exact, loose) dicts; exact maps (amount, reference, period) and loose
+            maps (reference, period) to lists of monthly rental IDs
+        """
+        from collections import defaultdict
+        
+        exact = defaultdict(list)
+        loose = defaultdict(list)
+        
+        records = MonthlyRental.objects.filter(
+            period__in=list(periods),
+            rent_status__in=(MonthlyRental.PENDING, MonthlyRental.UNPAID)
+        ).order_by().values_list(
+            'pk', 'rent_amount', 'period',
+            'rental_agreement__tenant__name', 'rental_agreement__tenant__email'
+        )
+        
+        for pk, rent_amount, period, tenant_name, tenant_email in records.iterator():
+            references = {normalize_reference(tenant_name), normalize_reference(tenant_email)}
+            for reference in references - {''}:
+                exact[(rent_amount, reference, period)].append(pk)
+                loose[(reference, period)].append(pk)
+        
+        return exact, loose
+    
+    @classmethod
+    def reconcile(cls, lines, source='', dry_run=False):
+        """
+        Match parsed bank statement lines to open monthly rentals and record the payments.
+        
+        A line is matched when its (amount, reference, period) key points to exactly one
+        open monthly rental that no other line of the statement also claims. Matched
+        payments are recorded in bulk; ambiguous and unmatched lines are queued for review.
+        Lines already imported earlier are skipped, so a statement can be imported twice.
+        
+        Args:
+            lines: Iterable of dicts as yielded by iter_bank_statement()
+            source: Name of the imported file
+            dry_run: Whether to only compute the result without saving anything
+        
+        Returns:
+            dict: Counts of 'matched', 'ambiguous', 'unmatched', 'duplicate' and 'ignored'
+            lines, plus 'errors' as a list of (line_number, message)
+        """
+        from collections import Counter
+        from django.db import transaction
+        
+        summary = {'matched': 0, 'ambiguous': 0, 'unmatched': 0, 'duplicate': 0,
+                   'ignored': 0, 'errors': []}
+        
+        # Keep only the fields needed for matching while streaming through the file
+        parsed = []
+        occurrences = Counter()
+        for line in lines:
+            if 'error' in line:
+                summary['errors'].append((line['line_number'], line['error']))
+                continue
+            if line['amount'] <= 0:
+                summary['ignored'] += 1
+                continue
+            
+            reference = normalize_reference(line['reference'])
+            key = (line['transaction_date'], line['amount'], reference)
+            line['fingerprint'] = cls.make_fingerprint(line, occurrences[key])
+            line['key'] = (line['amount'], reference, line['period'])
+            occurrences[key] += 1
+            parsed.append(line)
+        
+        if not parsed:
+            return summary
+        
+        existing = set(cls.objects.filter(
+            transaction_date__range=(
+                min(line['transaction_date'] for line in parsed),
+                max(line['transaction_date'] for line in parsed)
             )
-            created_count += 1
+        ).values_list('fingerprint', flat=True))
+        
+        new_lines = []
+        for line in parsed:
+            if line['fingerprint'] in existing:
+                summary['duplicate'] += 1
+            else:
+                new_lines.append(line)
+        
+        exact, loose = cls.build_match_index({line['period'] for line in new_lines})
+        
+        # Count how many lines claim each candidate to detect double payments
+        claims = Counter()
+        for line in new_lines:
+            line['candidates'] = exact.get(line['key'], [])
+            if len(line['candidates']) == 1:
+                claims[line['candidates'][0]] += 1
+        
+        for line in new_lines:
+            candidates = line['candidates']
+            if len(candidates) == 1 and claims[candidates[0]] == 1:
+                line['status'], line['note'] = cls.MATCHED, ''
+            elif candidates:
+                line['status'] = cls.AMBIGUOUS
+                line['note'] = ('Several monthly rentals match this line' if len(candidates) > 1
+                                else 'Several lines match the same monthly rental')
+            else:
+                amount, reference, period = line['key']
+                line['candidates'] = loose.get((reference, period), [])
+                line['status'] = cls.UNMATCHED
+                line['note'] = ('Amount does not match the rent' if line['candidates']
+                                else 'No open monthly rental matches this line')
+        
+        if dry_run:
+            for line in new_lines:
+                summary[line['status']] += 1
+            return summary
+        
+        with transaction.atomic():
+            matched = {line['candidates'][0]: line for line in new_lines if line['status'] == cls.MATCHED}
+            results = MonthlyRental.record_payments(
+                {pk: line['transaction_date'] for pk, line in matched.items()},
+                MonthlyRental.PAID
+            )
+            
+            # Records paid since the index was built go to the review queue instead
+            for result in results:
+                if result['result'] != 'updated':
+                    line = matched[result['id']]
+                    line['status'], line['note'] = cls.AMBIGUOUS, result['message']
             
-        return created_count, existing_count
\ No newline at end of file
+            records = []
+            for line in new_lines:
+                summary[line['status']] += 1
+                records.append(cls(
+                    fingerprint=line['fingerprint'],
+                    source=source,
+                    line_number=line['line_number'],
+                    transaction_date=line['transaction_date'],
+                    amount=line['amount'],
+                    reference=line['reference'][:255],
+                    period=line['period'],
+                    status=line['status'],
+                    monthly_rental_id=line['candidates'][0] if line['status'] == cls.MATCHED else None,
+                    note=line['note'],
+                ))
+            cls.objects.bulk_create(records, batch_size=500)
+            
+            # bulk_create on SQLite and PostgreSQL sets the primary keys
+            Candidate = cls.candidates.through
+            Candidate.objects.bulk_create([
+                Candidate(bankstatementline_id=record.pk, monthlyrental_id=pk)
+                for record, line in zip(records, new_lines)
+                if record.status in cls.REVIEW_STATUSES
+                for pk in line['candidates']
+            ], batch_size=500)
+        
+        return summary
+    
+    def resolve(self, monthly_rental=None):
+        """
+        Take the line out of the review queue.
+        
+        Args:
+            monthly_rental: The monthly rental the line paid; its payment is recorded with
+                the transaction date. When None the line is dismissed.
+        
+        Returns:
+            dict: The payment result as returned by MonthlyRental.record_payments(), or
+            None when the line is dismissed
+        """
+        from django.db import transaction
+        
+        result = None
+        with transaction.atomic():
+            if monthly_rental is not None:
+                result = MonthlyRental.record_payments(
+                    {monthly_rental.pk: self.transaction_date}, MonthlyRental.PAID
+                )[0]
+                if result['result'] != 'updated':
+                    return result
+            
+            self.monthly_rental = monthly_rental
+            self.status = self.RESOLVED if monthly_rental else self.DISMISSED
+            self.save(update_fields=['monthly_rental', 'status', 'updated_at'])
+        
+        return result
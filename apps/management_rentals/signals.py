@@ -1,8 +1,35 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import RentalAgreement, MonthlyRental
+from apps.management_clients.models import Client
+from .models import RentalAgreement, MonthlyRental, MonthlyRollup, period_key
+
+# Monthly rental fields that feed the monthly rollups
+ROLLUP_STATE_FIELDS = (
+    'period', 'rent_amount', 'commission_amount', 'transfer_amount',
+    'rent_status', 'transfer_status'
+)
+
+# Rental agreement fields that feed the client counters
+AGREEMENT_COUNTER_FIELDS = ('is_active', 'owner_id', 'tenant_id')
+
+
+def agreement_counter_changes(state, sign):
+    """Return the client counter changes of an agreement's state, added (sign 1) or removed (-1)."""
+    if not state or not state['is_active']:
+        return []
+    return [
+        (state['owner_id'], 'active_owner_agreements_count', sign),
+        (state['tenant_id'], 'active_tenant_agreements_count', sign),
+    ]
+
+
+def unpaid_month_changes(rent_status, owner_id, tenant_id, sign):
+    """Return the client counter changes of a monthly rental, added (sign 1) or removed (-1)."""
+    if rent_status != MonthlyRental.UNPAID:
+        return []
+    return [(owner_id, 'unpaid_months_count', sign), (tenant_id, 'unpaid_months_count', sign)]
 
 
 @receiver(post_save, sender=RentalAgreement)
@@ -24,8 +51,7 @@ def create_initial_monthly_rental(sender, instance, created, **kwargs):
         # Check if monthly rental record already exists
         existing = MonthlyRental.objects.filter(
             rental_agreement=instance,
-            period_year=current_year,
-            period_month=current_month
+            period=period_key(current_year, current_month)
         ).exists()
         
         if not existing:
@@ -45,4 +71,94 @@ def validate_transfer_status(sender, instance, **kwargs):
         # Force rent status to paid if transfer is completed
         instance.rent_status = 'paid'
         if not instance.payment_date:
-            instance.payment_date = timezone.now().date()
\ No newline at end of file
+            instance.payment_date = timezone.now().date()
+
+
+@receiver(pre_save, sender=MonthlyRental)
+def capture_rollup_state(sender, instance, **kwargs):
+    """
+    Remember the stored state of a monthly rental so its rollup and client counter
+    changes can be applied after saving.
+    """
+    instance._rollup_previous_state = None
+    if instance.pk:
+        instance._rollup_previous_state = MonthlyRental.objects.filter(pk=instance.pk).values(
+            *ROLLUP_STATE_FIELDS, 'rental_agreement__owner', 'rental_agreement__tenant'
+        ).first()
+
+
+@receiver(post_save, sender=MonthlyRental)
+def update_rollup_on_save(sender, instance, **kwargs):
+    """Apply the change of a saved monthly rental to the monthly rollups."""
+    new_state = {field: getattr(instance, field) for field in ROLLUP_STATE_FIELDS}
+    MonthlyRollup.apply_change(getattr(instance, '_rollup_previous_state', None), new_state)
+
+
+@receiver(post_save, sender=MonthlyRental)
+def update_unpaid_counters_on_save(sender, instance, **kwargs):
+    """Apply a change of rent status from or to unpaid to the counters of the agreement's clients."""
+    old_state = getattr(instance, '_rollup_previous_state', None)
+    old_status = old_state['rent_status'] if old_state else None
+    if (old_status == MonthlyRental.UNPAID) == (instance.rent_status == MonthlyRental.UNPAID):
+        return
+    
+    changes = []
+    if old_state:
+        changes += unpaid_month_changes(
+            old_status, old_state['rental_agreement__owner'], old_state['rental_agreement__tenant'], -1
+        )
+    agreement = instance.rental_agreement
+    changes += unpaid_month_changes(instance.rent_status, agreement.owner_id, agreement.tenant_id, 1)
+    Client.update_counters(changes)
+
+
+@receiver(post_delete, sender=MonthlyRental)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted monthly rental from the monthly rollups."""
+    old_state = {field: getattr(instance, field) for field in ROLLUP_STATE_FIELDS}
+    MonthlyRollup.apply_change(old_state, None)
+
+
+@receiver(post_delete, sender=MonthlyRental)
+def update_unpaid_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted unpaid monthly rental from the counters of the agreement's clients."""
+    if instance.rent_status == MonthlyRental.UNPAID:
+        agreement = instance.rental_agreement
+        Client.update_counters(
+            unpaid_month_changes(instance.rent_status, agreement.owner_id, agreement.tenant_id, -1)
+        )
+
+
+@receiver(pre_save, sender=RentalAgreement)
+def capture_agreement_state(sender, instance, **kwargs):
+    """Remember the stored state of a rental agreement so the client counters can be updated after saving."""
+    instance._counter_previous_state = None
+    if instance.pk:
+        instance._counter_previous_state = RentalAgreement.objects.filter(
+            pk=instance.pk
+        ).values(*AGREEMENT_COUNTER_FIELDS).first()
+
+
+@receiver(post_save, sender=RentalAgreement)
+def update_client_counters_on_save(sender, instance, **kwargs):
+    """Apply the change of a saved rental agreement to the counters of its clients."""
+    old_state = getattr(instance, '_counter_previous_state', None)
+    new_state = {field: getattr(instance, field) for field in AGREEMENT_COUNTER_FIELDS}
+    if old_state == new_state:
+        return
+    
+    if old_state and (old_state['owner_id'], old_state['tenant_id']) != (instance.owner_id, instance.tenant_id):
+        # The agreement's unpaid months move with it: recount every client involved
+        Client.recount_counters([
+            old_state['owner_id'], old_state['tenant_id'], instance.owner_id, instance.tenant_id
+        ])
+        return
+    
+    Client.update_counters(agreement_counter_changes(old_state, -1) + agreement_counter_changes(new_state, 1))
+
+
+@receiver(post_delete, sender=RentalAgreement)
+def update_client_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted rental agreement from the counters of its clients."""
+    old_state = {field: getattr(instance, field) for field in AGREEMENT_COUNTER_FIELDS}
+    Client.update_counters(agreement_counter_changes(old_state, -1))
@@ -1,12 +1,23 @@
+import os
+import tempfile
+from io import StringIO
+
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 from apps.management_properties.models import Property
 from apps.management_clients.models import Client
-from .models import RentalAgreement, MonthlyRental
+from .forms import RentalAgreementForm
+from .models import (
+    RentalAgreement, MonthlyRental, MonthlyRollup, BankStatementLine, iter_bank_statement
+)
 
 
 class RentalAgreementModelTests(TestCase):
@@ -413,4 +424,1102 @@ class RentalViewsTests(TestCase):
                 period_month=timezone.now().month
             ).count(),
             1
-        )
\ No newline at end of file
+        )
+
+class RentalTestDataMixin:
+    """Creates an owner, a tenant and a property shared by the rental tests below."""
+    
+    def create_base_data(self):
+        """Create the owner, tenant and property."""
+        # Create property owner
+        self.owner = Client.objects.create(
+            name="Owner Test",
+            email="owner@test.com",
+            phone="123456789",
+            client_type=Client.ClientType.OWNER
+        )
+        
+        # Create tenant
+        self.tenant = Client.objects.create(
+            name="Tenant Test",
+            email="tenant@test.com",
+            phone="987654321",
+            client_type=Client.ClientType.TENANT
+        )
+        
+        # Create property
+        self.property = Property.objects.create(
+            address="Test Address",
+            current_owner=self.owner,
+            offer_type=Property.OfferType.RENT,
+            price=500000,
+            square_meters=60,
+            bedrooms=2,
+            bathrooms=1,
+            property_description="Test property",
+            date_published=timezone.datetime(2023, 1, 1).date(),
+        )
+
+
+class InitializeMonthRangeTests(RentalTestDataMixin, TestCase):
+    """Tests for set-based initialization of monthly rental records."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        
+        # Agreement running from January to June 2024
+        self.agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+            end_date=timezone.datetime(2024, 6, 30).date(),
+        )
+        
+        # Open-ended agreement starting in March 2024
+        self.other_agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=600000,
+            commission_amount=60000,
+            start_date=timezone.datetime(2024, 3, 1).date(),
+        )
+        
+        # Start from a clean slate (the post_save signal creates an initial record)
+        MonthlyRental.objects.all().delete()
+    
+    def test_initialize_single_month(self):
+        """Test initializing a single month only creates records for valid agreements."""
+        created, existing = MonthlyRental.initialize_month(2024, 2)
+        
+        self.assertEqual((created, existing), (1, 0))
+        monthly_rental = MonthlyRental.objects.get(period_year=2024, period_month=2)
+        self.assertEqual(monthly_rental.rental_agreement, self.agreement)
+        self.assertEqual(monthly_rental.transfer_amount, 450000)
+    
+    def test_initialize_range_across_years(self):
+        """Test initializing a range of months spanning a year boundary."""
+        created, existing = MonthlyRental.initialize_month(2024, 5, 2025, 1)
+        
+        # May-June for both agreements, July 2024-January 2025 only for the open-ended one
+        self.assertEqual((created, existing), (11, 0))
+        self.assertEqual(
+            MonthlyRental.objects.filter(rental_agreement=self.other_agreement).count(),
+            9
+        )
+        
+        # Initializing again must not create duplicates
+        created, existing = MonthlyRental.initialize_month(2024, 5, 2025, 1)
+        self.assertEqual((created, existing), (0, 11))
+    
+    def test_initialize_range_query_count(self):
+        """Test the number of queries does not grow with the number of agreements or months."""
+        # Agreements, existing keys, savepoint, bulk insert, count of the inserted rows,
+        # rollup aggregate, stale rollup delete, rollup upsert, savepoint release
+        with self.assertNumQueries(9):
+            MonthlyRental.initialize_month(2024, 1, 2024, 12)
+    
+    def test_period_key_maintained(self):
+        """Test the period key is set by save() and by the bulk insert path."""
+        MonthlyRental.initialize_month(2024, 11, 2025, 2)
+        self.assertEqual(
+            sorted(MonthlyRental.objects.values_list('period', flat=True).distinct()),
+            [202411, 202412, 202501, 202502]
+        )
+        
+        monthly_rental = MonthlyRental.objects.get(rental_agreement=self.other_agreement, period=202501)
+        monthly_rental.period_month = 3
+        monthly_rental.save()
+        self.assertEqual(MonthlyRental.objects.get(pk=monthly_rental.pk).period, 202503)
+    
+    def test_terminate_deletes_future_records(self):
+        """Test terminating an agreement deletes records after the termination month."""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        MonthlyRental.initialize_month(2024, 3, 2025, 6)
+        termination_date = timezone.now().date() + timezone.timedelta(days=1)
+        
+        url = reverse('management_rentals:rental_agreement_terminate', args=[self.other_agreement.pk])
+        response = self.client.post(url, {
+            'termination_date': termination_date.strftime('%Y-%m-%d'),
+            'delete_future_records': 'on',
+        })
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(
+            self.other_agreement.monthly_rentals.filter(
+                period__gt=termination_date.year * 100 + termination_date.month
+            ).exists()
+        )
+        self.assertTrue(self.other_agreement.monthly_rentals.filter(period=202403).exists())
+    
+    def test_initialize_invalid_range(self):
+        """Test an inverted range is rejected."""
+        with self.assertRaises(ValueError):
+            MonthlyRental.initialize_month(2024, 6, 2024, 1)
+    
+    def test_created_count_skips_conflicting_rows(self):
+        """Test rows skipped by the insert on a conflict the existing keys missed are not counted."""
+        # A February record whose period key is out of date: the existing keys miss it,
+        # and the insert of February is ignored by the unique constraint
+        MonthlyRental.objects.create(
+            rental_agreement=self.agreement, period_year=2024, period_month=2, transfer_amount=450000
+        )
+        MonthlyRental.objects.update(period=0)
+        
+        created, existing = MonthlyRental.initialize_month(2024, 1, 2024, 2)
+        
+        self.assertEqual((created, existing), (1, 0))
+        self.assertEqual(MonthlyRental.objects.count(), 2)
+    
+    def test_view_rejects_long_ranges(self):
+        """Test the view refuses a range longer than MAX_RANGE_MONTHS."""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('management_rentals:initialize_month')
+        
+        response = self.client.post(url, {'year': 2024, 'month': 1, 'end_year': 9999, 'end_month': 12}, follow=True)
+        self.assertContains(response, 'A range can span at most 60 months.')
+        self.assertFalse(MonthlyRental.objects.exists())
+        
+        self.client.post(url, {'year': 2024, 'month': 1, 'end_year': 2028, 'end_month': 12})
+        self.assertEqual(MonthlyRental.objects.filter(rental_agreement=self.other_agreement).count(), 58)
+    
+    def test_view_reports_invalid_input(self):
+        """Test malformed fields, bad months and inverted ranges are reported instead of failing."""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('management_rentals:initialize_month')
+        
+        cases = [
+            ({'year': 'abc', 'month': 1}, 'The year and month must be numbers.'),
+            ({'year': 2024, 'month': 1, 'end_month': 'x'}, 'The year and month must be numbers.'),
+            ({'year': 2024, 'month': 13}, 'The month must be between 1 and 12.'),
+            ({'year': 0, 'month': 1}, 'The year must be between 1 and 9999.'),
+            ({'year': 2024, 'month': 6, 'end_year': 2024, 'end_month': 2},
+             'The end of the range cannot be before its start.'),
+        ]
+        for data, message in cases:
+            response = self.client.post(url, data, follow=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, message)
+        self.assertFalse(MonthlyRental.objects.exists())
+
+
+class ReportViewTests(RentalTestDataMixin, TestCase):
+    """Tests for the aggregated rental report."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        
+        self.agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2023, 11, 1).date(),
+        )
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2023, 11, 2024, 2)
+        paid_rental = MonthlyRental.objects.get(period_year=2024, period_month=1)
+        paid_rental.rent_status = MonthlyRental.PAID
+        paid_rental.payment_date = timezone.datetime(2024, 1, 5).date()
+        paid_rental.save()
+        
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_summarize_by_month(self):
+        """Test monthly aggregates are computed in one query."""
+        with self.assertNumQueries(1):
+            summary = MonthlyRental.summarize_by_month(2024)
+        
+        self.assertEqual(set(summary), {(2024, 1), (2024, 2)})
+        self.assertEqual(summary[(2024, 1)]['total_rent'], 500000)
+        self.assertEqual(summary[(2024, 1)]['paid_count'], 1)
+        self.assertEqual(summary[(2024, 2)]['pending_count'], 1)
+    
+    def test_single_year_report(self):
+        """Test the report for a single year."""
+        response = self.client.get(reverse('management_rentals:report'), {'year': 2024})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['annual_stats']['total_rent'], 1000000)
+        self.assertEqual(response.context['annual_stats']['total_transfer'], 900000)
+        self.assertEqual(response.context['monthly_stats'][0]['paid_count'], 1)
+        self.assertEqual(response.context['monthly_stats'][2]['total_count'], 0)
+    
+    def test_report_uses_amount_snapshots(self):
+        """Test editing an agreement's rent does not rewrite past report totals."""
+        self.agreement.rent_amount = 700000
+        self.agreement.save()
+        MonthlyRental.initialize_month(2024, 3)
+        
+        summary = MonthlyRental.summarize_by_month(2024)
+        self.assertEqual(summary[(2024, 2)]['total_rent'], 500000)
+        self.assertEqual(summary[(2024, 3)]['total_rent'], 700000)
+        self.assertEqual(summary[(2024, 3)]['total_commission'], 50000)
+    
+    def test_multi_year_report(self):
+        """Test a multi-year range does not add queries per month."""
+        url = reverse('management_rentals:report')
+        with CaptureQueriesContext(connection) as single_year:
+            self.client.get(url, {'year': 2024})
+        with CaptureQueriesContext(connection) as multi_year:
+            response = self.client.get(url, {'from': 2022, 'to': 2024})
+        
+        self.assertEqual(len(single_year), len(multi_year))
+        self.assertEqual(len(response.context['yearly_stats']), 3)
+        self.assertEqual(response.context['annual_stats']['total_rent'], 2000000)
+        self.assertEqual(response.context['yearly_stats'][1]['annual_stats']['total_rent'], 1000000)
+    
+    def test_year_range_is_bounded(self):
+        """Test a range is cut to ten years and years out of range fall back to the current one."""
+        url = reverse('management_rentals:report')
+        current_year = timezone.now().year
+        
+        response = self.client.get(url, {'from': 2001, 'to': 2999})
+        years = [stats['year'] for stats in response.context['yearly_stats']]
+        self.assertEqual(years, [current_year])
+        
+        response = self.client.get(url, {'from': 2030, 'to': 2010})
+        years = [stats['year'] for stats in response.context['yearly_stats']]
+        self.assertEqual(years, list(range(2010, 2020)))
+        
+        for params in ({'year': 1}, {'from': -5, 'to': 2024}, {'year': 10 ** 9}):
+            response = self.client.get(url, params)
+            self.assertEqual([stats['year'] for stats in response.context['yearly_stats']], [current_year])
+
+
+class DashboardViewTests(RentalTestDataMixin, TestCase):
+    """Tests for the rental dashboard statistics."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.url = reverse('management_rentals:dashboard')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def create_agreement(self, start_date, rent_amount=500000, commission_amount=50000):
+        """Create a rental agreement without its automatic monthly rental."""
+        agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=rent_amount,
+            commission_amount=commission_amount,
+            start_date=start_date,
+        )
+        agreement.monthly_rentals.all().delete()
+        return agreement
+    
+    def test_stats(self):
+        """Test the stats card values."""
+        self.create_agreement(timezone.datetime(2024, 1, 1).date())
+        self.create_agreement(timezone.datetime(2024, 1, 1).date(), 600000, 60000)
+        MonthlyRental.initialize_month(2024, 3)
+        paid_rental = MonthlyRental.objects.get(rent_amount=600000)
+        paid_rental.rent_status = MonthlyRental.PAID
+        paid_rental.payment_date = timezone.datetime(2024, 3, 5).date()
+        paid_rental.save()
+        
+        response = self.client.get(self.url, {'year': 2024, 'month': 3})
+        
+        self.assertEqual(response.context['stats'], {
+            'total_rent': 1100000,
+            'total_commission': 110000,
+            'total_transfer': 990000,
+            'pending_payments': 1,
+            'pending_transfers': 1,
+        })
+    
+    def test_needs_initialization_only_counts_valid_agreements(self):
+        """Test agreements starting after the selected month are not counted as missing."""
+        self.create_agreement(timezone.datetime(2024, 1, 1).date())
+        self.create_agreement(timezone.datetime(2024, 6, 1).date())
+        MonthlyRental.initialize_month(2024, 3)
+        
+        response = self.client.get(self.url, {'year': 2024, 'month': 3})
+        self.assertFalse(response.context['needs_initialization'])
+        self.assertEqual(response.context['missing_count'], 0)
+        
+        response = self.client.get(self.url, {'year': 2024, 'month': 6})
+        self.assertTrue(response.context['needs_initialization'])
+        self.assertEqual(response.context['missing_count'], 2)
+    
+    def test_query_count_does_not_grow(self):
+        """Test the dashboard runs the same number of queries regardless of portfolio size."""
+        self.create_agreement(timezone.datetime(2024, 1, 1).date())
+        MonthlyRental.initialize_month(2024, 3)
+        with CaptureQueriesContext(connection) as small_portfolio:
+            self.client.get(self.url, {'year': 2024, 'month': 3})
+        
+        for _ in range(5):
+            self.create_agreement(timezone.datetime(2024, 1, 1).date())
+        MonthlyRental.initialize_month(2024, 3)
+        with CaptureQueriesContext(connection) as large_portfolio:
+            self.client.get(self.url, {'year': 2024, 'month': 3})
+        
+        self.assertEqual(len(small_portfolio), len(large_portfolio))
+
+
+
+class MonthlyRollupTests(RentalTestDataMixin, TestCase):
+    """Tests for the incrementally maintained monthly rollups."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+        )
+        self.other_agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=600000,
+            commission_amount=60000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+        )
+        MonthlyRental.objects.all().delete()
+    
+    def assertRollupMatchesFacts(self):
+        """Assert every rollup equals a fresh aggregate over the monthly rentals."""
+        facts = MonthlyRental.summarize(MonthlyRental.objects.all())
+        expected = {
+            row['period']: {field: row[field] or 0 for field in MonthlyRollup.AGGREGATE_FIELDS}
+            for row in facts
+        }
+        actual = {
+            row['period']: {field: row[field] for field in MonthlyRollup.AGGREGATE_FIELDS}
+            for row in MonthlyRollup.objects.exclude(total_count=0).values()
+        }
+        self.assertEqual(actual, expected)
+    
+    def test_bulk_initialization_refreshes_rollups(self):
+        """Test initialize_month creates rollups for every initialized period."""
+        MonthlyRental.initialize_month(2024, 1, 2024, 3)
+        
+        rollup = MonthlyRollup.objects.get(period=202402)
+        self.assertEqual(rollup.total_count, 2)
+        self.assertEqual(rollup.total_rent, 1100000)
+        self.assertEqual(rollup.pending_count, 2)
+        self.assertRollupMatchesFacts()
+    
+    def test_save_and_delete_apply_deltas(self):
+        """Test single saves and deletes keep the rollups in sync."""
+        MonthlyRental.initialize_month(2024, 1, 2024, 2)
+        
+        monthly_rental = MonthlyRental.objects.get(rental_agreement=self.agreement, period=202401)
+        monthly_rental.rent_status = MonthlyRental.PAID
+        monthly_rental.payment_date = timezone.datetime(2024, 1, 5).date()
+        monthly_rental.save()
+        
+        rollup = MonthlyRollup.objects.get(period=202401)
+        self.assertEqual((rollup.paid_count, rollup.pending_count, rollup.paid_untransferred_count), (1, 1, 1))
+        self.assertRollupMatchesFacts()
+        
+        # Completing the transfer and moving a record to another period
+        monthly_rental.transfer_status = 'completed'
+        monthly_rental.transfer_date = timezone.datetime(2024, 1, 10).date()
+        monthly_rental.period_month = 3
+        monthly_rental.save()
+        self.assertRollupMatchesFacts()
+        
+        MonthlyRental.objects.filter(rental_agreement=self.other_agreement).delete()
+        self.assertRollupMatchesFacts()
+        self.assertEqual(MonthlyRollup.objects.get(period=202401).total_count, 0)
+    
+    def test_rebuild_rollups_command(self):
+        """Test the rebuild_rollups command restores rollups that drifted."""
+        MonthlyRental.initialize_month(2024, 1, 2024, 4)
+        MonthlyRental.objects.filter(period=202402).update(rent_status=MonthlyRental.UNPAID)
+        MonthlyRollup.objects.filter(period=202403).delete()
+        
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        
+        self.assertIn('Rebuilt rollups for 4 periods', out.getvalue())
+        self.assertEqual(MonthlyRollup.objects.get(period=202402).unpaid_count, 2)
+        self.assertRollupMatchesFacts()
+
+
+class BulkRecordPaymentTests(RentalTestDataMixin, TestCase):
+    """Tests for recording several payments at once."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        for rent_amount in (500000, 600000, 700000):
+            RentalAgreement.objects.create(
+                property=self.property,
+                owner=self.owner,
+                tenant=self.tenant,
+                rent_amount=rent_amount,
+                commission_amount=50000,
+                start_date=timezone.datetime(2024, 1, 1).date(),
+            )
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2024, 5)
+        self.rentals = list(MonthlyRental.objects.order_by('rent_amount'))
+        
+        # One record was already paid
+        self.rentals[2].rent_status = MonthlyRental.PAID
+        self.rentals[2].payment_date = timezone.datetime(2024, 5, 2).date()
+        self.rentals[2].save()
+        
+        self.url = reverse('management_rentals:bulk_record_payment')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_bulk_record_payment(self):
+        """Test eligible rows are updated and the others reported."""
+        ids = [rental.pk for rental in self.rentals] + [999999]
+        results = MonthlyRental.bulk_record_payment(ids, MonthlyRental.LATE, timezone.datetime(2024, 5, 10).date())
+        
+        self.assertEqual(
+            [result['result'] for result in results],
+            ['updated', 'updated', 'skipped', 'not_found']
+        )
+        self.assertEqual(
+            MonthlyRental.objects.filter(rent_status=MonthlyRental.LATE).count(),
+            2
+        )
+        rollup = MonthlyRollup.objects.get(period=202405)
+        self.assertEqual((rollup.late_count, rollup.paid_count, rollup.pending_count), (2, 1, 0))
+    
+    def test_bulk_payment_view(self):
+        """Test the dashboard bulk action renders a per-row summary."""
+        response = self.client.post(self.url, {
+            'monthly_rentals': [rental.pk for rental in self.rentals],
+            'rent_status': 'paid',
+            'payment_date': '2024-05-06',
+            'year': 2024,
+            'month': 5,
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'management_rentals/bulk_payment_result.html')
+        self.assertEqual(response.context['updated_count'], 2)
+        self.assertEqual(MonthlyRental.objects.filter(rent_status=MonthlyRental.PAID).count(), 3)
+    
+    def test_bulk_payment_view_rejects_invalid_batch(self):
+        """Test an invalid batch changes nothing and redirects to the dashboard."""
+        response = self.client.post(self.url, {
+            'monthly_rentals': ['abc'],
+            'rent_status': 'paid',
+            'payment_date': '2024-05-06',
+            'year': 2024,
+            'month': 5,
+        })
+        
+        self.assertRedirects(
+            response,
+            reverse('management_rentals:dashboard') + '?year=2024&month=5',
+            fetch_redirect_response=False
+        )
+        self.assertEqual(MonthlyRental.objects.filter(rent_status=MonthlyRental.PAID).count(), 1)
+
+
+class PayoutRunTests(RentalTestDataMixin, TestCase):
+    """Tests for batched owner payout runs."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        
+        # A second owner with their own property
+        self.other_owner = Client.objects.create(
+            name="Another Owner",
+            email="another@test.com",
+            phone="111111111",
+            client_type=Client.ClientType.OWNER
+        )
+        self.other_property = Property.objects.create(
+            address="Other Address",
+            current_owner=self.other_owner,
+            offer_type=Property.OfferType.RENT,
+            price=400000,
+            square_meters=50,
+            bedrooms=1,
+            bathrooms=1,
+            property_description="Other property",
+            date_published=timezone.datetime(2023, 1, 1).date(),
+        )
+        
+        for owner, prop, rent_amount in (
+            (self.owner, self.property, 500000),
+            (self.owner, self.property, 600000),
+            (self.other_owner, self.other_property, 400000),
+        ):
+            RentalAgreement.objects.create(
+                property=prop,
+                owner=owner,
+                tenant=self.tenant,
+                rent_amount=rent_amount,
+                commission_amount=50000,
+                start_date=timezone.datetime(2024, 1, 1).date(),
+            )
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2024, 5)
+        
+        # Everything is paid except the 600.000 rent
+        paid_ids = MonthlyRental.objects.exclude(rent_amount=600000).values_list('pk', flat=True)
+        MonthlyRental.bulk_record_payment(paid_ids, MonthlyRental.PAID, timezone.datetime(2024, 5, 3).date())
+        
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_payout_by_owner(self):
+        """Test pending transfers are netted per owner in one query."""
+        with self.assertNumQueries(1):
+            payouts = list(MonthlyRental.payout_by_owner(2024, 5))
+        
+        self.assertEqual(
+            [(payout['owner'], payout['total_transfer'], len(payout['monthly_rentals'])) for payout in payouts],
+            [(self.other_owner, 350000, 1), (self.owner, 450000, 1)]
+        )
+    
+    def test_payout_csv(self):
+        """Test the payout file is streamed with one line per owner."""
+        response = self.client.get(reverse('management_rentals:payout_csv'), {'year': 2024, 'month': 5})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(f'{self.other_owner.pk},Another Owner,'))
+        self.assertTrue(lines[2].endswith(',450000'))
+    
+    def test_confirm_payout_run(self):
+        """Test confirming marks the included rows completed and skips changed ones."""
+        url = reverse('management_rentals:payout_run')
+        response = self.client.get(url, {'year': 2024, 'month': 5})
+        self.assertEqual(response.context['monthly_rental_count'], 2)
+        ids = response.context['confirm_form'].initial['monthly_rentals']
+        
+        unpaid_id = MonthlyRental.objects.get(rent_amount=600000).pk
+        response = self.client.post(url, {
+            'year': 2024,
+            'month': 5,
+            'monthly_rentals': ids + [unpaid_id],
+            'transfer_date': '2024-05-10',
+        })
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(MonthlyRental.objects.filter(transfer_status='completed').count(), 2)
+        self.assertEqual(MonthlyRental.objects.get(pk=unpaid_id).transfer_status, 'pending')
+        self.assertEqual(MonthlyRollup.objects.get(period=202405).transfer_completed_count, 2)
+
+
+class BankStatementReconciliationTests(RentalTestDataMixin, TestCase):
+    """Tests for importing bank statements and reconciling them with monthly rentals."""
+    
+    STATEMENT = (
+        "Date,Amount,Reference\n"
+        "2024-05-03,500.000,Tenant Test\n"
+        "04/05/2024,$ 400.000,second@test.com\n"
+        "2024-05-05,123,Nobody\n"
+        "2024-05-06,-50.000,Bank fee\n"
+        "not a date,1000,Broken\n"
+    )
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        
+        # A second tenant renting two units with the same rent
+        self.second_tenant = Client.objects.create(
+            name="Second Ténant",
+            email="second@test.com",
+            phone="222222222",
+            client_type=Client.ClientType.TENANT
+        )
+        
+        for tenant, rent_amount in (
+            (self.tenant, 500000),
+            (self.second_tenant, 400000),
+            (self.second_tenant, 400000),
+        ):
+            RentalAgreement.objects.create(
+                property=self.property,
+                owner=self.owner,
+                tenant=tenant,
+                rent_amount=rent_amount,
+                commission_amount=50000,
+                start_date=timezone.datetime(2024, 1, 1).date(),
+            )
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2024, 5)
+        
+        self.client.login(username='testuser', password='testpass123')
+    
+    def reconcile(self, statement, **kwargs):
+        """Run the reconciliation over a statement given as text."""
+        return BankStatementLine.reconcile(iter_bank_statement(StringIO(statement)), **kwargs)
+    
+    def test_iter_bank_statement(self):
+        """Test amounts, dates, periods and delimiters are parsed."""
+        lines = list(iter_bank_statement(StringIO(
+            "fecha;monto;glosa;periodo\n"
+            "03-06-2024;350.000,00;Tenant Test;2024-05\n"
+        ), columns={'date': 'fecha', 'amount': 'monto', 'reference': 'glosa', 'period': 'periodo'}))
+        
+        self.assertEqual(lines, [{
+            'line_number': 2,
+            'transaction_date': timezone.datetime(2024, 6, 3).date(),
+            'amount': 350000,
+            'reference': 'Tenant Test',
+            'period': 202405,
+        }])
+        
+        with self.assertRaises(ValueError):
+            list(iter_bank_statement(StringIO("date,value\n")))
+    
+    def test_reconcile(self):
+        """Test unambiguous lines are recorded and the others are queued for review."""
+        summary = self.reconcile(self.STATEMENT, source='may.csv')
+        
+        self.assertEqual(summary['matched'], 1)
+        self.assertEqual(summary['ambiguous'], 1)
+        self.assertEqual(summary['unmatched'], 1)
+        self.assertEqual(summary['ignored'], 1)
+        self.assertEqual(summary['errors'], [(6, "Invalid date: 'not a date'")])
+        
+        paid = MonthlyRental.objects.get(rent_status=MonthlyRental.PAID)
+        self.assertEqual(paid.rental_agreement.tenant, self.tenant)
+        self.assertEqual(paid.payment_date, timezone.datetime(2024, 5, 3).date())
+        self.assertEqual(MonthlyRollup.objects.get(period=202405).paid_count, 1)
+        
+        ambiguous = BankStatementLine.objects.get(status=BankStatementLine.AMBIGUOUS)
+        self.assertEqual(ambiguous.candidates.count(), 2)
+        self.assertEqual(BankStatementLine.objects.get(status=BankStatementLine.MATCHED).monthly_rental, paid)
+        self.assertEqual(BankStatementLine.objects.get(status=BankStatementLine.UNMATCHED).reference, 'Nobody')
+    
+    def test_reimport_is_a_no_op(self):
+        """Test importing the same statement twice does not queue the lines again."""
+        self.reconcile(self.STATEMENT)
+        summary = self.reconcile(self.STATEMENT)
+        
+        self.assertEqual(summary['duplicate'], 3)
+        self.assertEqual(summary['matched'] + summary['ambiguous'] + summary['unmatched'], 0)
+        self.assertEqual(BankStatementLine.objects.count(), 3)
+    
+    def test_double_payment_is_ambiguous(self):
+        """Test two lines claiming the same monthly rental are both queued."""
+        summary = self.reconcile(
+            "date,amount,reference\n"
+            "2024-05-03,500000,Tenant Test\n"
+            "2024-05-04,500000,tenant@test.com\n"
+        )
+        
+        self.assertEqual(summary['ambiguous'], 2)
+        self.assertFalse(MonthlyRental.objects.filter(rent_status=MonthlyRental.PAID).exists())
+    
+    def test_wrong_amount_suggests_candidates(self):
+        """Test lines with the tenant but not the rent amount are queued with candidates."""
+        self.reconcile("date,amount,reference\n2024-05-03,450000,TENANT TEST\n")
+        
+        line = BankStatementLine.objects.get()
+        self.assertEqual(line.status, BankStatementLine.UNMATCHED)
+        self.assertEqual(line.candidates.get().rental_agreement.tenant, self.tenant)
+    
+    def test_query_count_does_not_grow_with_lines(self):
+        """Test the matching runs a fixed number of queries regardless of the statement size."""
+        unmatched = "".join(f"2024-05-03,{amount},Nobody\n" for amount in range(1000, 1050))
+        
+        with CaptureQueriesContext(connection) as small:
+            self.reconcile("date,amount,reference\n2024-05-03,999,Nobody\n")
+        with CaptureQueriesContext(connection) as large:
+            self.reconcile("date,amount,reference\n" + unmatched)
+        
+        self.assertEqual(len(small), len(large))
+    
+    def test_dry_run(self):
+        """Test a dry run saves nothing."""
+        summary = self.reconcile(self.STATEMENT, dry_run=True)
+        
+        self.assertEqual(summary['matched'], 1)
+        self.assertFalse(BankStatementLine.objects.exists())
+        self.assertFalse(MonthlyRental.objects.filter(rent_status=MonthlyRental.PAID).exists())
+    
+    def test_import_command(self):
+        """Test the management command imports a semicolon-separated file."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as statement:
+            statement.write(self.STATEMENT.replace(',', ';'))
+        self.addCleanup(os.remove, statement.name)
+        
+        out = StringIO()
+        call_command('import_bank_statement', statement.name, stdout=out, stderr=StringIO())
+        
+        self.assertIn('1 payments recorded', out.getvalue())
+        self.assertEqual(BankStatementLine.objects.filter(source=os.path.basename(statement.name)).count(), 3)
+    
+    def test_import_view(self):
+        """Test uploading a statement through the import view."""
+        upload = SimpleUploadedFile('may.csv', self.STATEMENT.encode('utf-8'), content_type='text/csv')
+        response = self.client.post(reverse('management_rentals:bank_statement_import'), {
+            'statement': upload,
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['summary']['matched'], 1)
+        self.assertEqual(BankStatementLine.objects.count(), 3)
+    
+    def test_resolve_line(self):
+        """Test resolving a queued line records the payment of the selected candidate."""
+        self.reconcile(self.STATEMENT)
+        line = BankStatementLine.objects.get(status=BankStatementLine.AMBIGUOUS)
+        candidate = line.candidates.first()
+        url = reverse('management_rentals:resolve_bank_statement_line', args=[line.pk])
+        
+        # Rentals that are not candidates are rejected
+        other = MonthlyRental.objects.exclude(pk__in=line.candidates.all()).first()
+        self.client.post(url, {'monthly_rental': other.pk})
+        line.refresh_from_db()
+        self.assertEqual(line.status, BankStatementLine.AMBIGUOUS)
+        
+        response = self.client.post(url, {'monthly_rental': candidate.pk})
+        self.assertRedirects(response, reverse('management_rentals:bank_statement_review'))
+        
+        line.refresh_from_db()
+        candidate.refresh_from_db()
+        self.assertEqual(line.status, BankStatementLine.RESOLVED)
+        self.assertEqual(candidate.rent_status, MonthlyRental.PAID)
+        self.assertEqual(candidate.payment_date, line.transaction_date)
+        
+        response = self.client.get(reverse('management_rentals:bank_statement_review'))
+        self.assertEqual([line.reference for line in response.context['lines']], ['Nobody'])
+
+
+
+class MarkOverdueTests(RentalTestDataMixin, TestCase):
+    """Tests for flagging overdue monthly rentals."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        
+        # Rent due on the 5th, and rent due on the 10th with three days of grace
+        self.agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+            payment_due_day=5,
+        )
+        self.lenient_agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=400000,
+            commission_amount=40000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+            payment_due_day=10,
+            grace_period_days=3,
+        )
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2024, 4, 2024, 5)
+    
+    def unpaid(self):
+        """Return the (agreement, period) pairs marked as unpaid."""
+        return set(MonthlyRental.objects.filter(
+            rent_status=MonthlyRental.UNPAID
+        ).values_list('rental_agreement', 'period'))
+    
+    def test_mark_overdue(self):
+        """Test the due day and grace period of each agreement are honoured."""
+        count = MonthlyRental.mark_overdue(timezone.datetime(2024, 5, 13).date())
+        
+        self.assertEqual(count, 3)
+        self.assertEqual(self.unpaid(), {
+            (self.agreement.pk, 202404),
+            (self.agreement.pk, 202405),
+            (self.lenient_agreement.pk, 202404),
+        })
+        self.assertEqual(MonthlyRollup.objects.get(period=202405).unpaid_count, 1)
+        self.assertEqual(MonthlyRollup.objects.get(period=202404).unpaid_count, 2)
+        
+        # The grace period is over the next day
+        self.assertEqual(MonthlyRental.mark_overdue(timezone.datetime(2024, 5, 14).date()), 1)
+    
+    def test_mark_overdue_is_idempotent(self):
+        """Test running twice changes nothing the second time and paid rents are left alone."""
+        paid = MonthlyRental.objects.get(rental_agreement=self.agreement, period=202404)
+        MonthlyRental.bulk_record_payment([paid.pk], MonthlyRental.PAID, timezone.datetime(2024, 4, 3).date())
+        
+        self.assertEqual(MonthlyRental.mark_overdue(timezone.datetime(2024, 5, 6).date()), 2)
+        self.assertEqual(MonthlyRental.mark_overdue(timezone.datetime(2024, 5, 6).date()), 0)
+        
+        paid.refresh_from_db()
+        self.assertEqual(paid.rent_status, MonthlyRental.PAID)
+    
+    def test_mark_overdue_runs_one_update(self):
+        """Test the rows are flipped with a single UPDATE statement."""
+        with CaptureQueriesContext(connection) as queries:
+            MonthlyRental.mark_overdue(timezone.datetime(2024, 6, 30).date())
+        
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "management_rentals_monthlyrental"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(MonthlyRental.objects.filter(rent_status=MonthlyRental.PENDING).count(), 0)
+    
+    def test_due_date(self):
+        """Test the due date follows the agreement's payment due day."""
+        monthly_rental = MonthlyRental.objects.get(rental_agreement=self.lenient_agreement, period=202405)
+        self.assertEqual(monthly_rental.due_date, timezone.datetime(2024, 5, 10).date())
+    
+    def test_command(self):
+        """Test the management command reports how many rows changed."""
+        out = StringIO()
+        call_command('mark_overdue', '--date', '2024-05-13', '--dry-run', stdout=out)
+        self.assertIn('3 monthly rentals would be marked', out.getvalue())
+        self.assertEqual(self.unpaid(), set())
+        
+        out = StringIO()
+        call_command('mark_overdue', '--date', '2024-05-13', stdout=out)
+        self.assertIn('Marked 3 monthly rentals as unpaid', out.getvalue())
+
+
+class KeysetPaginationTests(RentalTestDataMixin, TestCase):
+    """Tests for the keyset paginated rental agreement list and monthly rental admin."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.user = User.objects.create_superuser(username='admin', password='testpass123')
+        
+        # Several agreements share a start date, so the id has to break the ties
+        for index in range(45):
+            RentalAgreement.objects.create(
+                property=self.property,
+                owner=self.owner,
+                tenant=self.tenant,
+                rent_amount=500000 + index,
+                commission_amount=50000,
+                start_date=timezone.datetime(2024, 1 + index % 3, 1).date(),
+                is_active=index % 4 != 0,
+            )
+        
+        self.client.login(username='admin', password='testpass123')
+    
+    def walk(self, url, context_key):
+        """Follow the next links from the first page, returning the ids of every page."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append([obj.pk for obj in response.context[context_key]])
+            url = response.context['next_page_url']
+            if url:
+                url = reverse('management_rentals:rental_agreement_list') + url
+        return pages
+    
+    def test_list_pages_follow_the_ordering(self):
+        """Test walking the pages returns every agreement once, in list order."""
+        pages = self.walk(reverse('management_rentals:rental_agreement_list'), 'rental_agreements')
+        
+        expected = list(RentalAgreement.objects.order_by('-is_active', '-start_date', '-id').values_list('pk', flat=True))
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual([pk for page in pages for pk in page], expected)
+    
+    def test_previous_page_and_filters(self):
+        """Test the previous link goes back and the other parameters are kept."""
+        url = reverse('management_rentals:rental_agreement_list')
+        first = self.client.get(url, {'status': 'active'})
+        second = self.client.get(url + first.context['next_page_url'])
+        self.assertIn('status=active', first.context['next_page_url'])
+        self.assertTrue(all(agreement.is_active for agreement in second.context['rental_agreements']))
+        
+        back = self.client.get(url + second.context['previous_page_url'])
+        self.assertEqual(
+            [agreement.pk for agreement in back.context['rental_agreements']],
+            [agreement.pk for agreement in first.context['rental_agreements']]
+        )
+        self.assertIsNone(back.context['previous_page_url'])
+    
+    def test_no_count_query(self):
+        """Test a page is served without COUNT(*) or OFFSET."""
+        first = self.client.get(reverse('management_rentals:rental_agreement_list'))
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('management_rentals:rental_agreement_list') + first.context['next_page_url'])
+        
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+    
+    def test_invalid_cursor_shows_first_page(self):
+        """Test a tampered cursor falls back to the first page."""
+        response = self.client.get(reverse('management_rentals:rental_agreement_list'), {'cursor': 'garbage'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['previous_page_url'])
+        self.assertEqual(len(response.context['rental_agreements']), 20)
+    
+    def test_admin_changelist(self):
+        """Test the monthly rental admin changelist pages by keyset."""
+        url = reverse('admin:management_rentals_monthlyrental_changelist')
+        MonthlyRental.objects.all().delete()
+        MonthlyRental.initialize_month(2024, 3, 2024, 9)
+        
+        seen = []
+        query = ''
+        while True:
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            seen.extend(rental.pk for rental in changelist.result_list)
+            if not changelist.next_page_url:
+                break
+            query = changelist.next_page_url
+        
+        self.assertEqual(seen, list(MonthlyRental.objects.order_by('-period', '-pk').values_list('pk', flat=True)))
+        
+        # Filters keep working next to the cursor
+        response = self.client.get(url + query + '&rent_status__exact=pending')
+        self.assertEqual(response.status_code, 200)
+
+
+class RentalAgreementSearchTests(TestCase):
+    """Tests for the full-text client search of the rental agreement list and admin."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.owner = Client.objects.create(
+            name="Owner Test",
+            email="owner@test.com",
+            phone="123456789",
+            client_type=Client.ClientType.OWNER
+        )
+        self.maria = Client.objects.create(
+            name="María González",
+            email="maria.gonzalez@correo.cl",
+            phone="987654321",
+            client_type=Client.ClientType.TENANT
+        )
+        Client.objects.create(
+            name="José Pérez Muñoz",
+            email="jperez@correo.cl",
+            phone="+56 9 1234 5678",
+            client_type=Client.ClientType.OWNER
+        )
+        self.property = Property.objects.create(
+            address="Test Address",
+            current_owner=self.owner,
+            offer_type=Property.OfferType.RENT,
+            price=500000,
+            square_meters=60,
+            bedrooms=2,
+            bathrooms=1,
+            property_description="Test property",
+            date_published=timezone.datetime(2023, 1, 1).date(),
+        )
+        self.agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.maria,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+        )
+        
+        User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def search_agreements(self, text):
+        """Return the rental agreements found by the rental agreement list."""
+        response = self.client.get(reverse('management_rentals:rental_agreement_list'), {'search': text})
+        return list(response.context['rental_agreements'])
+    
+    def test_rental_agreement_search(self):
+        """Test rental agreements are found by tenant or by property address."""
+        self.assertEqual(self.search_agreements('gonzalez'), [self.agreement])
+        self.assertEqual(self.search_agreements('test addr'), [self.agreement])
+        self.assertEqual(self.search_agreements('jose'), [])
+    
+    def test_admin_search(self):
+        """Test the admin searches rental agreements by client name, accents folded."""
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        
+        response = self.client.get(reverse('admin:management_rentals_rentalagreement_changelist'), {'q': 'María'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.agreement])
+
+
+class RentalAgreementFormTests(RentalTestDataMixin, TestCase):
+    """Tests for the autocomplete widgets of the rental agreement form."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.create_base_data()
+        self.jose = Client.objects.create(
+            name="José Pérez Muñoz",
+            email="jperez@correo.cl",
+            phone="+56 9 1234 5678",
+            client_type=Client.ClientType.OWNER
+        )
+        self.josefa = Client.objects.create(
+            name="Josefa Rojas",
+            email="jrojas@correo.cl",
+            phone="987654321",
+            client_type=Client.ClientType.TENANT
+        )
+        
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.client.login(username='agent', password='testpass123')
+    
+    def test_form_renders_selected_options_only(self):
+        """Test the agreement form does not list every client and property."""
+        agreement = RentalAgreement.objects.create(
+            property=self.property,
+            owner=self.owner,
+            tenant=self.tenant,
+            rent_amount=500000,
+            commission_amount=50000,
+            start_date=timezone.datetime(2024, 1, 1).date(),
+        )
+        
+        response = self.client.get(reverse('management_rentals:rental_agreement_create'))
+        self.assertNotContains(response, "Owner Test")
+        self.assertContains(response, 'data-autocomplete-url')
+        self.assertContains(response, 'core/js/autocomplete.js')
+        
+        response = self.client.get(reverse('management_rentals:rental_agreement_update', args=[agreement.pk]))
+        self.assertContains(response, "Owner Test")
+        self.assertContains(response, "Tenant Test")
+        self.assertNotContains(response, "José Pérez Muñoz")
+        self.assertNotContains(response, "Josefa Rojas")
+    
+    def test_form_validates_submitted_ids(self):
+        """Test the form accepts a client of the right type only."""
+        data = {
+            'property': self.property.pk,
+            'owner': self.owner.pk,
+            'tenant': self.josefa.pk,
+            'rent_amount': 500000,
+            'commission_amount': 50000,
+            'start_date': '2024-01-01',
+            'payment_due_day': 5,
+            'grace_period_days': 5,
+            'is_active': True,
+        }
+        form = RentalAgreementForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        
+        form = RentalAgreementForm({**data, 'owner': self.josefa.pk, 'tenant': 999999})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'owner', 'tenant'})
@@ -17,10 +17,20 @@ urlpatterns = [
     path('agreements/<int:pk>/terminate/', views.RentalAgreementTerminateView.as_view(), name='rental_agreement_terminate'),
     
     # Monthly Rentals
+    path('monthly-rentals/bulk-payment/', views.BulkRecordPaymentView.as_view(), name='bulk_record_payment'),
     path('monthly-rentals/<int:pk>/', views.MonthlyRentalDetailView.as_view(), name='monthly_rental_detail'),
     path('monthly-rentals/<int:pk>/payment/', views.RecordPaymentView.as_view(), name='record_payment'),
     path('monthly-rentals/<int:pk>/transfer/', views.RecordTransferView.as_view(), name='record_transfer'),
     
+    # Owner payouts
+    path('payouts/', views.PayoutRunView.as_view(), name='payout_run'),
+    path('payouts/csv/', views.PayoutCSVView.as_view(), name='payout_csv'),
+    
+    # Bank statements
+    path('bank-statements/import/', views.BankStatementImportView.as_view(), name='bank_statement_import'),
+    path('bank-statements/review/', views.BankStatementReviewView.as_view(), name='bank_statement_review'),
+    path('bank-statements/lines/<int:pk>/resolve/', views.ResolveBankStatementLineView.as_view(), name='resolve_bank_statement_line'),
+    
     # Reports
     path('reports/', views.ReportView.as_view(), name='report'),
 ]
\ No newline at end of file
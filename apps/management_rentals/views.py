@@ -1,30 +1,45 @@
+import csv
+import io
+from datetime import MAXYEAR, MINYEAR
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse, reverse_lazy
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView, View
 from django.views.generic.edit import ModelFormMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
+from django.db import DatabaseError
 from django.db.models import Q, Sum, Count
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 
-from .models import RentalAgreement, MonthlyRental
+from apps.core.pagination import KeysetPaginationMixin
+from apps.management_clients import search as client_search
+from apps.management_properties import search as property_search
+
+from .models import (
+    RentalAgreement, MonthlyRental, MonthlyRollup, BankStatementLine, period_key,
+    iter_bank_statement
+)
 from .forms import (
     RentalAgreementForm, RentalAgreementTerminationForm,
-    RecordPaymentForm, RecordTransferForm, MonthFilterForm
+    RecordPaymentForm, RecordTransferForm, MonthFilterForm, BulkPaymentForm,
+    PayoutConfirmForm, BankStatementUploadForm, ResolveBankStatementLineForm
 )
 
 
-class RentalAgreementListView(LoginRequiredMixin, ListView):
+class RentalAgreementListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View for displaying all rental agreements."""
     model = RentalAgreement
     context_object_name = 'rental_agreements'
+    paginate_by = 20
+    keyset_ordering = ('-is_active', '-start_date', '-id')
     
     def get_queryset(self):
         """Filter queryset based on active status and search parameters."""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('property', 'owner', 'tenant')
         
         # Filter by active status if specified
         status = self.request.GET.get('status')
@@ -33,14 +48,18 @@ class RentalAgreementListView(LoginRequiredMixin, ListView):
         elif status == 'inactive':
             queryset = queryset.filter(is_active=False)
         
-        # Search by property address or tenant name
+        # Search by property address or tenant name, email or phone, through the
+        # full-text indexes of both tables
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(property__address__icontains=search) |
-                Q(tenant__first_name__icontains=search) |
-                Q(tenant__last_name__icontains=search)
-            )
+            condition = Q()
+            property_ids = property_search.matching_ids(search, columns=('address',))
+            if property_ids is not None:
+                condition |= Q(property__in=property_ids)
+            tenant_ids = client_search.matching_ids(search)
+            if tenant_ids is not None:
+                condition |= Q(tenant__in=tenant_ids)
+            queryset = queryset.filter(condition)
         
         return queryset
     
@@ -62,27 +81,33 @@ class RentalAgreementDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         
         # Get monthly rentals for this agreement, ordered by date
-        monthly_rentals = self.object.monthly_rentals.all().order_by('-period_year', '-period_month')
+        monthly_rentals = self.object.monthly_rentals.all().order_by('-period')
         context['monthly_rentals'] = monthly_rentals
         
-        # Add stats for rental agreement
-        paid_rentals = monthly_rentals.filter(rent_status='paid').count()
-        pending_rentals = monthly_rentals.filter(rent_status='pending').count()
-        late_rentals = monthly_rentals.filter(rent_status='late').count()
-        unpaid_rentals = monthly_rentals.filter(rent_status='unpaid').count()
+        # Add stats for rental agreement, summing the amounts stored on each monthly record
+        stats = monthly_rentals.aggregate(
+            paid=Count('id', filter=Q(rent_status='paid')),
+            pending=Count('id', filter=Q(rent_status='pending')),
+            late=Count('id', filter=Q(rent_status='late')),
+            unpaid=Count('id', filter=Q(rent_status='unpaid')),
+            total=Count('id'),
+            total_rent=Sum('rent_amount'),
+            total_paid=Sum('rent_amount', filter=Q(rent_status='paid')),
+            total_commission=Sum('commission_amount', filter=Q(rent_status='paid'))
+        )
         
         context['rental_stats'] = {
-            'paid': paid_rentals,
-            'pending': pending_rentals,
-            'late': late_rentals,
-            'unpaid': unpaid_rentals,
-            'total': monthly_rentals.count()
+            'paid': stats['paid'],
+            'pending': stats['pending'],
+            'late': stats['late'],
+            'unpaid': stats['unpaid'],
+            'total': stats['total']
         }
         
         # Calculate financial summary
-        total_rent = self.object.rent_amount * monthly_rentals.count()
-        total_paid = self.object.rent_amount * paid_rentals
-        total_commission = self.object.commission_amount * paid_rentals
+        total_rent = stats['total_rent'] or 0
+        total_paid = stats['total_paid'] or 0
+        total_commission = stats['total_commission'] or 0
         
         context['financial_summary'] = {
             'total_rent': total_rent,
@@ -181,8 +206,7 @@ class RentalAgreementTerminateView(LoginRequiredMixin, FormView):
         if reason:
             termination_month = MonthlyRental.objects.filter(
                 rental_agreement=self.rental_agreement,
-                period_year=termination_date.year,
-                period_month=termination_date.month
+                period=period_key(termination_date.year, termination_date.month)
             ).first()
             
             if termination_month:
@@ -193,11 +217,7 @@ class RentalAgreementTerminateView(LoginRequiredMixin, FormView):
         if delete_future_records:
             future_records = MonthlyRental.objects.filter(
                 rental_agreement=self.rental_agreement,
-                period_year__gt=termination_date.year
-            ) | MonthlyRental.objects.filter(
-                rental_agreement=self.rental_agreement,
-                period_year=termination_date.year,
-                period_month__gt=termination_date.month
+                period__gt=period_key(termination_date.year, termination_date.month)
             )
             
             future_records.delete()
@@ -231,35 +251,32 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             year = current_year
             month = current_month
         
+        # Years offered as the end of a multi-month initialization
+        context['range_end_years'] = range(year, year + 3)
+        
         try:
             # Get monthly rentals for the selected period
-            monthly_rentals = MonthlyRental.objects.filter(
-                period_year=year,
-                period_month=month
-            )
+            monthly_rentals = MonthlyRental.objects.filter(period=period_key(year, month))
             
             # Create filter form
             filter_form = MonthFilterForm(initial={'year': year, 'month': month})
             
-            # Check if month needs initialization
-            active_agreements = RentalAgreement.objects.filter(is_active=True)
-            initialized_count = monthly_rentals.count()
-            needs_initialization = initialized_count < active_agreements.count()
-            
-            # Get rental stats
-            total_rent = monthly_rentals.aggregate(
-                total=Sum('rental_agreement__rent_amount')
-            )['total'] or 0
+            # Check if month needs initialization: count agreements valid for this
+            # period that have no record yet
+            missing_count = MonthlyRental.count_missing(year, month)
+            needs_initialization = missing_count > 0
             
-            total_commission = monthly_rentals.aggregate(
-                total=Sum('rental_agreement__commission_amount')
-            )['total'] or 0
+            # Get rental stats from the period's pre-aggregated rollup
+            rollup = MonthlyRollup.objects.filter(period=period_key(year, month)).first()
+            total_rent = rollup.total_rent if rollup else 0
+            total_commission = rollup.total_commission if rollup else 0
             
-            pending_payments = monthly_rentals.filter(rent_status='pending').count()
-            pending_transfers = monthly_rentals.filter(
-                rent_status='paid', 
-                transfer_status='pending'
-            ).count()
+            # Load the listing with its related records in one query
+            monthly_rentals = list(monthly_rentals.select_related(
+                'rental_agreement__property',
+                'rental_agreement__owner',
+                'rental_agreement__tenant'
+            ))
             
             # Add to context
             context.update({
@@ -268,12 +285,13 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 'selected_year': year,
                 'selected_month': month,
                 'needs_initialization': needs_initialization,
+                'missing_count': missing_count,
                 'stats': {
                     'total_rent': total_rent,
                     'total_commission': total_commission,
                     'total_transfer': total_rent - total_commission,
-                    'pending_payments': pending_payments,
-                    'pending_transfers': pending_transfers
+                    'pending_payments': rollup.pending_count if rollup else 0,
+                    'pending_transfers': rollup.paid_untransferred_count if rollup else 0
                 }
             })
         except Exception as e:
@@ -285,6 +303,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 'selected_month': month,
                 'monthly_rentals': [],
                 'needs_initialization': False,
+                'missing_count': 0,
                 'stats': {
                     'total_rent': 0,
                     'total_commission': 0,
@@ -303,25 +322,52 @@ class InitializeMonthView(LoginRequiredMixin, TemplateView):
     """View for initializing a month's rental records."""
     template_name = 'management_rentals/initialize_month.html'
     
+    # Longest range of months initialized by one request
+    MAX_RANGE_MONTHS = 60
+    
     def post(self, request, *args, **kwargs):
-        """Process POST request to initialize a month."""
-        year = int(request.POST.get('year', timezone.now().year))
-        month = int(request.POST.get('month', timezone.now().month))
+        """Process POST request to initialize a month or a range of months."""
+        today = timezone.now()
+        dashboard_url = reverse('management_rentals:dashboard')
+        try:
+            year = int(request.POST.get('year') or today.year)
+            month = int(request.POST.get('month') or today.month)
+            # Optional end of the range, used to backfill or pre-create several months at once
+            end_year = int(request.POST.get('end_year') or year)
+            end_month = int(request.POST.get('end_month') or month)
+        except ValueError:
+            messages.error(request, 'The year and month must be numbers.')
+            return redirect(dashboard_url)
+        
+        months = (end_year * 12 + end_month) - (year * 12 + month)
+        error = None
+        if not (1 <= month <= 12 and 1 <= end_month <= 12):
+            error = 'The month must be between 1 and 12.'
+        elif not (MINYEAR <= year <= MAXYEAR and MINYEAR <= end_year <= MAXYEAR):
+            error = f'The year must be between {MINYEAR} and {MAXYEAR}.'
+        elif months < 0:
+            error = 'The end of the range cannot be before its start.'
+        elif months >= self.MAX_RANGE_MONTHS:
+            error = f'A range can span at most {self.MAX_RANGE_MONTHS} months.'
+        if error:
+            messages.error(request, error)
+            return redirect(dashboard_url)
         
         try:
-            created, existing = MonthlyRental.initialize_month(year, month)
-            
-            messages.success(
-                request, 
-                f'Month initialized successfully! {created} new records created, {existing} already existed.'
-            )
-        except Exception as e:
+            created, existing = MonthlyRental.initialize_month(year, month, end_year, end_month)
+        except DatabaseError as e:
             messages.error(
                 request,
                 f'Error initializing month: {str(e)}. Please ensure database migrations are up to date.'
             )
+        else:
+            period_label = 'Month' if (end_year, end_month) == (year, month) else 'Months'
+            messages.success(
+                request,
+                f'{period_label} initialized successfully! {created} new records created, {existing} already existed.'
+            )
         
-        return redirect(reverse('management_rentals:dashboard') + f'?year={year}&month={month}')
+        return redirect(dashboard_url + f'?year={year}&month={month}')
 
 
 class MonthlyRentalDetailView(LoginRequiredMixin, DetailView):
@@ -359,6 +405,47 @@ class RecordPaymentView(LoginRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
+@method_decorator(require_POST, name='dispatch')
+class BulkRecordPaymentView(LoginRequiredMixin, FormView):
+    """View for recording the payment of several monthly rentals at once."""
+    form_class = BulkPaymentForm
+    template_name = 'management_rentals/bulk_payment_result.html'
+    
+    def get_dashboard_url(self):
+        """Return the dashboard URL for the period the request came from."""
+        year = self.request.POST.get('year', '')
+        month = self.request.POST.get('month', '')
+        return reverse('management_rentals:dashboard') + f'?year={year}&month={month}'
+    
+    def form_valid(self, form):
+        """Apply the payments and render a per-row result summary."""
+        results = MonthlyRental.bulk_record_payment(
+            form.cleaned_data['monthly_rentals'],
+            form.cleaned_data['rent_status'],
+            form.cleaned_data['payment_date']
+        )
+        
+        updated_count = sum(1 for result in results if result['result'] == 'updated')
+        messages.success(
+            self.request,
+            f'{updated_count} of {len(results)} payments recorded successfully!'
+        )
+        
+        return self.render_to_response(self.get_context_data(
+            results=results,
+            updated_count=updated_count,
+            rent_status=form.cleaned_data['rent_status'],
+            dashboard_url=self.get_dashboard_url()
+        ))
+    
+    def form_invalid(self, form):
+        """Report the validation errors on the dashboard."""
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, f'Could not record payments: {error}')
+        return redirect(self.get_dashboard_url())
+
+
 class RecordTransferView(LoginRequiredMixin, UpdateView):
     """View for recording a transfer to owner."""
     model = MonthlyRental
@@ -382,85 +469,306 @@ class RecordTransferView(LoginRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
+class PeriodMixin:
+    """Read the selected year and month from the query string, defaulting to the current month."""
+    
+    def get_period(self):
+        """Return the (year, month) requested."""
+        today = timezone.now().date()
+        
+        try:
+            year = int(self.request.GET.get('year') or today.year)
+            month = int(self.request.GET.get('month') or today.month)
+        except ValueError:
+            return today.year, today.month
+        
+        if not 1 <= month <= 12:
+            month = today.month
+        
+        return year, month
+
+
+class PayoutRunView(LoginRequiredMixin, PeriodMixin, TemplateView):
+    """View for preparing and confirming the transfers to owners for a period."""
+    template_name = 'management_rentals/payout_run.html'
+    
+    def get_context_data(self, **kwargs):
+        """Add the pending transfers grouped per owner to context."""
+        context = super().get_context_data(**kwargs)
+        year, month = self.get_period()
+        
+        payouts = list(MonthlyRental.payout_by_owner(year, month))
+        monthly_rental_ids = [
+            rental.pk for payout in payouts for rental in payout['monthly_rentals']
+        ]
+        
+        context.update({
+            'selected_year': year,
+            'selected_month': month,
+            'payouts': payouts,
+            'total_transfer': sum(payout['total_transfer'] for payout in payouts),
+            'monthly_rental_count': len(monthly_rental_ids),
+            'confirm_form': kwargs.get('confirm_form') or PayoutConfirmForm(initial={
+                'year': year,
+                'month': month,
+                'monthly_rentals': monthly_rental_ids,
+            }),
+        })
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        """Mark every monthly rental included in the run as transferred."""
+        form = PayoutConfirmForm(request.POST)
+        
+        if not form.is_valid():
+            messages.error(request, 'Could not confirm the payout run. Please review the form.')
+            return self.render_to_response(self.get_context_data(confirm_form=form))
+        
+        completed = MonthlyRental.complete_transfers(
+            form.cleaned_data['monthly_rentals'],
+            form.cleaned_data['transfer_date']
+        )
+        skipped = len(form.cleaned_data['monthly_rentals']) - completed
+        
+        message = f'Payout run confirmed! {completed} transfers marked as completed.'
+        if skipped:
+            message += f' {skipped} records had changed and were left untouched.'
+        messages.success(request, message)
+        
+        year = form.cleaned_data['year']
+        month = form.cleaned_data['month']
+        return redirect(reverse('management_rentals:dashboard') + f'?year={year}&month={month}')
+
+
+class Echo:
+    """Pseudo-buffer whose write() returns the value, used to stream csv.writer output."""
+    
+    def write(self, value):
+        return value
+
+
+class PayoutCSVView(LoginRequiredMixin, PeriodMixin, View):
+    """View for downloading the payout file of a period as CSV."""
+    
+    def get(self, request, *args, **kwargs):
+        """Stream one CSV line per owner with the net amount to transfer."""
+        year, month = self.get_period()
+        writer = csv.writer(Echo())
+        
+        def rows():
+            yield writer.writerow([
+                'owner_id', 'owner_name', 'owner_email', 'period',
+                'months', 'monthly_rental_ids', 'total_transfer'
+            ])
+            for payout in MonthlyRental.payout_by_owner(year, month):
+                owner = payout['owner']
+                yield writer.writerow([
+                    owner.pk,
+                    owner.name,
+                    owner.email,
+                    f'{year}-{month:02d}',
+                    len(payout['monthly_rentals']),
+                    ' '.join(str(rental.pk) for rental in payout['monthly_rentals']),
+                    payout['total_transfer'],
+                ])
+        
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="payout_{year}_{month:02d}.csv"'
+        return response
+
+
+class BankStatementImportView(LoginRequiredMixin, FormView):
+    """View for uploading a bank statement and reconciling it with the monthly rentals."""
+    form_class = BankStatementUploadForm
+    template_name = 'management_rentals/bank_statement_import.html'
+    
+    def form_valid(self, form):
+        """Stream the uploaded file through the reconciliation and show the result."""
+        upload = form.cleaned_data['statement']
+        statement = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        
+        try:
+            summary = BankStatementLine.reconcile(
+                iter_bank_statement(statement, form.cleaned_data['delimiter'] or None),
+                source=upload.name,
+                dry_run=form.cleaned_data['dry_run']
+            )
+        except (ValueError, UnicodeDecodeError) as error:
+            form.add_error('statement', f'Could not read the bank statement: {error}')
+            return self.form_invalid(form)
+        
+        if form.cleaned_data['dry_run']:
+            messages.info(self.request, 'Dry run: nothing was saved.')
+        else:
+            messages.success(
+                self.request,
+                f"Bank statement imported! {summary['matched']} payments recorded, "
+                f"{summary['ambiguous'] + summary['unmatched']} lines queued for review."
+            )
+        
+        return self.render_to_response(self.get_context_data(
+            form=self.get_form_class()(),
+            summary=summary
+        ))
+
+
+class BankStatementReviewView(LoginRequiredMixin, ListView):
+    """View for listing the bank statement lines that need a manual decision."""
+    model = BankStatementLine
+    template_name = 'management_rentals/bank_statement_review.html'
+    context_object_name = 'lines'
+    paginate_by = 25
+    
+    def get_queryset(self):
+        """Return the queued lines with their candidates."""
+        from django.db.models import Prefetch
+        
+        return BankStatementLine.objects.filter(
+            status__in=BankStatementLine.REVIEW_STATUSES
+        ).prefetch_related(Prefetch(
+            'candidates',
+            queryset=MonthlyRental.objects.select_related(
+                'rental_agreement__property', 'rental_agreement__tenant'
+            )
+        ))
+
+
+@method_decorator(require_POST, name='dispatch')
+class ResolveBankStatementLineView(LoginRequiredMixin, View):
+    """View for assigning a queued bank statement line to a monthly rental, or dismissing it."""
+    
+    def post(self, request, *args, **kwargs):
+        """Record the payment of the selected candidate and take the line out of the queue."""
+        line = get_object_or_404(
+            BankStatementLine, pk=kwargs['pk'], status__in=BankStatementLine.REVIEW_STATUSES
+        )
+        form = ResolveBankStatementLineForm(request.POST, line=line)
+        
+        if not form.is_valid():
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, f'Could not resolve the line: {error}')
+            return redirect('management_rentals:bank_statement_review')
+        
+        monthly_rental = form.cleaned_data['monthly_rental']
+        result = line.resolve(monthly_rental)
+        
+        if monthly_rental is None:
+            messages.success(request, 'Bank statement line dismissed.')
+        elif result['result'] == 'updated':
+            messages.success(request, f'Payment recorded for rental #{monthly_rental.pk}!')
+        else:
+            messages.error(request, f'Could not record the payment: {result["message"]}')
+        
+        return redirect('management_rentals:bank_statement_review')
+
+
 class ReportView(LoginRequiredMixin, TemplateView):
     """View for displaying rental reports."""
     template_name = 'management_rentals/report.html'
     
+    MONTH_NAMES = [
+        'January', 'February', 'March', 'April', 'May', 'June',
+        'July', 'August', 'September', 'October', 'November', 'December'
+    ]
+    
+    # Years accepted in the query string, and the longest range shown at once
+    MIN_YEAR = 2000
+    MAX_YEARS_AHEAD = 10
+    MAX_RANGE_YEARS = 10
+    
+    def get_year_range(self, today):
+        """
+        Return the (from, to) years requested, falling back to ?year= or the current year.
+        
+        Years outside MIN_YEAR to MAX_YEARS_AHEAD years from now fall back to the current
+        year, and a range longer than MAX_RANGE_YEARS is cut at its end.
+        """
+        year = self.request.GET.get('year')
+        from_year = self.request.GET.get('from') or year
+        to_year = self.request.GET.get('to') or from_year
+        
+        try:
+            from_year = int(from_year) if from_year else today.year
+            to_year = int(to_year) if to_year else from_year
+        except ValueError:
+            from_year = to_year = today.year
+        
+        valid_years = range(self.MIN_YEAR, today.year + self.MAX_YEARS_AHEAD + 1)
+        if from_year not in valid_years or to_year not in valid_years:
+            from_year = to_year = today.year
+        
+        if from_year > to_year:
+            from_year, to_year = to_year, from_year
+        to_year = min(to_year, from_year + self.MAX_RANGE_YEARS - 1)
+        
+        return from_year, to_year
+    
     def get_context_data(self, **kwargs):
         """Add report data to context."""
         context = super().get_context_data(**kwargs)
         
-        # Get year from request or use current year
-        year = self.request.GET.get('year')
-        
         today = timezone.now().date()
         context['today'] = today
         
-        try:
-            year = int(year) if year else today.year
-        except ValueError:
-            year = today.year
+        from_year, to_year = self.get_year_range(today)
         
-        # Get monthly statistics for the selected year
-        monthly_stats = []
+        # All months of the range are read from the pre-aggregated monthly rollups
+        summary = MonthlyRollup.summarize_by_month(from_year, to_year)
         
-        for month in range(1, 13):
-            # Get monthly rentals for this period
-            monthly_rentals = MonthlyRental.objects.filter(
-                period_year=year,
-                period_month=month
-            )
+        yearly_stats = []
+        for year in range(from_year, to_year + 1):
+            monthly_stats = []
             
-            # Calculate statistics
-            total_rent = monthly_rentals.aggregate(
-                total=Sum('rental_agreement__rent_amount')
-            )['total'] or 0
-            
-            total_commission = monthly_rentals.aggregate(
-                total=Sum('rental_agreement__commission_amount')
-            )['total'] or 0
+            for month in range(1, 13):
+                row = summary.get((year, month), {})
+                total_rent = row.get('total_rent') or 0
+                total_commission = row.get('total_commission') or 0
+                
+                monthly_stats.append({
+                    'month': month,
+                    'month_name': self.MONTH_NAMES[month - 1],
+                    'total_rent': total_rent,
+                    'total_commission': total_commission,
+                    'total_transfer': total_rent - total_commission,
+                    'paid_count': row.get('paid_count', 0),
+                    'pending_count': row.get('pending_count', 0),
+                    'late_count': row.get('late_count', 0),
+                    'unpaid_count': row.get('unpaid_count', 0),
+                    'total_count': row.get('total_count', 0)
+                })
             
-            paid_count = monthly_rentals.filter(rent_status='paid').count()
-            pending_count = monthly_rentals.filter(rent_status='pending').count()
-            late_count = monthly_rentals.filter(rent_status='late').count()
-            unpaid_count = monthly_rentals.filter(rent_status='unpaid').count()
+            # Annual totals are derived from the monthly rows
+            annual_total_rent = sum(stats['total_rent'] for stats in monthly_stats)
+            annual_total_commission = sum(stats['total_commission'] for stats in monthly_stats)
             
-            monthly_stats.append({
-                'month': month,
-                'month_name': [
-                    'January', 'February', 'March', 'April', 'May', 'June',
-                    'July', 'August', 'September', 'October', 'November', 'December'
-                ][month-1],
-                'total_rent': total_rent,
-                'total_commission': total_commission,
-                'total_transfer': total_rent - total_commission,
-                'paid_count': paid_count,
-                'pending_count': pending_count,
-                'late_count': late_count,
-                'unpaid_count': unpaid_count,
-                'total_count': monthly_rentals.count()
+            yearly_stats.append({
+                'year': year,
+                'monthly_stats': monthly_stats,
+                'annual_stats': {
+                    'total_rent': annual_total_rent,
+                    'total_commission': annual_total_commission,
+                    'total_transfer': annual_total_rent - annual_total_commission
+                }
             })
         
-        # Calculate annual totals
-        annual_rentals = MonthlyRental.objects.filter(period_year=year)
-        
-        annual_total_rent = annual_rentals.aggregate(
-            total=Sum('rental_agreement__rent_amount')
-        )['total'] or 0
-        
-        annual_total_commission = annual_rentals.aggregate(
-            total=Sum('rental_agreement__commission_amount')
-        )['total'] or 0
+        range_total_rent = sum(stats['annual_stats']['total_rent'] for stats in yearly_stats)
+        range_total_commission = sum(stats['annual_stats']['total_commission'] for stats in yearly_stats)
         
         # Add to context
         context.update({
-            'monthly_stats': monthly_stats,
-            'selected_year': year,
+            'yearly_stats': yearly_stats,
+            'monthly_stats': yearly_stats[0]['monthly_stats'],
+            'selected_year': from_year,
+            'from_year': from_year,
+            'to_year': to_year,
+            'is_range': from_year != to_year,
+            'year_choices': range(min(from_year, today.year) - 3, max(to_year, today.year) + 2),
             'annual_stats': {
-                'total_rent': annual_total_rent,
-                'total_commission': annual_total_commission,
-                'total_transfer': annual_total_rent - annual_total_commission
+                'total_rent': range_total_rent,
+                'total_commission': range_total_commission,
+                'total_transfer': range_total_rent - range_total_commission
             }
         })
         
-        return context
\ No newline at end of file
+        return context
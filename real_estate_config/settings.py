@@ -116,6 +116,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (property photos and their renditions)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
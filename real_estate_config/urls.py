@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -7,4 +9,7 @@ urlpatterns = [
     path('properties/', include('apps.management_properties.urls')),
     path('clients/', include('apps.management_clients.urls')),
     path('rentals/', include('apps.management_rentals.urls', namespace='management_rentals')),
-]
\ No newline at end of file
+]
+
+# Serve uploaded photos during development; in production the web server does it
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)